@@ -0,0 +1,231 @@
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Union
+import asyncio
+import queue
+import threading
+import time
+import logging
+
+import numpy as np
+
+from .cache import EmbeddingCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """
+    A scheduler that groups embedding requests from concurrent callers into a single model call.
+
+    Callers submit one text at a time. A background thread collects submitted texts until
+    `max_batch_size` texts are waiting or `max_wait_ms` has elapsed since the first one arrived,
+    runs one `generate_embeddings` call for the whole batch and hands each caller its own vector.
+    When a cache is given, texts already cached are answered immediately without reaching the model.
+    """
+
+    def __init__(
+        self,
+        embedding_generator,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        cache: Optional[EmbeddingCache] = None
+    ):
+        """
+        Initialize the batcher and start its background worker thread.
+
+        Args:
+            embedding_generator: The object used to encode batches (e.g. EmbeddingGenerator).
+            max_batch_size (int): Maximum number of texts encoded in one call.
+            max_wait_ms (float): Maximum time to wait for more texts after the first one arrives.
+            cache (Optional[EmbeddingCache]): Cache consulted before queueing and filled after encoding.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be a positive integer.")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms cannot be negative.")
+
+        self.embedding_generator = embedding_generator
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.cache = cache
+        self.model_name = getattr(embedding_generator, "model_name", type(embedding_generator).__name__)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._batch_sizes: Dict[int, int] = {}
+
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Embedding batcher started (max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms}).")
+
+    def submit(self, text: str) -> Future:
+        """
+        Schedule a single text for embedding.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            Future: A future resolved with the embedding of the text, a read-only float32 array.
+
+        Raises:
+            ValueError: If the input is not a string.
+            RuntimeError: If the batcher has been stopped.
+        """
+        if not isinstance(text, str):
+            raise ValueError("Input must be a string.")
+        if not self._thread.is_alive():
+            raise RuntimeError("Embedding batcher is not running.")
+
+        future: Future = Future()
+        if self.cache is not None:
+            cached = self.cache.get(self.model_name, text)
+            if cached is not None:
+                future.set_result(cached)
+                return future
+
+        self._queue.put((text, future))
+        return future
+
+    def generate_embeddings(self, texts: List[str], as_numpy: bool = False) -> Union[List[List[float]], np.ndarray]:
+        """
+        Generate embeddings for a list of texts through the batching queue.
+
+        This mirrors `EmbeddingGenerator.generate_embeddings`, so the batcher can be used
+        wherever an embedding generator is expected. It blocks until all vectors are ready.
+
+        Args:
+            texts (List[str]): A list of strings to generate embeddings for.
+            as_numpy (bool): Return a float32 array instead of nested lists.
+
+        Returns:
+            Union[List[List[float]], np.ndarray]: The embeddings, one per input text.
+        """
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            logger.error("Input must be a list of strings.")
+            raise ValueError("Input must be a list of strings.")
+
+        futures = [self.submit(text) for text in texts]
+        return self._collect([future.result() for future in futures], as_numpy)
+
+    async def agenerate_embeddings(self, texts: List[str], as_numpy: bool = False) -> Union[List[List[float]], np.ndarray]:
+        """
+        Asynchronous version of `generate_embeddings` that awaits the batch instead of blocking.
+
+        Args:
+            texts (List[str]): A list of strings to generate embeddings for.
+            as_numpy (bool): Return a float32 array instead of nested lists.
+
+        Returns:
+            Union[List[List[float]], np.ndarray]: The embeddings, one per input text.
+        """
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            logger.error("Input must be a list of strings.")
+            raise ValueError("Input must be a list of strings.")
+
+        futures = [asyncio.wrap_future(self.submit(text)) for text in texts]
+        return self._collect(list(await asyncio.gather(*futures)), as_numpy)
+
+    @staticmethod
+    def _collect(vectors: List[np.ndarray], as_numpy: bool) -> Union[List[List[float]], np.ndarray]:
+        if as_numpy:
+            return np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        return [vector.tolist() for vector in vectors]
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stop the background worker after the queued requests have been processed.
+
+        Args:
+            timeout (float): Maximum time in seconds to wait for the worker to finish.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            logger.info("Embedding batcher stopped.")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return counters describing the batch sizes achieved so far.
+
+        Returns:
+            Dict[str, Any]: Number of batches and items, mean and largest batch size, and a
+            histogram mapping each batch size to how many batches had that size.
+        """
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": (self._items / self._batches) if self._batches else 0.0,
+                "largest_batch_size": self._largest_batch,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+    def _collect_batch(self, first) -> list:
+        """
+        Collect queued requests after `first` until the batch is full or the wait window closes.
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Put the sentinel back so the worker exits after this batch
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            # Drop requests whose caller gave up (e.g. a cancelled `agenerate_embeddings`); the others
+            # can no longer be cancelled, so their results can be set safely
+            batch = [(text, future) for text, future in self._collect_batch(first) if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._process(batch)
+            except BaseException as e:
+                # Never let one batch stop the worker thread
+                logger.exception(f"Unexpected error in the embedding batcher: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch: list) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = self.embedding_generator.generate_embeddings(texts, as_numpy=True)
+        except Exception as e:
+            logger.error(f"Error generating embeddings for batch of {len(batch)}: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (text, future), embedding in zip(batch, embeddings):
+                if self.cache is not None:
+                    self.cache.put(self.model_name, text, embedding)
+                future.set_result(embedding)
+
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
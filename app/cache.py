@@ -0,0 +1,280 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Sequence, Tuple
+import threading
+import time
+import unicodedata
+import logging
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a text for use as a cache key.
+
+    Applies Unicode NFKC normalization, collapses runs of whitespace and strips the ends.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The normalized text.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class EmbeddingCache:
+    """
+    A thread-safe, bounded LRU cache of query embeddings with optional time-to-live.
+
+    Entries are keyed by model name plus normalized text and stored as float32 arrays.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 0):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries (int): Maximum number of embeddings kept; the least recently used is evicted first.
+            ttl_seconds (float): Maximum age of an entry in seconds. 0 disables expiration.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be a positive integer.")
+        if ttl_seconds < 0:
+            raise ValueError("ttl_seconds cannot be negative.")
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        """
+        Look up the embedding of a text.
+
+        Args:
+            model_name (str): The name of the model that produced the embedding.
+            text (str): The text whose embedding is requested.
+
+        Returns:
+            Optional[np.ndarray]: The cached float32 embedding, or None on a miss.
+        """
+        key = (model_name, normalize_text(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, model_name: str, text: str, embedding: Sequence[float]) -> None:
+        """
+        Store the embedding of a text, evicting the least recently used entries if the cache is full.
+
+        Args:
+            model_name (str): The name of the model that produced the embedding.
+            text (str): The text that was embedded.
+            embedding (Sequence[float]): The embedding vector.
+        """
+        key = (model_name, normalize_text(text))
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache. Counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the cache counters.
+
+        Returns:
+            Dict[str, Any]: Size, hits, misses, hit rate, size-based evictions and TTL expirations.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+class AnswerCache:
+    """
+    A thread-safe semantic cache of `/chat` answers.
+
+    An answer is reused when a new question's embedding is within a cosine similarity threshold
+    of a cached question and the retrieval step returned exactly the same set of sources.
+    All entries are dropped when the document store changes (its data version moves).
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, max_entries: int = 1000, ttl_seconds: float = 0):
+        """
+        Initialize an empty answer cache.
+
+        Args:
+            similarity_threshold (float): Minimum cosine similarity between questions for a hit.
+            max_entries (int): Maximum number of answers kept; the least recently used is evicted first.
+            ttl_seconds (float): Maximum age of an entry in seconds. 0 disables expiration.
+        """
+        if not -1.0 <= similarity_threshold <= 1.0:
+            raise ValueError("similarity_threshold must be between -1 and 1.")
+        if max_entries < 1:
+            raise ValueError("max_entries must be a positive integer.")
+        if ttl_seconds < 0:
+            raise ValueError("ttl_seconds cannot be negative.")
+
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # entry id -> (source key, unit question vector, response, timestamp)
+        self._entries: "OrderedDict[int, Tuple[Tuple[str, ...], np.ndarray, Dict[str, Any], float]]" = OrderedDict()
+        # source key -> ids of the entries retrieved with that exact source set
+        self._by_sources: Dict[Tuple[str, ...], set] = {}
+        self._next_id = 0
+        self._data_version: Any = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def lookup(self, question_embedding: Sequence[float], source_ids: Sequence[str], data_version: Any) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a similar question retrieved with the same sources.
+
+        Args:
+            question_embedding (Sequence[float]): The embedding of the new question.
+            source_ids (Sequence[str]): IDs of the documents retrieved for the new question.
+            data_version (Any): The current version of the document store.
+
+        Returns:
+            Optional[Dict[str, Any]]: A copy of the cached response, or None on a miss.
+        """
+        source_key = tuple(sorted(source_ids))
+        query = self._unit(question_embedding)
+        with self._lock:
+            self._sync_version(data_version)
+            best_id, best_similarity = None, self.similarity_threshold
+            for entry_id in list(self._by_sources.get(source_key, ())):
+                _, vector, _, created = self._entries[entry_id]
+                if self.ttl_seconds and time.monotonic() - created > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                similarity = float(np.dot(query, vector))
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self._hits += 1
+            return dict(self._entries[best_id][2])
+
+    def store(self, question_embedding: Sequence[float], source_ids: Sequence[str], data_version: Any, response: Dict[str, Any]) -> None:
+        """
+        Cache the answer to a question.
+
+        Args:
+            question_embedding (Sequence[float]): The embedding of the question.
+            source_ids (Sequence[str]): IDs of the documents used to answer it.
+            data_version (Any): The version of the document store the sources were read from.
+            response (Dict[str, Any]): The response returned to the user.
+        """
+        source_key = tuple(sorted(source_ids))
+        vector = self._unit(question_embedding)
+        with self._lock:
+            self._sync_version(data_version)
+            if data_version != self._data_version:
+                return
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (source_key, vector, dict(response), time.monotonic())
+            self._by_sources.setdefault(source_key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self) -> None:
+        """
+        Remove all cached answers.
+        """
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the cache counters.
+
+        Returns:
+            Dict[str, Any]: Size, hits, misses, hit rate, evictions and invalidations.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+    def _sync_version(self, data_version: Any) -> None:
+        # Newer data makes every cached answer stale; an older version (a request that
+        # started before the last write) never replaces the current one.
+        if self._data_version is None or (data_version is not None and data_version > self._data_version):
+            if self._entries:
+                self._clear()
+            self._data_version = data_version
+
+    def _clear(self) -> None:
+        if self._entries:
+            self._invalidations += 1
+        self._entries.clear()
+        self._by_sources.clear()
+
+    def _remove(self, entry_id: int) -> None:
+        source_key = self._entries.pop(entry_id)[0]
+        ids = self._by_sources.get(source_key)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_sources[source_key]
@@ -0,0 +1,137 @@
+from typing import BinaryIO, Iterable, Iterator
+import codecs
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TextChunker:
+    """
+    Splits text into overlapping chunks of bounded size.
+
+    Text is consumed as a stream of pieces, so arbitrarily large inputs can be chunked while
+    only holding about one chunk in memory. Chunks end at whitespace when possible.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        """
+        Initialize the chunker.
+
+        Args:
+            chunk_size (int): Maximum number of characters per chunk.
+            chunk_overlap (int): Number of characters shared between consecutive chunks.
+
+        Raises:
+            ValueError: If the sizes are invalid.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer.")
+        if chunk_overlap < 0 or chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be non-negative and smaller than chunk_size.")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def chunks(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Chunk a stream of text pieces.
+
+        Args:
+            pieces (Iterable[str]): Consecutive pieces of the text (e.g. blocks read from a file).
+
+        Yields:
+            str: The non-empty chunks, in order.
+        """
+        buffer = ""
+        has_new_text = False
+        for piece in pieces:
+            if not piece:
+                continue
+            buffer += piece
+            has_new_text = True
+            while len(buffer) > self.chunk_size:
+                cut = self._find_cut(buffer)
+                chunk = buffer[:cut].strip()
+                if chunk:
+                    yield chunk
+                # Only text after the cut is new; the overlap alone is not worth another chunk
+                has_new_text = bool(buffer[cut:].strip())
+                buffer = buffer[self._find_overlap_start(buffer, cut):]
+
+        if has_new_text and buffer.strip():
+            yield buffer.strip()
+
+    def split(self, text: str, piece_size: int = 65536) -> Iterator[str]:
+        """
+        Chunk a text that is already in memory.
+
+        Args:
+            text (str): The text to split.
+            piece_size (int): Size of the slices fed to the streaming chunker.
+
+        Yields:
+            str: The non-empty chunks, in order.
+        """
+        return self.chunks(iter_text(text, piece_size))
+
+    def _find_cut(self, buffer: str) -> int:
+        # Prefer the last whitespace in the second half of the window (and past the overlap,
+        # so every chunk advances); otherwise cut mid-word at chunk_size.
+        low = max(self.chunk_size // 2, self.chunk_overlap + 1)
+        for separator in ("\n\n", "\n", " "):
+            position = buffer.rfind(separator, low, self.chunk_size)
+            if position > 0:
+                return position
+        return self.chunk_size
+
+    def _find_overlap_start(self, buffer: str, cut: int) -> int:
+        if not self.chunk_overlap:
+            return cut
+        start = cut - self.chunk_overlap
+        # Start the overlap at a word boundary when there is one
+        space = buffer.find(" ", start, cut)
+        return space + 1 if space != -1 else start
+
+
+def iter_text(text: str, piece_size: int = 65536) -> Iterator[str]:
+    """
+    Slice an in-memory text into consecutive pieces for the streaming chunker.
+
+    Args:
+        text (str): The text to slice.
+        piece_size (int): Number of characters per piece.
+
+    Yields:
+        str: Consecutive pieces of the text.
+    """
+    for start in range(0, len(text), piece_size):
+        yield text[start:start + piece_size]
+
+
+def iter_text_file(file: BinaryIO, encoding: str = "utf-8", read_size: int = 65536) -> Iterator[str]:
+    """
+    Read a binary file as a stream of decoded text pieces.
+
+    Args:
+        file (BinaryIO): The file to read.
+        encoding (str): The text encoding of the file.
+        read_size (int): Number of bytes read at a time.
+
+    Yields:
+        str: Decoded pieces of the file, in order.
+
+    Raises:
+        UnicodeDecodeError: If the file is not valid text in the given encoding.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while True:
+        block = file.read(read_size)
+        if not block:
+            break
+        text = decoder.decode(block)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+import asyncio
+import contextvars
+import threading
+import logging
+
+from .config import WORKER_THREADS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the bounded thread pool used for blocking work (model inference, ChromaDB calls).
+
+    Returns:
+        ThreadPoolExecutor: The shared executor, created on first use with `WORKER_THREADS` threads.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                logger.info(f"Starting blocking-work thread pool with {WORKER_THREADS} threads.")
+                _executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="rag-worker")
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking function on the shared thread pool without blocking the event loop.
+
+    The function runs in a copy of the caller's context, so request-scoped state such as the
+    stage timings of `app.metrics.collect_timings` follows it into the worker thread.
+
+    Args:
+        func (Callable): The blocking function to call.
+        *args: Positional arguments for `func`.
+        **kwargs: Keyword arguments for `func`.
+
+    Returns:
+        Any: The value returned by `func`.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """
+    Shut down the shared thread pool, if it was started.
+
+    Args:
+        wait (bool): Whether to wait for pending work to finish.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
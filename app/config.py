@@ -6,4 +6,117 @@ load_dotenv()
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 CHROMADB_PATH = os.getenv("CHROMADB_PATH", "./chroma_db")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
-MODEL_SLUG = os.getenv("MODEL_SLUG", "openai/gpt-3.5-turbo")
\ No newline at end of file
+MODEL_SLUG = os.getenv("MODEL_SLUG", "openai/gpt-3.5-turbo")
+
+# Embedding backend: "torch" (SentenceTransformer), "onnx" (ONNX Runtime, see tools/export_onnx.py)
+# or "remote" (the shared embedding server started with tools/embedding_server.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join("onnx_models", EMBEDDING_MODEL))
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "false").lower() in ("1", "true", "yes")
+EMBEDDING_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))
+
+# Embedding server: address shared by the server and its clients ("unix:/path" or "host:port"),
+# client timeout and connections per API worker, and the server's model processes and their backend
+EMBEDDING_SERVER_ADDRESS = os.getenv("EMBEDDING_SERVER_ADDRESS", "unix:/tmp/rag-embeddings.sock")
+EMBEDDING_SERVER_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_SERVER_TIMEOUT_SECONDS", "30"))
+EMBEDDING_SERVER_CONNECTIONS = int(os.getenv("EMBEDDING_SERVER_CONNECTIONS", "4"))
+EMBEDDING_SERVER_WORKERS = int(os.getenv("EMBEDDING_SERVER_WORKERS", "1"))
+EMBEDDING_SERVER_BACKEND = os.getenv("EMBEDDING_SERVER_BACKEND", "torch")
+
+# Ingestion
+MAX_DOCUMENT_LENGTH = int(os.getenv("MAX_DOCUMENT_LENGTH", "5000"))
+MAX_BULK_DOCUMENTS = int(os.getenv("MAX_BULK_DOCUMENTS", "10000"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+CHROMADB_WRITE_BATCH_SIZE = int(os.getenv("CHROMADB_WRITE_BATCH_SIZE", "1000"))
+# Metadata keys that, with the normalized text, identify a document (comma-separated; empty means text only)
+DEDUP_METADATA_KEYS = [key.strip() for key in os.getenv("DEDUP_METADATA_KEYS", "").split(",") if key.strip()]
+
+# ChromaDB storage: persistent (data kept in CHROMADB_PATH across restarts) or in memory only
+CHROMADB_PERSISTENT = os.getenv("CHROMADB_PERSISTENT", "true").lower() in ("1", "true", "yes")
+# A Chroma server (`chroma run --path ... --port ...`) to use instead of a local client; required to run
+# several API workers, since a local persistent directory must only be opened by one process
+CHROMADB_HOST = os.getenv("CHROMADB_HOST") or None
+CHROMADB_PORT = int(os.getenv("CHROMADB_PORT", "8100"))
+# HNSW index: distance space (l2, cosine or ip), M and ef_construction are set when a collection is
+# created; ef_search also applies to existing ones. Measure the trade-off with tools/sweep_hnsw.py
+HNSW_SPACE = os.getenv("HNSW_SPACE", "l2")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "100"))
+
+# Sharding: documents spread over CHROMADB_SHARDS collections, routed by ID hash or by a metadata key
+CHROMADB_SHARDS = int(os.getenv("CHROMADB_SHARDS", "1"))
+CHROMADB_SHARD_KEY = os.getenv("CHROMADB_SHARD_KEY") or None
+
+# Query embedding micro-batching
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+# Thread pool for blocking work (model inference, ChromaDB calls) off the event loop
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "16"))
+
+# Query embedding cache (EMBEDDING_CACHE_MAX_ENTRIES=0 disables it, TTL of 0 means no expiration)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+
+# Semantic answer cache for /chat (disabled by default)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+# Document chunking
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+UPLOAD_READ_SIZE = int(os.getenv("UPLOAD_READ_SIZE", "65536"))
+
+# LLM client (OpenAI-compatible API; point LLM_API_BASE at a local stub for testing)
+LLM_API_BASE = os.getenv("LLM_API_BASE", "https://openrouter.ai/api/v1")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "120"))
+
+# Retrieval: vector (dense), lexical (BM25) or hybrid (both, merged with reciprocal rank fusion)
+SEARCH_MODE = os.getenv("SEARCH_MODE", "vector")
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", CHROMADB_PATH.rstrip("/\\") + "_lexical")
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_CANDIDATE_MULTIPLIER = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "2"))
+
+# Optional cross-encoder rerank stage (RERANK_BUDGET_MS=0 means no latency limit)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "200"))
+
+# Context packing for /chat prompts: MMR selection, token budget (0 means no limit) and sentence trimming
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+CONTEXT_CANDIDATE_MULTIPLIER = int(os.getenv("CONTEXT_CANDIDATE_MULTIPLIER", "2"))
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.95"))
+CONTEXT_CHARS_PER_TOKEN = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "4"))
+
+# Asynchronous ingestion: /add_document and /add_documents with ?async=true (or all of them with
+# INGEST_ASYNC=true) return a job ID; a background worker stores the queued items in coalesced batches
+INGEST_ASYNC = os.getenv("INGEST_ASYNC", "false").lower() in ("1", "true", "yes")
+INGEST_JOURNAL_PATH = os.getenv("INGEST_JOURNAL_PATH", "./ingest_journal.jsonl")
+INGEST_QUEUE_MAX_ITEMS = int(os.getenv("INGEST_QUEUE_MAX_ITEMS", "100000"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "2000"))
+INGEST_COALESCE_MS = float(os.getenv("INGEST_COALESCE_MS", "50"))
+INGEST_JOB_RETENTION = int(os.getenv("INGEST_JOB_RETENTION", "1000"))
+INGEST_JOURNAL_FSYNC = os.getenv("INGEST_JOURNAL_FSYNC", "true").lower() in ("1", "true", "yes")
+
+# Embedding snapshots (export/import of stored vectors without re-encoding)
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "./snapshots")
+SNAPSHOT_IMPORT_BATCH_SIZE = int(os.getenv("SNAPSHOT_IMPORT_BATCH_SIZE", "5000"))
+
+# Logging (hot-path INFO logs are sampled and written from a background thread) and /chat timings
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_HOT_PATH_SAMPLE_RATE = float(os.getenv("LOG_HOT_PATH_SAMPLE_RATE", "0.1"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
@@ -0,0 +1,227 @@
+from typing import Any, Dict, List, Optional, Sequence
+import math
+import re
+import logging
+
+import numpy as np
+
+from .lexical import tokenize
+from .metrics import timed
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Sentence boundaries: end punctuation followed by whitespace, or a blank line
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+|\n\s*\n")
+
+# Joins the sentences kept from a trimmed document
+TRIM_SEPARATOR = " … "
+
+# Smallest budget worth cutting a sentence for, when no whole sentence fits
+MIN_CUT_TOKENS = 16
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """
+    Estimate the LLM token count of a text from its length.
+
+    Args:
+        text (str): The text.
+        chars_per_token (float): Average characters per token of the target model.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split a text into sentences (or paragraphs, for text without end punctuation).
+    """
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text) if sentence.strip()]
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    embeddings: np.ndarray,
+    k: int,
+    mmr_lambda: float = 0.7,
+    duplicate_threshold: float = 1.0
+) -> List[int]:
+    """
+    Pick up to `k` items by maximal marginal relevance.
+
+    Each step takes the item maximizing `mmr_lambda * relevance - (1 - mmr_lambda) * max_similarity`,
+    where `max_similarity` is the cosine similarity to the items already picked. Items at least
+    `duplicate_threshold` similar to a picked one are skipped.
+
+    Args:
+        relevance (np.ndarray): Relevance of each item to the query, shape (n,).
+        embeddings (np.ndarray): Item embeddings, shape (n, dimension).
+        k (int): Maximum number of items.
+        mmr_lambda (float): Trade-off between relevance (1.0) and diversity (0.0).
+        duplicate_threshold (float): Cosine similarity above which an item counts as a duplicate.
+
+    Returns:
+        List[int]: Indexes of the picked items, in pick order.
+    """
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = embeddings / np.where(norms == 0, 1, norms)
+    similarity = unit @ unit.T
+    selected: List[int] = []
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    while len(selected) < k and available.any():
+        penalty = max_similarity if selected else 0
+        scores = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * penalty, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+        available &= max_similarity < duplicate_threshold
+    return selected
+
+
+class ContextPacker:
+    """
+    Assembles the prompt context from retrieved documents under a token budget.
+
+    Documents are picked by maximal marginal relevance: their retrieval rank is the relevance and
+    their stored embeddings measure redundancy, so near-duplicate hits are not sent twice. They are added whole while they fit; a document that
+    does not fit is trimmed to its sentences with the most query terms, kept in their original order.
+    """
+
+    def __init__(
+        self,
+        db_manager,
+        token_budget: int = 1500,
+        mmr_lambda: float = 0.7,
+        candidate_multiplier: int = 2,
+        duplicate_threshold: float = 0.95,
+        chars_per_token: float = 4.0,
+        separator: str = "\n\n"
+    ):
+        """
+        Initialize the packer.
+
+        Args:
+            db_manager: The store the documents were retrieved from (ChromaDBManager).
+            token_budget (int): Maximum estimated tokens of context; 0 means no limit.
+            mmr_lambda (float): MMR trade-off between relevance (1.0) and diversity (0.0).
+            candidate_multiplier (int): Documents retrieved per document kept, as MMR candidates.
+            duplicate_threshold (float): Cosine similarity above which a document is a duplicate.
+            chars_per_token (float): Characters per token used to estimate token counts.
+            separator (str): Text placed between documents in the context.
+        """
+        if token_budget < 0:
+            raise ValueError("token_budget cannot be negative.")
+        if not 0 <= mmr_lambda <= 1:
+            raise ValueError("mmr_lambda must be between 0 and 1.")
+        self.db_manager = db_manager
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.candidate_multiplier = max(1, candidate_multiplier)
+        self.duplicate_threshold = duplicate_threshold
+        self.chars_per_token = chars_per_token
+        self.separator = separator
+
+    def candidates(self, max_results: int) -> int:
+        """
+        Number of documents to retrieve so that MMR can pick `max_results` of them.
+        """
+        return max_results * self.candidate_multiplier
+
+    def pack(
+        self,
+        question: str,
+        ids: Sequence[str],
+        docs: Sequence[str],
+        metadatas: Sequence[Optional[Dict[str, Any]]],
+        max_results: int
+    ) -> Dict[str, Any]:
+        """
+        Build the context for a question from retrieved documents, best first.
+
+        Args:
+            question (str): The user question.
+            ids (Sequence[str]): Retrieved document IDs, best first: their order (vector, fused or
+                reranked) is the relevance signal.
+            docs (Sequence[str]): Their texts.
+            metadatas (Sequence[Optional[Dict[str, Any]]]): Their metadata.
+            max_results (int): Maximum number of documents in the context.
+
+        Returns:
+            Dict[str, Any]: `context` (the text), `ids` of the documents used, `sources` (content
+            actually sent, metadata, ID and whether it was trimmed) and `tokens` (estimated).
+        """
+        with timed("context_packing"):
+            order = self._select(ids, max_results)
+            terms = set(tokenize(question))
+            budget = self.token_budget or math.inf
+            separator_tokens = estimate_tokens(self.separator, self.chars_per_token)
+            parts: List[str] = []
+            sources: List[Dict[str, Any]] = []
+            used_ids: List[str] = []
+            tokens = 0
+            for idx in order:
+                remaining = budget - tokens - (separator_tokens if parts else 0)
+                text, trimmed = docs[idx], False
+                if estimate_tokens(text, self.chars_per_token) > remaining:
+                    text, trimmed = self._trim(text, terms, remaining), True
+                if not text:
+                    continue
+                tokens += estimate_tokens(text, self.chars_per_token) + (separator_tokens if parts else 0)
+                parts.append(text)
+                used_ids.append(ids[idx])
+                sources.append({"id": ids[idx], "content": text, "metadata": metadatas[idx], "trimmed": trimmed})
+            return {"context": self.separator.join(parts), "ids": used_ids, "sources": sources, "tokens": tokens}
+
+    def _select(self, ids: Sequence[str], max_results: int) -> List[int]:
+        if len(ids) <= 1:
+            return list(range(len(ids)))
+        try:
+            stored = self.db_manager.get_embeddings(list(ids))
+        except RuntimeError as e:
+            logger.warning(f"Skipping MMR, embeddings unavailable: {e}")
+            return list(range(min(len(ids), max_results)))
+        present = [idx for idx, doc_id in enumerate(ids) if doc_id in stored]
+        if not present:
+            return list(range(min(len(ids), max_results)))
+        embeddings = np.stack([stored[ids[idx]] for idx in present])
+        # Relevance comes from the retrieval rank, so the fused and reranked orders are kept; the
+        # embeddings only measure redundancy between documents
+        relevance = 1 - np.arange(len(present), dtype=np.float32) / len(present)
+        picked = mmr_select(relevance, embeddings, max_results, self.mmr_lambda, self.duplicate_threshold)
+        return [present[idx] for idx in picked]
+
+    def _trim(self, text: str, terms: set, budget: float) -> str:
+        """
+        Keep the sentences with the most query terms that fit in `budget` tokens, in text order.
+        """
+        separator_tokens = estimate_tokens(TRIM_SEPARATOR, self.chars_per_token)
+        sentences = split_sentences(text)
+        scored = []
+        for position, sentence in enumerate(sentences):
+            sentence_terms = tokenize(sentence)
+            overlap = len(terms.intersection(sentence_terms))
+            # More query terms first, then denser sentences, then earlier ones
+            scored.append((-overlap, -overlap / math.sqrt(len(sentence_terms) or 1), position))
+        kept: List[int] = []
+        used = 0
+        for _, _, position in sorted(scored):
+            cost = estimate_tokens(sentences[position], self.chars_per_token) + (separator_tokens if kept else 0)
+            if used + cost <= budget:
+                kept.append(position)
+                used += cost
+        if not kept and scored and budget >= MIN_CUT_TOKENS:
+            # Not even one sentence fits: cut the best one at a word boundary
+            best = sentences[min(scored)[2]]
+            limit = int(budget * self.chars_per_token) - len(TRIM_SEPARATOR.strip())
+            cut = best[:max(0, limit)].rsplit(" ", 1)[0].rstrip()
+            return cut + TRIM_SEPARATOR.strip() if cut else ""
+        return TRIM_SEPARATOR.join(sentences[position] for position in sorted(kept))
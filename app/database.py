@@ -1,84 +1,709 @@
 import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Any
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+import time
 import logging
 
+import numpy as np
+
+from .dedup import content_id
+from .filelock import try_lock_file
+from .filters import build_where, with_date_timestamps, without_date_timestamps
+from .lexical import BM25Index
+from .logs import HOT_PATH
+from .metrics import timed
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+COLLECTION_NAME = "documents"
+
+# Chunk metadata that is part of a chunk's identity: the same passage in two documents is two chunks
+CHUNK_ID_KEYS = ("parent_id", "chunk_index")
+
+# File in the persist directory whose modification time is the data version shared by all processes
+VERSION_STAMP_FILE = "data_version.stamp"
+# Held by the process that opened a local persistent directory, to detect a second one
+CLIENT_LOCK_FILE = "client.lock"
+
+# Distance functions supported by the HNSW index
+HNSW_SPACES = ("l2", "cosine", "ip")
+
+
+def shard_index(key: str, num_shards: int) -> int:
+    """
+    Return the shard of a routing key: a stable hash of the key modulo the number of shards.
+    """
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
 class ChromaDBManager:
     """
     A class to manage the connection, insertion, and search operations in ChromaDB.
+
+    Documents are content-addressed: unless an ID is given, it is a hash of the normalized text
+    and the metadata values listed in `id_metadata_keys`, and writes are upserts. Storing the
+    same content twice therefore keeps a single copy.
+
+    With `num_shards` > 1 documents are spread over that many collections, routed by a hash of
+    their ID or of the `shard_key` metadata value. Each shard has a smaller HNSW index; searches
+    query all shards concurrently and merge their results by distance, and bulk writes go to the
+    shards in parallel.
+
+    The client is persistent by default: collections live under `persist_directory` and survive
+    restarts. Each collection is created with the given HNSW settings; the distance space, `M` and
+    `ef_construction` are fixed once a collection exists, while `ef_search` is applied on every start.
+
+    A local persistent directory must only be opened by one process at a time: each process keeps
+    its own in-memory copy of the HNSW index. Processes sharing one store (several API workers)
+    connect to a Chroma server through `host` instead.
     """
 
-    def __init__(self, persist_directory: str = "./chroma_db"):
+    def __init__(
+        self,
+        persist_directory: str = "./chroma_db",
+        lexical_index: Optional[BM25Index] = None,
+        id_metadata_keys: Sequence[str] = (),
+        num_shards: int = 1,
+        shard_key: Optional[str] = None,
+        persistent: bool = True,
+        hnsw_space: str = "l2",
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 100,
+        hnsw_ef_search: int = 100,
+        host: Optional[str] = None,
+        port: int = 8100
+    ):
         """
-        Initialize the ChromaDB client and create a default collection.
+        Initialize the ChromaDB client and create the collection, or one collection per shard.
 
         Args:
             persist_directory (str): Directory to persist the ChromaDB data.
+            lexical_index (Optional[BM25Index]): Inverted index kept in sync with the collection,
+                enabling `lexical_search`. It is rebuilt from the collection if their sizes differ.
+            id_metadata_keys (Sequence[str]): Metadata keys that are part of a document's identity,
+                besides its text.
+            num_shards (int): Number of collections the documents are spread over. Changing it
+                requires re-importing the data (e.g. through a snapshot).
+            shard_key (Optional[str]): Metadata key whose value picks the shard, so that related
+                documents share one; documents without it, and all documents when None, are routed
+                by ID. The value should not change for a stored document (include it in
+                `id_metadata_keys`), or an update lands in another shard.
+            persistent (bool): Store the data in `persist_directory`; False keeps it in memory only.
+            hnsw_space (str): Distance of the index: `l2`, `cosine` or `ip` (inner product).
+            hnsw_m (int): Neighbors per node in the HNSW graph (`M`); more raise recall and memory.
+            hnsw_ef_construction (int): Candidate list size while building the graph.
+            hnsw_ef_search (int): Candidate list size while searching; more raise recall and latency.
+            host (Optional[str]): Host of a Chroma server to connect to instead of a local client.
+                `persist_directory` then only holds the data version stamp shared by local processes.
+            port (int): Port of the Chroma server.
         """
+        if num_shards < 1:
+            raise ValueError("num_shards must be a positive integer.")
+        if hnsw_space not in HNSW_SPACES:
+            raise ValueError(f"hnsw_space must be one of: {', '.join(HNSW_SPACES)}.")
+        if min(hnsw_m, hnsw_ef_construction, hnsw_ef_search) < 1:
+            raise ValueError("HNSW parameters must be positive integers.")
+        self.lexical_index = lexical_index
+        self.id_metadata_keys = tuple(id_metadata_keys)
+        self.num_shards = num_shards
+        self.shard_key = shard_key
+        self.persistent = persistent
+        self.server = f"{host}:{port}" if host else None
+        self.hnsw = {
+            "space": hnsw_space,
+            "max_neighbors": hnsw_m,
+            "ef_construction": hnsw_ef_construction,
+            "ef_search": hnsw_ef_search,
+        }
+        # Shard fan-out runs on its own threads: callers already run on the shared pool
+        self._shard_pool = (
+            ThreadPoolExecutor(max_workers=num_shards, thread_name_prefix="rag-shard") if num_shards > 1 else None
+        )
+        self._version = 0
+        self._version_lock = threading.Lock()
+        self._version_stamp = os.path.join(persist_directory, VERSION_STAMP_FILE) if persistent or host else None
+        self._client_lock = None
         try:
-            logger.info(f"Initializing ChromaDB client with persistence directory: {persist_directory}")
-            self.client = chromadb.Client(Settings(persist_directory=persist_directory))
-            self.collection = self.client.get_or_create_collection(name="documents")
-            logger.info("ChromaDB client initialized and default collection created.")
+            if host:
+                logger.info(f"Connecting to the ChromaDB server at {host}:{port}")
+                os.makedirs(persist_directory, exist_ok=True)
+                self.client = chromadb.HttpClient(host=host, port=port)
+            elif persistent:
+                logger.info(f"Initializing persistent ChromaDB client in: {persist_directory}")
+                os.makedirs(persist_directory, exist_ok=True)
+                self._client_lock = try_lock_file(os.path.join(persist_directory, CLIENT_LOCK_FILE))
+                if self._client_lock is None:
+                    logger.warning(
+                        f"ChromaDB directory {persist_directory} is already open in another process. A local "
+                        "client must not be shared: its writes are not seen by the other process's index and "
+                        "concurrent writes can corrupt the store. Use one API worker, or a Chroma server "
+                        "(CHROMADB_HOST)."
+                    )
+                self.client = chromadb.PersistentClient(path=persist_directory)
+            else:
+                logger.info("Initializing in-memory ChromaDB client.")
+                self.client = chromadb.EphemeralClient()
+            self.collections = [self._open_collection(self._collection_name(shard)) for shard in range(num_shards)]
+            logger.info(f"ChromaDB client initialized with {num_shards} collection(s).")
+            if lexical_index is not None:
+                # Held across the check and the rebuild, so workers starting together rebuild it once
+                with lexical_index.exclusive():
+                    if len(lexical_index) != self.count():
+                        self._rebuild_lexical_index()
         except Exception as e:
             logger.error(f"Failed to initialize ChromaDB client: {e}")
             raise RuntimeError(f"Error initializing ChromaDB client: {e}")
 
-    def add_document(self, text: str, embedding: List[float], metadata: Dict = {}) -> str:
+    def _open_collection(self, name: str):
+        collection = self.client.get_or_create_collection(name=name, configuration={"hnsw": dict(self.hnsw)})
+        current = (collection.configuration or {}).get("hnsw") or {}
+        fixed = {
+            key: current[key] for key in ("space", "max_neighbors", "ef_construction")
+            if current.get(key) is not None and current[key] != self.hnsw[key]
+        }
+        if fixed:
+            logger.warning(
+                f"Collection '{name}' keeps the HNSW settings it was created with ({fixed}); "
+                "re-import the data into a new store (e.g. through a snapshot) to change them."
+            )
+        # Takes effect because the index is only loaded into memory by the first query
+        if current.get("ef_search") != self.hnsw["ef_search"]:
+            collection.modify(configuration={"hnsw": {"ef_search": self.hnsw["ef_search"]}})
+        return collection
+
+    def index_settings(self) -> Dict[str, Any]:
+        """
+        Return the storage mode and the HNSW settings in effect, as reported by the first collection.
+        """
+        hnsw = (self.collections[0].configuration or {}).get("hnsw") or {}
+        return {
+            "persistent": self.persistent,
+            "server": self.server,
+            "space": hnsw.get("space"),
+            "m": hnsw.get("max_neighbors"),
+            "ef_construction": hnsw.get("ef_construction"),
+            "ef_search": hnsw.get("ef_search"),
+        }
+
+    def _rebuild_lexical_index(self, page_size: int = 1000) -> None:
+        logger.info("Lexical index is out of sync with the collection; rebuilding it.")
+        self.lexical_index.clear()
+        total = 0
+        for collection in self.collections:
+            offset = 0
+            while True:
+                page = collection.get(include=["documents"], limit=page_size, offset=offset)
+                if not page["ids"]:
+                    break
+                self.lexical_index.add(page["ids"], page["documents"])
+                offset += len(page["ids"])
+            total += offset
+        logger.info(f"Lexical index rebuilt with {total} documents.")
+
+    def _collection_name(self, shard: int) -> str:
+        # A single collection keeps the original name, so existing data stays readable
+        return COLLECTION_NAME if self.num_shards == 1 else f"{COLLECTION_NAME}_shard_{shard}_of_{self.num_shards}"
+
+    def count(self) -> int:
+        """
+        Return the number of stored documents, over all shards.
+        """
+        return sum(collection.count() for collection in self.collections)
+
+    def shard_of(self, doc_id: str, metadata: Optional[Dict] = None) -> int:
+        """
+        Return the shard a document is stored in.
+
+        Args:
+            doc_id (str): The document ID.
+            metadata (Optional[Dict]): The document metadata, used when sharding by a metadata key.
+
+        Returns:
+            int: The shard index, from 0 to `num_shards - 1`.
+        """
+        if self.num_shards == 1:
+            return 0
+        if self.shard_key is not None and metadata and metadata.get(self.shard_key) is not None:
+            return shard_index(str(metadata[self.shard_key]), self.num_shards)
+        return shard_index(doc_id, self.num_shards)
+
+    def close(self) -> None:
+        """
+        Stop the shard threads, close the lexical index and release the persistent directory.
+        """
+        if self._shard_pool is not None:
+            self._shard_pool.shutdown(wait=True)
+        if self.lexical_index is not None:
+            self.lexical_index.close()
+        if self._client_lock is not None:
+            self._client_lock.close()
+            self._client_lock = None
+
+    def _ids_by_shard(self, ids: Sequence[str]) -> Dict[int, List[str]]:
+        # With a metadata shard key the ID alone does not tell the shard, so look everywhere
+        if self.shard_key is not None:
+            return {shard: list(ids) for shard in range(self.num_shards)}
+        groups: Dict[int, List[str]] = {}
+        for doc_id in ids:
+            groups.setdefault(self.shard_of(doc_id), []).append(doc_id)
+        return groups
+
+    def _map_shards(self, func: Callable[[int, Any], Any], work: Dict[int, Any]) -> Dict[int, Any]:
+        """
+        Call `func(shard, item)` for each shard in `work`, concurrently when there are several.
+        """
+        if self._shard_pool is None or len(work) <= 1:
+            return {shard: func(shard, item) for shard, item in work.items()}
+        futures = {shard: self._shard_pool.submit(func, shard, item) for shard, item in work.items()}
+        return {shard: future.result() for shard, future in futures.items()}
+
+    @property
+    def version(self) -> int:
+        """
+        A number that grows after every successful write, used to detect stale cached data.
+
+        With a persistent store it is the modification time (ns) of a stamp file in the persist
+        directory, so writes made by other processes on the same directory (other API workers,
+        `tools/snapshot.py import`) are seen too; in memory it is a per-process counter.
+        """
+        if self._version_stamp is None:
+            return self._version
+        try:
+            return os.stat(self._version_stamp).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _bump_version(self) -> None:
+        with self._version_lock:
+            self._version += 1
+            if self._version_stamp is None:
+                return
+            try:
+                # Never move backwards, even if the clock does or two writes share a timestamp
+                stamp = max(time.time_ns(), self.version + 1)
+                with open(self._version_stamp, "a"):
+                    pass
+                os.utime(self._version_stamp, ns=(stamp, stamp))
+            except OSError as e:
+                logger.warning(f"Failed to update the data version stamp {self._version_stamp}: {e}")
+
+    def document_id(self, text: str, metadata: Optional[Dict] = None) -> str:
+        """
+        Return the content-addressed ID of a document.
+
+        Chunks (metadata with `parent_id` and `chunk_index`) also hash their parent and position,
+        so a passage shared by two documents is stored once per document.
+
+        Args:
+            text (str): The text content of the document.
+            metadata (Optional[Dict]): The document metadata; only `id_metadata_keys` and the
+                chunk keys are used.
+
+        Returns:
+            str: The same ID for the same normalized text and identity metadata.
+        """
+        keys = self.id_metadata_keys + tuple(key for key in CHUNK_ID_KEYS if metadata and key in metadata)
+        return content_id(text, metadata, keys)
+
+    def stored_metadatas(self, ids: List[str], batch_size: int = 1000) -> Dict[str, Dict]:
+        """
+        Return the stored metadata of the given IDs, without reading their texts or embeddings.
+
+        Args:
+            ids (List[str]): The IDs to look up.
+            batch_size (int): Maximum number of IDs per lookup.
+
+        Returns:
+            Dict[str, Dict]: The metadata of each stored ID; unknown IDs are left out.
+        """
+        found: Dict[str, Dict] = {}
+        try:
+            for start in range(0, len(ids), batch_size):
+                stored = self._map_shards(
+                    lambda shard, shard_ids: self.collections[shard].get(ids=shard_ids, include=["metadatas"]),
+                    self._ids_by_shard(ids[start:start + batch_size])
+                )
+                for page in stored.values():
+                    found.update(zip(page["ids"], (meta or {} for meta in page["metadatas"])))
+            return found
+        except Exception as e:
+            logger.error(f"Failed to look up document IDs in ChromaDB: {e}")
+            raise RuntimeError(f"Error looking up document IDs in ChromaDB: {e}")
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Return the stored embeddings of the given IDs.
+
+        Args:
+            ids (List[str]): The IDs to read.
+
+        Returns:
+            Dict[str, np.ndarray]: A float32 vector per stored ID; unknown IDs are left out.
+        """
+        if not ids:
+            return {}
+        try:
+            with timed("chroma_get"):
+                stored = self._map_shards(
+                    lambda shard, shard_ids: self.collections[shard].get(ids=shard_ids, include=["embeddings"]),
+                    self._ids_by_shard(ids)
+                )
+            return {
+                doc_id: np.asarray(embedding, dtype=np.float32)
+                for page in stored.values()
+                for doc_id, embedding in zip(page["ids"], page["embeddings"])
+            }
+        except Exception as e:
+            logger.error(f"Failed to read embeddings from ChromaDB: {e}")
+            raise RuntimeError(f"Error reading embeddings from ChromaDB: {e}")
+
+    def add_document(self, text: str, embedding: List[float], metadata: Dict = {}, doc_id: Optional[str] = None) -> str:
         """
-        Add a document to the ChromaDB collection.
+        Add a document to the ChromaDB collection, replacing a stored document with the same ID.
 
         Args:
             text (str): The text content of the document.
             embedding (List[float]): The embedding vector of the document.
-            metadata (Dict): Additional metadata to store with the document.
+            metadata (Dict): Additional metadata to store with the document. ISO date values also
+                get a numeric `<key>_ts` field so they can be range-filtered.
+            doc_id (Optional[str]): The document ID; defaults to its content-addressed ID.
 
         Returns:
-            str: The unique ID of the added document.
+            str: The ID of the document.
         """
         try:
-            doc_id = str(uuid.uuid4())
-            logger.info(f"Adding document with ID: {doc_id}")
-            self.collection.add(
-                ids=[doc_id],
-                documents=[text],
-                embeddings=[embedding],
-                metadatas=[metadata]
-            )
-            logger.info("Document added successfully.")
+            doc_id = doc_id or self.document_id(text, metadata)
+            logger.info("Adding document with ID: %s", doc_id, extra=HOT_PATH)
+            with timed("chroma_add"):
+                self.collections[self.shard_of(doc_id, metadata)].upsert(
+                    ids=[doc_id],
+                    documents=[text],
+                    embeddings=[embedding],
+                    metadatas=[with_date_timestamps(metadata)]
+                )
+            if self.lexical_index is not None:
+                with timed("lexical_add"):
+                    self.lexical_index.add([doc_id], [text])
+            self._bump_version()
+            logger.info("Document added successfully.", extra=HOT_PATH)
             return doc_id
         except Exception as e:
             logger.error(f"Failed to add document to ChromaDB: {e}")
             raise RuntimeError(f"Error adding document to ChromaDB: {e}")
 
-    def search(self, query_embedding: List[float], n_results: int = 5) -> Dict[str, Any]:
+    def add_documents(
+        self,
+        texts: List[str],
+        embeddings: Union[List[List[float]], np.ndarray],
+        metadatas: Optional[List[Dict]] = None,
+        batch_size: int = 1000,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Add many documents to the ChromaDB collection, writing them in chunks.
+
+        Each chunk of up to `batch_size` documents is stored with a single
+        `collection.upsert` call instead of one call per document. A float32 array of embeddings is
+        sliced and handed to Chroma as is, without converting it to nested lists. Documents with an
+        ID that is already stored replace it, and repeated IDs within the call are written once.
+        When sharded, each round of `batch_size` documents per shard is split by shard and the
+        shards are written in parallel.
+
+        Args:
+            texts (List[str]): The text content of the documents.
+            embeddings (Union[List[List[float]], np.ndarray]): The embedding vectors, one per text.
+            metadatas (Optional[List[Dict]]): Metadata to store with each document. ISO date values
+                also get a numeric `<key>_ts` field so they can be range-filtered.
+            batch_size (int): Maximum number of documents per `collection.upsert` call.
+            ids (Optional[List[str]]): The document IDs; default to their content-addressed IDs.
+
+        Returns:
+            List[str]: The IDs of the documents, in input order.
+
+        Raises:
+            ValueError: If the input lists have different lengths or batch_size is invalid.
+        """
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+        if not (len(texts) == len(embeddings) == len(metadatas)) or (ids is not None and len(ids) != len(texts)):
+            logger.error("Texts, embeddings, metadatas and ids must have the same length.")
+            raise ValueError("Texts, embeddings, metadatas and ids must have the same length.")
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer.")
+        if not texts:
+            return []
+
+        all_ids = list(ids) if ids is not None else [
+            self.document_id(text, metadata) for text, metadata in zip(texts, metadatas)
+        ]
+        # Chroma rejects repeated IDs in one call; keep the first occurrence of each
+        first = {}
+        for idx, doc_id in enumerate(all_ids):
+            first.setdefault(doc_id, idx)
+        if len(first) < len(all_ids):
+            keep = sorted(first.values())
+            texts = [texts[idx] for idx in keep]
+            metadatas = [metadatas[idx] for idx in keep]
+            embeddings = embeddings[keep] if isinstance(embeddings, np.ndarray) else [embeddings[idx] for idx in keep]
+            doc_ids = [all_ids[idx] for idx in keep]
+        else:
+            doc_ids = all_ids
+        metadatas = [with_date_timestamps(metadata) for metadata in metadatas]
+        try:
+            logger.info("Adding %d documents in chunks of %d.", len(texts), batch_size, extra=HOT_PATH)
+            round_size = batch_size * self.num_shards
+            for start in range(0, len(texts), round_size):
+                end = start + round_size
+                rows: Dict[int, List[int]] = {}
+                for idx in range(start, min(end, len(texts))):
+                    rows.setdefault(self.shard_of(doc_ids[idx], metadatas[idx]), []).append(idx)
+
+                def write(shard: int, shard_rows: List[int]) -> None:
+                    for chunk_start in range(0, len(shard_rows), batch_size):
+                        chunk = shard_rows[chunk_start:chunk_start + batch_size]
+                        if self.num_shards == 1:
+                            # Contiguous rows: slice, so arrays are passed without a copy
+                            chunk_embeddings = embeddings[chunk[0]:chunk[-1] + 1]
+                        elif isinstance(embeddings, np.ndarray):
+                            chunk_embeddings = embeddings[chunk]
+                        else:
+                            chunk_embeddings = [embeddings[idx] for idx in chunk]
+                        self.collections[shard].upsert(
+                            ids=[doc_ids[idx] for idx in chunk],
+                            documents=[texts[idx] for idx in chunk],
+                            embeddings=chunk_embeddings,
+                            metadatas=[metadatas[idx] for idx in chunk]
+                        )
+
+                with timed("chroma_add"):
+                    self._map_shards(write, rows)
+                if self.lexical_index is not None:
+                    with timed("lexical_add"):
+                        self.lexical_index.add(doc_ids[start:end], texts[start:end])
+                self._bump_version()
+            logger.info("Documents added successfully.", extra=HOT_PATH)
+            return all_ids
+        except Exception as e:
+            logger.error(f"Failed to add documents to ChromaDB: {e}")
+            raise RuntimeError(f"Error adding documents to ChromaDB: {e}")
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]) -> None:
+        """
+        Replace the metadata of stored documents, keeping their texts and embeddings.
+
+        Args:
+            ids (List[str]): The IDs of stored documents.
+            metadatas (List[Dict]): The new metadata of each document.
+
+        Raises:
+            RuntimeError: If the update fails.
+        """
+        if not ids:
+            return
+        try:
+            rows: Dict[int, List[int]] = {}
+            for idx, (doc_id, metadata) in enumerate(zip(ids, metadatas)):
+                rows.setdefault(self.shard_of(doc_id, metadata), []).append(idx)
+            with timed("chroma_add"):
+                self._map_shards(
+                    lambda shard, shard_rows: self.collections[shard].update(
+                        ids=[ids[idx] for idx in shard_rows],
+                        metadatas=[with_date_timestamps(metadatas[idx]) for idx in shard_rows]
+                    ),
+                    rows
+                )
+            self._bump_version()
+        except Exception as e:
+            logger.error(f"Failed to update document metadata in ChromaDB: {e}")
+            raise RuntimeError(f"Error updating document metadata in ChromaDB: {e}")
+
+    def backfill_date_timestamps(self, page_size: int = 1000) -> int:
+        """
+        Add the missing `<key>_ts` fields to documents stored before date range filters existed,
+        so the filters match them too. Texts and embeddings are kept.
+
+        Args:
+            page_size (int): Number of documents read per page.
+
+        Returns:
+            int: The number of documents updated.
+
+        Raises:
+            RuntimeError: If reading or updating fails.
+        """
+        updated = 0
+        try:
+            for collection in self.collections:
+                offset = 0
+                while True:
+                    page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+                    if not page["ids"]:
+                        break
+                    changed = [
+                        (doc_id, with_date_timestamps(meta))
+                        for doc_id, meta in zip(page["ids"], page["metadatas"])
+                        if meta and with_date_timestamps(meta) != meta
+                    ]
+                    if changed:
+                        collection.update(ids=[doc_id for doc_id, _ in changed], metadatas=[meta for _, meta in changed])
+                        updated += len(changed)
+                    offset += len(page["ids"])
+        except Exception as e:
+            logger.error(f"Failed to backfill date timestamps in ChromaDB: {e}")
+            raise RuntimeError(f"Error backfilling date timestamps in ChromaDB: {e}")
+        if updated:
+            self._bump_version()
+        logger.info(f"Backfilled date timestamps of {updated} documents.")
+        return updated
+
+    def search(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        n_results: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Search for similar documents in the ChromaDB collection.
 
         Args:
-            query_embedding (List[float]): The embedding vector to search for.
+            query_embedding (Union[List[float], np.ndarray]): The embedding vector to search for.
             n_results (int): The number of top results to return.
+            filters (Optional[Dict[str, Any]]): Metadata filters (see `app.filters.build_where`),
+                applied inside the index so the page is filled with matching documents only.
 
         Returns:
-            Dict[str, Any]: A dictionary containing the matched documents, distances, and metadata.
+            Dict[str, Any]: A dictionary containing the matched IDs, parent document IDs, documents,
+            distances, and metadata (without the `<key>_ts` filter fields). Chunks of the same
+            document share a parent ID; documents stored without chunking are their own parent.
+
+        Raises:
+            ValueError: If the filters are malformed.
         """
+        where = build_where(filters)
         try:
-            logger.info(f"Searching for top {n_results} similar documents.")
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results
-            )
-            logger.info("Search completed successfully.")
+            logger.info("Searching for top %d similar documents.", n_results, extra=HOT_PATH)
+            if isinstance(query_embedding, np.ndarray):
+                query_embeddings = query_embedding.reshape(1, -1)
+            else:
+                query_embeddings = [query_embedding]
+            with timed("chroma_query"):
+                shard_results = self._map_shards(
+                    lambda shard, _: self.collections[shard].query(
+                        query_embeddings=query_embeddings,
+                        n_results=n_results,
+                        where=where
+                    ),
+                    {shard: None for shard in range(self.num_shards)}
+                )
+            logger.info("Search completed successfully.", extra=HOT_PATH)
+            results = shard_results[0] if self.num_shards == 1 else self._merge_top_k(shard_results, n_results)
+            ids = results.get("ids") or []
+            metadatas = self._client_metadatas(results.get("metadatas") or [[] for _ in ids])
             return {
+                "ids": ids,
+                "parent_ids": self._parent_ids(ids, metadatas),
                 "documents": results.get("documents", []),
                 "distances": results.get("distances", []),
-                "metadatas": results.get("metadatas", [])
+                "metadatas": metadatas
             }
         except Exception as e:
             logger.error(f"Failed to search in ChromaDB: {e}")
-            raise RuntimeError(f"Error searching in ChromaDB: {e}")
\ No newline at end of file
+            raise RuntimeError(f"Error searching in ChromaDB: {e}")
+
+    def lexical_search(self, query: str, n_results: int = 5, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Search for documents containing the query terms, ranked by BM25.
+
+        Args:
+            query (str): The query text.
+            n_results (int): The number of top results to return.
+            filters (Optional[Dict[str, Any]]): Metadata filters, as in `search`. The BM25 ranking is
+                read in growing windows until the page is full of matching documents.
+
+        Returns:
+            Dict[str, Any]: The same structure as `search`, with BM25 `scores` (higher is better)
+            instead of distances.
+
+        Raises:
+            ValueError: If the filters are malformed.
+            RuntimeError: If no lexical index is configured or the lookup fails.
+        """
+        if self.lexical_index is None:
+            raise RuntimeError("Lexical search requires a lexical index.")
+        where = build_where(filters)
+        try:
+            logger.info("Lexical search for top %d documents.", n_results, extra=HOT_PATH)
+            with timed("lexical_search"):
+                window = n_results if where is None else n_results * 4
+                while True:
+                    ranked = self.lexical_index.search(query, window)
+                    found = {}
+                    if ranked:
+                        stored = self._map_shards(
+                            lambda shard, shard_ids: self.collections[shard].get(
+                                ids=shard_ids, where=where, include=["documents", "metadatas"]
+                            ),
+                            self._ids_by_shard([doc_id for doc_id, _ in ranked])
+                        )
+                        found = {
+                            doc_id: (doc, meta)
+                            for page in stored.values()
+                            for doc_id, doc, meta in zip(page["ids"], page["documents"], page["metadatas"])
+                        }
+                    # Widen the window while filters leave the page short and the ranking has more to give
+                    if len(found) >= n_results or len(ranked) < window:
+                        break
+                    window *= 4
+            # Chroma returns the documents in no particular order; keep the BM25 ranking
+            ranked = [(doc_id, score) for doc_id, score in ranked if doc_id in found][:n_results]
+            ids = [[doc_id for doc_id, _ in ranked]]
+            metadatas = self._client_metadatas([[found[doc_id][1] for doc_id, _ in ranked]])
+            return {
+                "ids": ids,
+                "parent_ids": self._parent_ids(ids, metadatas),
+                "documents": [[found[doc_id][0] for doc_id, _ in ranked]],
+                "scores": [[score for _, score in ranked]],
+                "metadatas": metadatas
+            }
+        except Exception as e:
+            logger.error(f"Failed to run lexical search: {e}")
+            raise RuntimeError(f"Error running lexical search: {e}")
+
+    @staticmethod
+    def _merge_top_k(shard_results: Dict[int, Dict[str, Any]], n_results: int) -> Dict[str, Any]:
+        """
+        Merge per-shard query results into the global top `n_results` by distance.
+
+        Each shard's list is already sorted by distance, so a k-way heap merge reads only as many
+        entries as it returns.
+        """
+        keys = ("ids", "documents", "distances", "metadatas")
+        streams = []
+        for shard, results in shard_results.items():
+            distances = (results.get("distances") or [[]])[0]
+            streams.append([(distance, shard, position) for position, distance in enumerate(distances)])
+        best = list(itertools.islice(heapq.merge(*streams), n_results))
+        return {
+            key: [[shard_results[shard][key][0][position] for _, shard, position in best]]
+            for key in keys
+        }
+
+    @staticmethod
+    def _client_metadatas(metadatas: List[List[Optional[Dict]]]) -> List[List[Optional[Dict]]]:
+        # The `<key>_ts` fields only serve date range filters; clients get their metadata back as sent
+        return [[without_date_timestamps(meta) if meta else meta for meta in row] for row in metadatas]
+
+    @staticmethod
+    def _parent_ids(ids: List[List[str]], metadatas: List[List[Optional[Dict]]]) -> List[List[str]]:
+        return [
+            [(meta or {}).get("parent_id", doc_id) for doc_id, meta in zip(row_ids, row_metas)]
+            for row_ids, row_metas in zip(ids, metadatas)
+        ]
\ No newline at end of file
@@ -0,0 +1,84 @@
+from typing import Any, Dict, Iterable, Optional, Sequence
+import hashlib
+import json
+import unicodedata
+
+# Length of the hex content IDs (128 bits of SHA-256)
+CONTENT_ID_LENGTH = 32
+
+
+class ContentHasher:
+    """
+    Incremental hash of normalized text, for content-addressed document IDs.
+
+    Text can be fed in arbitrary pieces: whitespace runs are collapsed and each word is NFKC
+    normalized, so the digest does not depend on where the pieces were split, on line endings or
+    on repeated spaces.
+    """
+
+    def __init__(self):
+        self._hash = hashlib.sha256()
+        self._pending = ""
+
+    def update(self, text: str) -> None:
+        """
+        Add the next piece of text.
+        """
+        text = self._pending + text
+        words = text.split()
+        # The last word may continue in the next piece
+        self._pending = words.pop() if words and not text[-1].isspace() else ""
+        for word in words:
+            self._hash.update(unicodedata.normalize("NFKC", word).encode("utf-8") + b" ")
+
+    def hexdigest(self, metadata: Optional[Dict[str, Any]] = None, keys: Sequence[str] = ()) -> str:
+        """
+        Return the content ID of the text fed so far, plus the selected metadata values.
+
+        Args:
+            metadata (Optional[Dict[str, Any]]): The document metadata.
+            keys (Sequence[str]): Metadata keys that are part of the document identity.
+
+        Returns:
+            str: A hex digest of `CONTENT_ID_LENGTH` characters.
+        """
+        digest = self._hash.copy()
+        if self._pending:
+            digest.update(unicodedata.normalize("NFKC", self._pending).encode("utf-8") + b" ")
+        selected = {key: (metadata or {}).get(key) for key in sorted(keys)}
+        if selected:
+            digest.update(b"\x00" + json.dumps(selected, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        return digest.hexdigest()[:CONTENT_ID_LENGTH]
+
+
+def content_id(text: str, metadata: Optional[Dict[str, Any]] = None, keys: Sequence[str] = ()) -> str:
+    """
+    Return the content-addressed ID of a text and the selected metadata values.
+
+    Args:
+        text (str): The text content.
+        metadata (Optional[Dict[str, Any]]): The document metadata.
+        keys (Sequence[str]): Metadata keys that are part of the document identity.
+
+    Returns:
+        str: The same ID for the same normalized text and selected metadata.
+    """
+    return stream_content_id([text], metadata, keys)
+
+
+def stream_content_id(pieces: Iterable[str], metadata: Optional[Dict[str, Any]] = None, keys: Sequence[str] = ()) -> str:
+    """
+    Return the content-addressed ID of a text received as a stream of pieces.
+
+    Args:
+        pieces (Iterable[str]): Consecutive pieces of the text.
+        metadata (Optional[Dict[str, Any]]): The document metadata.
+        keys (Sequence[str]): Metadata keys that are part of the document identity.
+
+    Returns:
+        str: The same ID `content_id` returns for the whole text.
+    """
+    hasher = ContentHasher()
+    for piece in pieces:
+        hasher.update(piece)
+    return hasher.hexdigest(metadata, keys)
@@ -0,0 +1,467 @@
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import struct
+import threading
+import time
+import logging
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Wire format: every message is a 4-byte big-endian body length followed by the body.
+# Request body: op (1 byte), text count (4 bytes), batch size (4 bytes), one 4-byte UTF-8 length
+# per text, then the texts. Response body: status (1 byte), then for embeddings the row and column
+# counts (4 bytes each) and the little-endian float32 matrix, for info a JSON object, and for
+# errors the UTF-8 message.
+OP_ENCODE = 1
+OP_INFO = 2
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_LENGTH = struct.Struct("!I")
+_REQUEST = struct.Struct("!BII")
+_STATUS = struct.Struct("!B")
+_SHAPE = struct.Struct("!II")
+_WIRE_DTYPE = np.dtype("<f4")
+
+# Largest message accepted in either direction
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """
+    Parse an embedding server address into a socket family and address.
+
+    Args:
+        address (str): `unix:/path/to.sock` for a Unix domain socket, or `host:port` for TCP.
+
+    Returns:
+        Tuple[int, Any]: The socket family and the address to bind or connect to.
+
+    Raises:
+        ValueError: If the address is malformed or Unix sockets are not available.
+    """
+    if address.startswith("unix:"):
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Unix domain sockets are not available on this platform; use host:port.")
+        path = address[len("unix:"):]
+        if not path:
+            raise ValueError("Unix socket address needs a path, e.g. unix:/tmp/rag-embeddings.sock.")
+        return socket.AF_UNIX, path
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid embedding server address '{address}'. Use unix:/path or host:port.")
+    return socket.AF_INET6 if ":" in host else socket.AF_INET, (host.strip("[]"), int(port))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Connection closed by peer.")
+        received += count
+    return buffer
+
+
+def _recv_message(sock: socket.socket) -> bytearray:
+    (size,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message of {size} bytes exceeds the {MAX_MESSAGE_BYTES} byte limit.")
+    return _recv_exact(sock, size)
+
+
+def _send_message(sock: socket.socket, *parts: bytes) -> None:
+    size = sum(len(part) for part in parts)
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message of {size} bytes exceeds the {MAX_MESSAGE_BYTES} byte limit.")
+    sock.sendall(_LENGTH.pack(size) + (parts[0] if parts else b""))
+    for part in parts[1:]:
+        sock.sendall(part)
+
+
+def encode_request(texts: List[str], batch_size: int) -> bytes:
+    """
+    Build the body of an encode request.
+    """
+    encoded = [text.encode("utf-8") for text in texts]
+    lengths = struct.pack(f"!{len(encoded)}I", *(len(text) for text in encoded))
+    return _REQUEST.pack(OP_ENCODE, len(encoded), batch_size) + lengths + b"".join(encoded)
+
+
+def decode_request(body: bytearray) -> Tuple[int, List[str], int]:
+    """
+    Parse a request body into its op, texts and batch size.
+    """
+    op, count, batch_size = _REQUEST.unpack_from(body)
+    offset = _REQUEST.size
+    lengths = struct.unpack_from(f"!{count}I", body, offset)
+    offset += 4 * count
+    if offset + sum(lengths) != len(body):
+        raise ValueError("Malformed request: text lengths do not match the message size.")
+    texts = []
+    for length in lengths:
+        texts.append(bytes(body[offset:offset + length]).decode("utf-8"))
+        offset += length
+    return op, texts, batch_size
+
+
+class EmbeddingClient:
+    """
+    Embedding backend that sends texts to a shared embedding server instead of loading a model.
+
+    Each API worker keeps a few persistent connections to the server (see `tools/embedding_server.py`),
+    so many workers share one or two resident model copies. Vectors come back as raw float32
+    buffers and are wrapped into numpy arrays without parsing.
+    """
+
+    def __init__(self, address: str, timeout: float = 30.0, max_connections: int = 4):
+        """
+        Initialize the client; connections are opened on first use.
+
+        Args:
+            address (str): Server address, `unix:/path/to.sock` or `host:port`.
+            timeout (float): Seconds to wait for the server on connect and on each response.
+            max_connections (int): Maximum connections open at once; callers beyond it wait.
+        """
+        if max_connections < 1:
+            raise ValueError("max_connections must be a positive integer.")
+        self.address = address
+        self.family, self.sockaddr = parse_address(address)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle: "queue.LifoQueue[socket.socket]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._texts = 0
+        self._reconnects = 0
+        self._errors = 0
+
+    def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        Encode texts on the server.
+
+        Args:
+            texts (List[str]): The texts to encode.
+            batch_size (int): Number of texts per model forward pass on the server.
+
+        Returns:
+            np.ndarray: A float32 array of shape (len(texts), dimension).
+        """
+        body = self._request(encode_request(texts, batch_size))
+        rows, dimension = _SHAPE.unpack_from(body, _STATUS.size)
+        offset = _STATUS.size + _SHAPE.size
+        if len(body) - offset != rows * dimension * _WIRE_DTYPE.itemsize:
+            raise RuntimeError("Malformed response from the embedding server.")
+        with self._stats_lock:
+            self._texts += len(texts)
+        # The receive buffer is owned by this call, so the array views it without a copy
+        embeddings = np.frombuffer(body, dtype=_WIRE_DTYPE, offset=offset).reshape(rows, dimension)
+        return embeddings.astype(np.float32, copy=False)
+
+    def info(self) -> Dict[str, Any]:
+        """
+        Return the model name, backend, dimension and process ID of the server worker that answered.
+        """
+        body = self._request(_REQUEST.pack(OP_INFO, 0, 0))
+        return json.loads(bytes(body[_STATUS.size:]).decode("utf-8"))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return request counters and the number of idle connections.
+        """
+        with self._stats_lock:
+            return {
+                "address": self.address,
+                "requests": self._requests,
+                "texts": self._texts,
+                "reconnects": self._reconnects,
+                "errors": self._errors,
+                "idle_connections": self._idle.qsize(),
+                "max_connections": self.max_connections,
+            }
+
+    def close(self) -> None:
+        """
+        Close the idle connections.
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.sockaddr)
+        except OSError:
+            sock.close()
+            raise
+        if self.family != getattr(socket, "AF_UNIX", None):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _request(self, body: bytes) -> bytearray:
+        with self._slots:
+            while True:
+                try:
+                    sock = self._idle.get_nowait()
+                except queue.Empty:
+                    sock = None
+                reused = sock is not None
+                try:
+                    if sock is None:
+                        sock = self._connect()
+                    _send_message(sock, body)
+                    response = _recv_message(sock)
+                except OSError as e:
+                    if sock is not None:
+                        sock.close()
+                    # Pooled connections to a restarted server worker are closed: retry until a new one is used
+                    if reused and isinstance(e, ConnectionError):
+                        with self._stats_lock:
+                            self._reconnects += 1
+                        continue
+                    with self._stats_lock:
+                        self._errors += 1
+                    raise RuntimeError(f"Embedding server at {self.address} unavailable: {e}")
+                except BaseException:
+                    # E.g. a malformed response: the connection is in an unknown state, never reuse it
+                    if sock is not None:
+                        sock.close()
+                    with self._stats_lock:
+                        self._errors += 1
+                    raise
+                self._idle.put(sock)
+                break
+        with self._stats_lock:
+            self._requests += 1
+        (status,) = _STATUS.unpack_from(response)
+        if status != STATUS_OK:
+            with self._stats_lock:
+                self._errors += 1
+            raise RuntimeError(f"Embedding server error: {bytes(response[_STATUS.size:]).decode('utf-8', 'replace')}")
+        return response
+
+
+class _RequestBatcher:
+    """
+    Runs the model for one server worker, coalescing small requests from different connections.
+
+    Requests are taken whole: the first waiting request is joined by the ones that arrive within
+    `max_wait_ms`, while the total stays within `max_batch_size` texts. Larger requests (bulk
+    ingestion) run alone with their own batch size.
+    """
+
+    def __init__(self, embedding_generator, max_batch_size: int, max_wait_ms: float):
+        self.embedding_generator = embedding_generator
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-server-model", daemon=True)
+        self._thread.start()
+
+    def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        future: Future = Future()
+        self._queue.put((texts, batch_size, future))
+        return future.result()
+
+    def _run(self) -> None:
+        pending = None
+        while True:
+            batch = [pending if pending is not None else self._queue.get()]
+            pending = None
+            total = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while total < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if total + len(item[0]) > self.max_batch_size:
+                    # Too big to join: it starts the next batch
+                    pending = item
+                    break
+                batch.append(item)
+                total += len(item[0])
+
+            texts = [text for item in batch for text in item[0]]
+            # Coalesced requests fit in one forward pass; a single request keeps its own batch size
+            batch_size = batch[0][1] if len(batch) == 1 else total
+            try:
+                embeddings = self.embedding_generator.generate_embeddings(texts, batch_size=batch_size, as_numpy=True)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for item_texts, _, future in batch:
+                future.set_result(embeddings[start:start + len(item_texts)])
+                start += len(item_texts)
+
+
+def _serve_connection(conn: socket.socket, batcher: _RequestBatcher, info: bytes) -> None:
+    with conn:
+        while True:
+            try:
+                body = _recv_message(conn)
+            except OSError:
+                return
+            except ValueError as e:
+                logger.warning(f"Dropping connection: {e}")
+                return
+            try:
+                op, texts, batch_size = decode_request(body)
+                if op == OP_INFO:
+                    parts = (_STATUS.pack(STATUS_OK), info)
+                elif op == OP_ENCODE:
+                    embeddings = batcher.encode(texts, max(1, batch_size)) if texts else np.empty((0, 0))
+                    matrix = np.ascontiguousarray(embeddings, dtype=_WIRE_DTYPE)
+                    parts = (_STATUS.pack(STATUS_OK) + _SHAPE.pack(*matrix.shape), memoryview(matrix).cast("B"))
+                else:
+                    raise ValueError(f"Unknown op {op}.")
+            except Exception as e:
+                parts = (_STATUS.pack(STATUS_ERROR), str(e).encode("utf-8"))
+            try:
+                _send_message(conn, *parts)
+            except OSError:
+                return
+
+
+def _worker_main(listener: socket.socket, generator_kwargs: Dict[str, Any], max_batch_size: int, max_wait_ms: float) -> None:
+    # Imported here so the API workers, which only use EmbeddingClient, never load a model
+    from .embeddings import EmbeddingGenerator
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    embedding_generator = EmbeddingGenerator(**generator_kwargs)
+    dimension = embedding_generator.generate_embeddings(["warm-up"], as_numpy=True).shape[1]
+    info = json.dumps({
+        "model": embedding_generator.model_name,
+        "backend": embedding_generator.backend_name,
+        "dimension": dimension,
+        "pid": os.getpid(),
+    }).encode("utf-8")
+    batcher = _RequestBatcher(embedding_generator, max_batch_size, max_wait_ms)
+    logger.info(f"Embedding server worker {os.getpid()} ready (dimension={dimension}).")
+    while True:
+        conn, _ = listener.accept()
+        conn.settimeout(None)
+        threading.Thread(target=_serve_connection, args=(conn, batcher, info), daemon=True).start()
+
+
+class EmbeddingServer:
+    """
+    A pool of local processes, each holding one copy of the embedding model, behind one socket.
+
+    The parent process binds the socket and starts `workers` processes that all accept on it, so
+    connections are spread over them by the kernel. Each worker coalesces the requests of its
+    connections into shared model calls. Workers that exit are restarted.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        workers: int = 1,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        **generator_kwargs: Any
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            address (str): Address to listen on, `unix:/path/to.sock` or `host:port`.
+            workers (int): Number of model processes.
+            max_batch_size (int): Maximum texts of coalesced requests per model call.
+            max_wait_ms (float): Maximum time a worker waits for more requests to coalesce.
+            **generator_kwargs: Arguments of the `EmbeddingGenerator` each worker loads
+                (model_name, backend, onnx_model_dir, quantized, num_threads).
+        """
+        if workers < 1:
+            raise ValueError("workers must be a positive integer.")
+        if generator_kwargs.get("backend") == "remote":
+            raise ValueError("The embedding server needs a local backend ('torch' or 'onnx').")
+        self.address = address
+        self.family, self.sockaddr = parse_address(address)
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.generator_kwargs = generator_kwargs
+        self._stop = threading.Event()
+
+    def serve_forever(self) -> None:
+        """
+        Bind the socket, start the worker processes and keep them running until SIGINT or SIGTERM.
+        """
+        listener = self._bind()
+        context = multiprocessing.get_context("spawn")
+        args = (listener, self.generator_kwargs, self.max_batch_size, self.max_wait_ms)
+        processes: List[Optional[multiprocessing.Process]] = [None] * self.workers
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        logger.info(f"Embedding server listening on {self.address} with {self.workers} worker(s).")
+        try:
+            while not self._stop.is_set():
+                for index, process in enumerate(processes):
+                    if process is None or not process.is_alive():
+                        if process is not None:
+                            logger.warning(f"Embedding worker {process.pid} exited with code {process.exitcode}; restarting.")
+                        processes[index] = context.Process(target=_worker_main, args=args, daemon=True)
+                        processes[index].start()
+                self._stop.wait(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for process in processes:
+                if process is not None and process.is_alive():
+                    process.terminate()
+            for process in processes:
+                if process is not None:
+                    process.join(5)
+            listener.close()
+            if self.family == getattr(socket, "AF_UNIX", None) and os.path.exists(self.sockaddr):
+                os.unlink(self.sockaddr)
+            logger.info("Embedding server stopped.")
+
+    def stop(self) -> None:
+        """
+        Ask `serve_forever` to stop the workers and return.
+        """
+        self._stop.set()
+
+    def _bind(self) -> socket.socket:
+        listener = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == getattr(socket, "AF_UNIX", None):
+            if os.path.exists(self.sockaddr):
+                # A leftover from a previous run is removed, but a live server is not taken over
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    probe.connect(self.sockaddr)
+                    alive = True
+                except OSError:
+                    alive = False
+                finally:
+                    probe.close()
+                if alive:
+                    listener.close()
+                    raise RuntimeError(f"An embedding server is already listening on {self.address}.")
+                os.unlink(self.sockaddr)
+        else:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(self.sockaddr)
+        listener.listen(128)
+        return listener
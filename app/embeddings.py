@@ -1,40 +1,185 @@
-from sentence_transformers import SentenceTransformer, util
-from typing import List
+from typing import List, Optional, Union
+import json
+import os
 import logging
 
+import numpy as np
+
+from .concurrency import run_blocking
+from .logs import HOT_PATH
+from .metrics import EMBEDDED_TEXTS, timed
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+ONNX_TOKENIZER_FILE = "tokenizer.json"
+ONNX_CONFIG_FILE = "embedding_config.json"
+
+
+class SentenceTransformerBackend:
+    """
+    Embedding backend running the full PyTorch SentenceTransformer model.
+    """
+
+    def __init__(self, model_name: str, num_threads: int = 0):
+        # Imported here so the ONNX backend never pulls in torch
+        from sentence_transformers import SentenceTransformer
+
+        if num_threads > 0:
+            import torch
+            torch.set_num_threads(num_threads)
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True).astype(np.float32, copy=False)
+
+
+class OnnxBackend:
+    """
+    Embedding backend running an exported ONNX model with ONNX Runtime, without torch.
+
+    Tokenization uses the model's fast tokenizer (`tokenizer.json`), and mean pooling plus L2
+    normalization are applied here, reproducing the SentenceTransformer pipeline. The model
+    directory is created by `tools/export_onnx.py`.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, num_threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_file = os.path.join(model_dir, ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        tokenizer_file = os.path.join(model_dir, ONNX_TOKENIZER_FILE)
+        for path in (model_file, tokenizer_file):
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"'{path}' not found. Export the model first with: python tools/export_onnx.py --output {model_dir}"
+                )
+
+        config = {}
+        config_file = os.path.join(model_dir, ONNX_CONFIG_FILE)
+        if os.path.exists(config_file):
+            with open(config_file, encoding="utf-8") as f:
+                config = json.load(f)
+        self.normalize = config.get("normalize", True)
+        max_seq_length = config.get("max_seq_length", 256)
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_file)
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding(pad_id=config.get("pad_token_id", 0), pad_token=config.get("pad_token", "[PAD]"))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_file, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        batches = [self._encode_batch(texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)]
+        return np.concatenate(batches, axis=0)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over the real (non-padding) tokens
+        mask = attention_mask[:, :, None].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32, copy=False)
+
+
 class EmbeddingGenerator:
     """
-    A class responsible for generating embeddings using the SentenceTransformer model.
+    A class responsible for generating embeddings with a pluggable model backend.
+
+    The `torch` backend runs the SentenceTransformer model; the `onnx` backend runs an exported
+    (optionally int8-quantized) copy of it with ONNX Runtime and never imports torch. The `remote`
+    backend loads no model and sends the texts to a shared embedding server (`app.embedding_server`).
     """
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        backend: str = "torch",
+        onnx_model_dir: Optional[str] = None,
+        quantized: bool = False,
+        num_threads: int = 0,
+        server_address: Optional[str] = None,
+        server_timeout: float = 30.0,
+        server_connections: int = 4
+    ):
         """
-        Initialize the embedding generator by loading the SentenceTransformer model.
+        Initialize the embedding generator by loading the model.
 
         Args:
             model_name (str): The name of the SentenceTransformer model to load.
+            backend (str): `torch` (SentenceTransformer), `onnx` (ONNX Runtime) or `remote`
+                (embedding server).
+            onnx_model_dir (Optional[str]): Directory of the exported ONNX model (onnx backend only).
+            quantized (bool): Whether to load the int8-quantized ONNX model (onnx backend only).
+            num_threads (int): Number of CPU threads used by the model. 0 keeps the library default.
+            server_address (Optional[str]): Embedding server address, `unix:/path` or `host:port`
+                (remote backend only).
+            server_timeout (float): Seconds to wait for the embedding server (remote backend only).
+            server_connections (int): Maximum connections to the embedding server (remote backend only).
         """
+        self.model_name = model_name
+        self.backend_name = backend
         try:
-            logger.info(f"Loading SentenceTransformer model: {model_name}")
-            self.model = SentenceTransformer(model_name)
+            if backend == "torch":
+                logger.info(f"Loading SentenceTransformer model: {model_name}")
+                self.backend = SentenceTransformerBackend(model_name, num_threads)
+            elif backend == "onnx":
+                model_dir = onnx_model_dir or os.path.join("onnx_models", model_name)
+                logger.info(f"Loading ONNX model for '{model_name}' from {model_dir} (quantized={quantized})")
+                self.backend = OnnxBackend(model_dir, quantized, num_threads)
+            elif backend == "remote":
+                from .embedding_server import EmbeddingClient
+
+                if not server_address:
+                    raise ValueError("The remote backend needs the embedding server address.")
+                logger.info(f"Using the embedding server at {server_address} for '{model_name}'")
+                self.backend = EmbeddingClient(server_address, server_timeout, server_connections)
+                served_model = self.backend.info()["model"]
+                if served_model != model_name:
+                    raise ValueError(f"The embedding server runs '{served_model}', not '{model_name}'.")
+            else:
+                raise ValueError(f"Unknown embedding backend '{backend}'. Use 'torch', 'onnx' or 'remote'.")
             logger.info("Model loaded successfully.")
         except Exception as e:
             logger.error(f"Failed to load model '{model_name}': {e}")
             raise RuntimeError(f"Error loading model '{model_name}': {e}")
 
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def generate_embeddings(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        as_numpy: bool = False
+    ) -> Union[List[List[float]], np.ndarray]:
         """
         Generate embeddings for a list of input texts.
 
         Args:
             texts (List[str]): A list of strings to generate embeddings for.
+            batch_size (int): Number of texts per model forward pass.
+            as_numpy (bool): Return the model output as a contiguous float32 array instead of
+                nested Python lists, avoiding a per-value conversion and copy.
 
         Returns:
-            List[List[float]]: A list of embeddings, where each embedding is a list of floats.
+            Union[List[List[float]], np.ndarray]: A list of embeddings (lists of floats), or a
+            float32 array of shape (len(texts), dimension) when `as_numpy` is true.
 
         Raises:
             ValueError: If the input is not a list of strings or is empty.
@@ -45,13 +190,34 @@ class EmbeddingGenerator:
         
         if not texts:
             logger.warning("Received an empty list of texts. Returning an empty list of embeddings.")
-            return []
+            return np.empty((0, 0), dtype=np.float32) if as_numpy else []
 
         try:
-            logger.info(f"Generating embeddings for {len(texts)} texts.")
-            embeddings = self.model.encode(texts, convert_to_numpy=True).tolist()
-            logger.info("Embeddings generated successfully.")
-            return embeddings
+            logger.info("Generating embeddings for %d texts.", len(texts), extra=HOT_PATH)
+            with timed("embed"):
+                embeddings = np.ascontiguousarray(self.backend.encode(texts, batch_size), dtype=np.float32)
+            EMBEDDED_TEXTS.inc(len(texts))
+            logger.info("Embeddings generated successfully.", extra=HOT_PATH)
+            return embeddings if as_numpy else embeddings.tolist()
         except Exception as e:
             logger.error(f"Error generating embeddings: {e}")
-            raise RuntimeError(f"Error generating embeddings: {e}")
\ No newline at end of file
+            raise RuntimeError(f"Error generating embeddings: {e}")
+
+    async def agenerate_embeddings(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        as_numpy: bool = False
+    ) -> Union[List[List[float]], np.ndarray]:
+        """
+        Generate embeddings on the shared thread pool so the event loop is not blocked.
+
+        Args:
+            texts (List[str]): A list of strings to generate embeddings for.
+            batch_size (int): Number of texts per model forward pass.
+            as_numpy (bool): Return a float32 array instead of nested lists.
+
+        Returns:
+            Union[List[List[float]], np.ndarray]: The embeddings, as in `generate_embeddings`.
+        """
+        return await run_blocking(self.generate_embeddings, texts, batch_size, as_numpy)
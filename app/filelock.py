@@ -0,0 +1,107 @@
+from typing import IO, Optional
+import os
+import threading
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of this process are excluded
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """
+    An exclusive lock shared by the threads of this process and by other processes.
+
+    Other processes are excluded with an advisory `flock` on the lock file (POSIX only; elsewhere
+    only threads are excluded). The lock is reentrant within a thread.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the lock; the lock file is opened on first use.
+
+        Args:
+            path (str): Path of the lock file; created if missing. Its content is never used.
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file: Optional[IO[bytes]] = None
+        if fcntl is None:
+            logger.warning(f"File locks are not supported on this platform; {path} only locks this process.")
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Take the lock, waiting for it unless `blocking` is false.
+
+        Returns:
+            bool: Whether the lock was taken.
+        """
+        if not self._lock.acquire(blocking):
+            return False
+        if self._depth == 0:
+            try:
+                if self._file is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._file = open(self.path, "ab")
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._lock.release()
+                return False
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._lock.release()
+
+    def close(self) -> None:
+        """
+        Close the lock file. The lock must not be held.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def try_lock_file(path: str) -> Optional[IO[bytes]]:
+    """
+    Take an exclusive lock on a file without waiting, for as long as the returned file stays open.
+
+    Unlike `FileLock`, the lock is not tied to a thread: any thread may close the file to release it.
+
+    Args:
+        path (str): Path of the lock file; created if missing.
+
+    Returns:
+        Optional[IO[bytes]]: The open lock file, or None if another process holds the lock.
+    """
+    lock_file = open(path, "ab")
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+    return lock_file
@@ -0,0 +1,146 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import re
+
+# Suffix of the numeric companion field stored for every ISO date metadata value,
+# since ChromaDB range operators only compare numbers
+TIMESTAMP_SUFFIX = "_ts"
+
+OPERATORS = {
+    "eq": "$eq",
+    "ne": "$ne",
+    "in": "$in",
+    "nin": "$nin",
+    "gt": "$gt",
+    "gte": "$gte",
+    "lt": "$lt",
+    "lte": "$lte",
+}
+RANGE_OPERATORS = {"gt", "gte", "lt", "lte"}
+
+_ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(Z|[+-]\d{2}:?\d{2})?$")
+
+
+def parse_date(value: Any) -> Optional[float]:
+    """
+    Convert an ISO 8601 date or datetime string to a UTC epoch timestamp.
+
+    Args:
+        value (Any): The value to convert, e.g. "2024-05-01" or "2024-05-01T10:30:00Z".
+
+    Returns:
+        Optional[float]: The timestamp in seconds, or None if the value is not an ISO date.
+    """
+    if not isinstance(value, str) or not _ISO_DATE_RE.match(value.strip()):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def with_date_timestamps(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Return a copy of the metadata with a `<key>_ts` timestamp added for every ISO date value.
+
+    Args:
+        metadata (Optional[Dict[str, Any]]): Metadata as provided by the client.
+
+    Returns:
+        Dict[str, Any]: The metadata plus the timestamp fields used by date range filters.
+    """
+    metadata = dict(metadata or {})
+    for key, value in list(metadata.items()):
+        if key.endswith(TIMESTAMP_SUFFIX):
+            continue
+        timestamp = parse_date(value)
+        if timestamp is not None:
+            metadata[key + TIMESTAMP_SUFFIX] = timestamp
+    return metadata
+
+
+def without_date_timestamps(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Return a copy of stored metadata without the `<key>_ts` fields added by `with_date_timestamps`.
+
+    Args:
+        metadata (Optional[Dict[str, Any]]): Metadata as stored.
+
+    Returns:
+        Dict[str, Any]: The metadata as provided by the client.
+    """
+    metadata = dict(metadata or {})
+    for key, value in list(metadata.items()):
+        if parse_date(value) is not None:
+            metadata.pop(key + TIMESTAMP_SUFFIX, None)
+    return metadata
+
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Translate structured metadata filters into a ChromaDB `where` clause.
+
+    Each field maps either to a value (equality) or to a dict of operators: `eq`, `ne`, `in`,
+    `nin`, `gt`, `gte`, `lt`, `lte`. Range operators on ISO date strings are applied to the
+    field's `<key>_ts` timestamp. All conditions must hold.
+
+        {"contexto": "Exemplo", "source": {"in": ["a", "b"]}, "date": {"gte": "2024-01-01"}}
+
+    Args:
+        filters (Optional[Dict[str, Any]]): The filters, or None/empty for no filtering.
+
+    Returns:
+        Optional[Dict[str, Any]]: The `where` clause, or None when there is nothing to filter.
+
+    Raises:
+        ValueError: If a filter is malformed.
+    """
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise ValueError("Filters must be an object mapping metadata fields to conditions.")
+
+    conditions: List[Dict[str, Any]] = []
+    for field, condition in filters.items():
+        if not isinstance(field, str) or not field or field.startswith("$"):
+            raise ValueError(f"Invalid filter field: {field!r}.")
+        if not isinstance(condition, dict):
+            conditions.append({field: {"$eq": _check_scalar(field, condition)}})
+            continue
+        if not condition:
+            raise ValueError(f"Filter for '{field}' has no conditions.")
+        for op, value in condition.items():
+            if op not in OPERATORS:
+                raise ValueError(
+                    f"Unknown operator '{op}' for '{field}'. Use one of: {', '.join(OPERATORS)}."
+                )
+            if op in ("in", "nin"):
+                if not isinstance(value, list) or not value:
+                    raise ValueError(f"'{op}' for '{field}' must be a non-empty list.")
+                conditions.append({field: {OPERATORS[op]: [_check_scalar(field, item) for item in value]}})
+            elif op in RANGE_OPERATORS:
+                conditions.append(_range_condition(field, op, value))
+            else:
+                conditions.append({field: {OPERATORS[op]: _check_scalar(field, value)}})
+
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def _range_condition(field: str, op: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"'{op}' for '{field}' must be a number or an ISO date.")
+    if isinstance(value, str):
+        timestamp = parse_date(value)
+        if timestamp is None:
+            raise ValueError(f"'{op}' for '{field}' must be a number or an ISO date, got {value!r}.")
+        return {field + TIMESTAMP_SUFFIX: {OPERATORS[op]: timestamp}}
+    return {field: {OPERATORS[op]: value}}
+
+
+def _check_scalar(field: str, value: Any) -> Any:
+    if not isinstance(value, (str, int, float, bool)):
+        raise ValueError(f"Filter value for '{field}' must be a string, number or boolean.")
+    return value
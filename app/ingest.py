@@ -0,0 +1,192 @@
+from typing import BinaryIO, Dict, Any, Iterable, Iterator, List, Optional, Tuple
+import uuid
+import logging
+
+from .chunking import TextChunker, iter_text, iter_text_file
+from .dedup import content_id, stream_content_id
+from .filters import with_date_timestamps
+from .logs import HOT_PATH
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class DocumentIngestor:
+    """
+    Ingestion stage that chunks a document, embeds the chunks in batches and stores them.
+
+    Chunks are produced lazily and written every `write_batch_size` chunks, so memory use stays
+    flat regardless of the document size. Every chunk is stored as its own vector with metadata
+    linking it back to the parent document.
+
+    Chunk IDs are content-addressed (see `ChromaDBManager.document_id`) and chunks that are already
+    stored are skipped before embedding, so re-ingesting unchanged content costs no model time
+    and adds no copies; only their metadata is rewritten if it changed.
+    """
+
+    def __init__(
+        self,
+        embedding_generator,
+        db_manager,
+        chunker: TextChunker,
+        embedding_batch_size: int = 64,
+        write_batch_size: int = 1000
+    ):
+        """
+        Initialize the ingestor.
+
+        Args:
+            embedding_generator: The object used to embed chunks (e.g. EmbeddingGenerator).
+            db_manager: The object used to store chunks (e.g. ChromaDBManager).
+            chunker (TextChunker): Splits the incoming text into chunks.
+            embedding_batch_size (int): Number of chunks per model forward pass.
+            write_batch_size (int): Number of chunks embedded and written together.
+        """
+        if embedding_batch_size < 1 or write_batch_size < 1:
+            raise ValueError("Batch sizes must be positive integers.")
+        self.embedding_generator = embedding_generator
+        self.db_manager = db_manager
+        self.chunker = chunker
+        self.embedding_batch_size = embedding_batch_size
+        self.write_batch_size = write_batch_size
+
+    def ingest_text(self, text: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Chunk and store a document that is already in memory.
+
+        Args:
+            text (str): The text content of the document.
+            metadata (Dict[str, Any]): Metadata stored with every chunk.
+
+        Returns:
+            Dict[str, Any]: The parent document ID, the number of chunks and how many were skipped.
+        """
+        parent_id = content_id(text, metadata, self.db_manager.id_metadata_keys)
+        return self.ingest(iter_text(text), metadata, parent_id=parent_id)
+
+    def chunk_text(self, text: str, metadata: Dict[str, Any]) -> Tuple[str, List[str], List[Dict[str, Any]]]:
+        """
+        Split a document into the chunks `ingest_text` would store, without storing them.
+
+        Args:
+            text (str): The text content of the document.
+            metadata (Dict[str, Any]): Metadata stored with every chunk.
+
+        Returns:
+            Tuple[str, List[str], List[Dict[str, Any]]]: The parent document ID, the chunk texts
+            and their metadata.
+        """
+        parent_id = content_id(text, metadata, self.db_manager.id_metadata_keys)
+        chunks = list(self._chunks(iter_text(text), metadata, parent_id))
+        return parent_id, [chunk for chunk, _ in chunks], [chunk_metadata for _, chunk_metadata in chunks]
+
+    def ingest_file(self, file: BinaryIO, metadata: Dict[str, Any], read_size: int = 65536) -> Dict[str, Any]:
+        """
+        Chunk and store a UTF-8 text file as a stream.
+
+        A seekable file is read twice: first to compute its content-addressed ID, then to ingest it.
+
+        Args:
+            file (BinaryIO): The file to read.
+            metadata (Dict[str, Any]): Metadata stored with every chunk.
+            read_size (int): Number of bytes read at a time.
+
+        Returns:
+            Dict[str, Any]: The parent document ID, the number of chunks and how many were skipped.
+        """
+        parent_id = None
+        if file.seekable():
+            start = file.tell()
+            parent_id = stream_content_id(
+                iter_text_file(file, read_size=read_size), metadata, self.db_manager.id_metadata_keys
+            )
+            file.seek(start)
+        return self.ingest(iter_text_file(file, read_size=read_size), metadata, parent_id=parent_id)
+
+    def ingest(self, pieces: Iterable[str], metadata: Dict[str, Any], parent_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Chunk and store a document received as a stream of text pieces.
+
+        Args:
+            pieces (Iterable[str]): Consecutive pieces of the document text.
+            metadata (Dict[str, Any]): Metadata stored with every chunk.
+            parent_id (Optional[str]): ID of the document, e.g. its content hash. A random ID is
+                used when the stream cannot be hashed before ingestion.
+
+        Returns:
+            Dict[str, Any]: The parent document ID (`id`), the number of chunks (`chunks`) and how
+            many of them were already stored and skipped (`skipped`).
+
+        Raises:
+            ValueError: If the document contains no text.
+        """
+        parent_id = parent_id or str(uuid.uuid4())
+        logger.info("Ingesting document %s in chunks of %d characters.", parent_id, self.chunker.chunk_size, extra=HOT_PATH)
+
+        total = skipped = 0
+        texts: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        for chunk, chunk_metadata in self._chunks(pieces, metadata, parent_id):
+            texts.append(chunk)
+            metadatas.append(chunk_metadata)
+            if len(texts) >= self.write_batch_size:
+                skipped += self.store(texts, metadatas)["skipped"]
+                total += len(texts)
+                texts, metadatas = [], []
+        if texts:
+            skipped += self.store(texts, metadatas)["skipped"]
+            total += len(texts)
+
+        if not total:
+            raise ValueError("Text input cannot be empty.")
+        logger.info("Document %s: %d chunks, %d already stored.", parent_id, total, skipped, extra=HOT_PATH)
+        return {"id": parent_id, "chunks": total, "skipped": skipped}
+
+    def store(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Embed and upsert documents, skipping those whose content is already stored.
+
+        A stored document whose metadata differs (in keys outside its identity) keeps its
+        embedding and gets the new metadata.
+
+        Args:
+            texts (List[str]): The text content of the documents.
+            metadatas (List[Dict[str, Any]]): Metadata to store with each document.
+
+        Returns:
+            Dict[str, Any]: The content-addressed `ids` of all documents and whether each one was
+            embedded and written (`written`; false if it was already stored or repeated), both in
+            input order, plus the `added`, `skipped` and metadata-only `updated` counts.
+        """
+        ids = [self.db_manager.document_id(text, metadata) for text, metadata in zip(texts, metadatas)]
+        stored = self.db_manager.stored_metadatas(list(dict.fromkeys(ids)))
+        new = {}
+        changed = {}
+        for idx, doc_id in enumerate(ids):
+            if doc_id in new or doc_id in changed:
+                continue
+            if doc_id not in stored:
+                new[doc_id] = idx
+            elif stored[doc_id] != with_date_timestamps(metadatas[idx]):
+                changed[doc_id] = idx
+        if changed:
+            self.db_manager.update_metadatas(list(changed), [metadatas[idx] for idx in changed.values()])
+        if new:
+            rows = list(new.values())
+            new_texts = [texts[idx] for idx in rows]
+            embeddings = self.embedding_generator.generate_embeddings(
+                new_texts, batch_size=self.embedding_batch_size, as_numpy=True
+            )
+            self.db_manager.add_documents(
+                new_texts, embeddings, [metadatas[idx] for idx in rows],
+                batch_size=self.write_batch_size, ids=list(new)
+            )
+        written = [new.get(doc_id) == idx for idx, doc_id in enumerate(ids)]
+        return {
+            "ids": ids, "written": written, "added": len(new), "skipped": len(ids) - len(new), "updated": len(changed)
+        }
+
+    def _chunks(self, pieces: Iterable[str], metadata: Dict[str, Any], parent_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for chunk_index, chunk in enumerate(self.chunker.chunks(pieces)):
+            yield chunk, {**metadata, "parent_id": parent_id, "chunk_index": chunk_index}
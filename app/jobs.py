@@ -0,0 +1,550 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+
+from .filelock import FileLock
+from .logs import HOT_PATH
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# A job holds either one document to chunk (/add_document) or pre-chunked documents stored whole (/add_documents)
+KIND_DOCUMENT = "document"
+KIND_DOCUMENTS = "documents"
+
+# The journal is rewritten with only the live state once it grows past this size and the queue is idle
+JOURNAL_COMPACT_BYTES = 16 * 1024 * 1024
+
+# How often the worker looks for jobs submitted by other processes, and tries to take over the
+# queue when another process owns it
+POLL_SECONDS = 0.2
+
+
+class IngestQueueFull(RuntimeError):
+    """
+    Raised when a job does not fit in the ingest queue; the client should retry later.
+    """
+
+
+class IngestJob:
+    """
+    An ingestion job: the items still to be stored and the result of each processed item.
+    """
+
+    def __init__(self, job_id: str, kind: str, total: int, created_at: float):
+        self.id = job_id
+        self.kind = kind
+        self.total = total
+        self.status = JOB_QUEUED
+        self.created_at = created_at
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Pending items by input index, as (text, metadata)
+        self.items: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+        # Results by input index: id, error, skipped and, for chunked documents, chunks
+        self.results: Dict[int, Dict[str, Any]] = {}
+
+    def finish_if_done(self) -> bool:
+        """
+        Mark the job finished once every item has a result; it fails only if every item failed.
+        """
+        if self.items or len(self.results) < self.total:
+            return False
+        failed = sum(1 for result in self.results.values() if result.get("error"))
+        self.status = JOB_FAILED if failed == self.total else JOB_COMPLETED
+        self.finished_at = time.time()
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        results = [self.results[index] for index in sorted(self.results)]
+        failed = sum(1 for result in results if result.get("error"))
+        skipped = sum(1 for result in results if result.get("skipped"))
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total": self.total,
+            "processed": len(results),
+            "added": len(results) - failed - skipped,
+            "skipped": skipped,
+            "failed": failed,
+            "results": results,
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "op": "job",
+            "id": self.id,
+            "kind": self.kind,
+            "total": self.total,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "items": [[index, text, metadata] for index, (text, metadata) in sorted(self.items.items())],
+            "results": [self.results[index] for index in sorted(self.results)],
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "IngestJob":
+        job = cls(record["id"], record["kind"], record["total"], record["created_at"])
+        job.status = record.get("status", JOB_QUEUED)
+        job.started_at = record.get("started_at")
+        job.finished_at = record.get("finished_at")
+        job.items = {index: (text, metadata) for index, text, metadata in record.get("items", [])}
+        job.results = {result["index"]: result for result in record.get("results", [])}
+        return job
+
+
+class IngestJobQueue:
+    """
+    A journaled queue of ingestion jobs, drained by one background worker.
+
+    Submitting a job returns its ID at once. The worker takes items from the head of the queue,
+    across jobs, until about `batch_size` texts are gathered (waiting up to `coalesce_ms` for more),
+    and stores them with one embedding call and one write. Jobs are rejected with `IngestQueueFull`
+    while `max_items` items are pending.
+
+    Every job and its progress are appended to a JSON-lines journal, so queued and partially
+    processed jobs resume after a restart; re-storing an item is harmless because document IDs are
+    content-addressed. Finished jobs stay queryable until `retention` newer ones have finished.
+
+    Several processes (API workers) can share one journal. Appends and compactions hold a file
+    lock, and each process follows the journal to answer `get` for jobs submitted anywhere. Only
+    the process holding the owner lock processes items; when it stops or dies, another one takes
+    over within `POLL_SECONDS` and resumes the unfinished jobs. File locks need a POSIX system.
+    """
+
+    def __init__(
+        self,
+        ingestor,
+        journal_path: str,
+        max_items: int = 100000,
+        batch_size: int = 2000,
+        coalesce_ms: float = 50.0,
+        retention: int = 1000,
+        fsync: bool = True
+    ):
+        """
+        Initialize the queue, load the journal and start the worker thread.
+
+        Args:
+            ingestor: The object that chunks and stores documents (DocumentIngestor).
+            journal_path (str): Path of the journal file; created if missing.
+            max_items (int): Maximum pending items before new jobs are rejected.
+            batch_size (int): Target number of texts (documents or chunks) per coalesced write.
+            coalesce_ms (float): Maximum time the worker waits for more items to fill a batch.
+            retention (int): Number of finished jobs kept for status queries.
+            fsync (bool): Sync the journal to disk before acknowledging a job.
+        """
+        if max_items < 1 or batch_size < 1:
+            raise ValueError("max_items and batch_size must be positive integers.")
+        self.ingestor = ingestor
+        self.journal_path = journal_path
+        self.max_items = max_items
+        self.batch_size = batch_size
+        self.coalesce = coalesce_ms / 1000.0
+        self.retention = retention
+        self.fsync = fsync
+
+        self._jobs: Dict[str, IngestJob] = {}
+        self._finished: Deque[str] = deque()
+        # Only filled while this process owns the queue: pending (job ID, item index) pairs in
+        # submission order, and their estimated text count
+        self._pending: Deque[Tuple[str, int]] = deque()
+        self._pending_texts = 0
+        self._owner = False
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._batches = 0
+        self._texts = 0
+        self._rejected = 0
+
+        self._file_lock = FileLock(journal_path + ".lock")
+        self._owner_lock = FileLock(journal_path + ".owner")
+        self._journal = None
+        self._journal_inode: Optional[int] = None
+        self._journal_offset = 0
+        self._journal_partial = False
+
+        directory = os.path.dirname(journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._condition, self._file_lock:
+            self._load()
+        self._thread = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+        self._thread.start()
+        logger.info(f"Ingest queue started ({self._queued_items()} items pending in the journal).")
+
+    def submit(
+        self, kind: str, documents: Sequence[Tuple[str, Dict[str, Any]]], errors: Optional[Dict[int, str]] = None
+    ) -> Tuple[str, str]:
+        """
+        Queue a job and return its ID and status once it is journaled.
+
+        Args:
+            kind (str): `document` (chunked like /add_document) or `documents` (stored whole).
+            documents (Sequence[Tuple[str, Dict[str, Any]]]): The (text, metadata) of each item.
+            errors (Optional[Dict[int, str]]): Validation errors by index; those items are not
+                queued and are reported as failed.
+
+        Returns:
+            Tuple[str, str]: The job ID and its status when queued (`queued`, or `failed` if every
+            item had an error).
+
+        Raises:
+            ValueError: If the kind is unknown or there are no documents.
+            IngestQueueFull: If the queue has no room for the job.
+        """
+        if kind not in (KIND_DOCUMENT, KIND_DOCUMENTS):
+            raise ValueError(f"Unknown job kind '{kind}'.")
+        if not documents:
+            raise ValueError("A job needs at least one document.")
+        errors = errors or {}
+        job = IngestJob(uuid.uuid4().hex, kind, len(documents), time.time())
+        job.items = {index: document for index, document in enumerate(documents) if index not in errors}
+        job.results = {index: {"index": index, "id": None, "error": error, "skipped": False} for index, error in errors.items()}
+        job.finish_if_done()
+
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("The ingest queue is stopped.")
+            with self._file_lock:
+                self._refresh()
+                # A job larger than the whole queue is still accepted when the queue is empty
+                queued = self._queued_items()
+                if queued and queued + len(job.items) > self.max_items:
+                    self._rejected += 1
+                    raise IngestQueueFull(f"The ingest queue is full ({queued} items pending); retry later.")
+                self._write([job.to_record()], sync=self.fsync)
+                self._add_job(job)
+            # Read before the worker can pick the job up
+            status, items = job.status, len(job.items)
+            self._condition.notify()
+        logger.info("Queued ingest job %s with %d items.", job.id, items, extra=HOT_PATH)
+        return job.id, status
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the status, counts and per-item results of a job, or None if it is unknown.
+        """
+        with self._condition:
+            self._refresh()
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the queue depth, job counts by status and the coalesced batch sizes so far.
+        """
+        with self._condition:
+            self._refresh()
+            statuses: Dict[str, int] = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            return {
+                "owner": self._owner,
+                "pending_items": self._queued_items(),
+                "max_items": self.max_items,
+                "jobs": statuses,
+                "batches": self._batches,
+                "texts": self._texts,
+                "mean_batch_texts": (self._texts / self._batches) if self._batches else 0.0,
+                "rejected": self._rejected,
+            }
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """
+        Stop the worker after the batch in progress; pending items stay in the journal, for
+        another process or the next start.
+
+        Args:
+            timeout (float): Maximum time in seconds to wait for the worker to finish.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        logger.info("Ingest queue stopped.")
+
+    def _estimate_texts(self, kind: str, text: str) -> int:
+        if kind == KIND_DOCUMENTS:
+            return 1
+        chunk_size = getattr(getattr(self.ingestor, "chunker", None), "chunk_size", 0)
+        return len(text) // chunk_size + 1 if chunk_size else 1
+
+    def _queued_items(self) -> int:
+        return sum(len(job.items) for job in self._jobs.values() if job.finished_at is None)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                with self._condition:
+                    while not self._stopping and not (self._owner and self._pending):
+                        if not self._owner:
+                            self._take_over()
+                        else:
+                            with self._file_lock:
+                                # Jobs submitted by other processes
+                                self._refresh()
+                                if not self._pending and self._journal_size() > JOURNAL_COMPACT_BYTES:
+                                    self._compact()
+                        if not self._pending:
+                            self._condition.wait(POLL_SECONDS)
+                    if self._stopping:
+                        return
+                    # Give concurrent submissions a moment to fill the batch
+                    self._condition.wait_for(lambda: self._pending_texts >= self.batch_size or self._stopping, self.coalesce)
+                    batch = self._take_batch()
+                self._process(batch)
+        finally:
+            # Closed here rather than in `stop`, so a batch outliving the stop timeout is still journaled
+            with self._condition:
+                if self._owner:
+                    self._owner = False
+                    self._owner_lock.release()
+                self._owner_lock.close()
+                with self._file_lock:
+                    self._journal.close()
+                self._file_lock.close()
+
+    def _take_over(self) -> None:
+        """
+        Become the process that drains the queue if no other one is, and resume unfinished jobs.
+        Called with `_condition` held.
+        """
+        if not self._owner_lock.acquire(blocking=False):
+            return
+        with self._file_lock:
+            self._refresh()
+            self._owner = True
+            for job in sorted(self._jobs.values(), key=lambda job: job.created_at):
+                if job.finished_at is None:
+                    # Interrupted jobs start over from their remaining items
+                    job.status = JOB_RUNNING if job.results else JOB_QUEUED
+                    self._enqueue(job)
+            self._compact()
+        logger.info(f"This process now drains the ingest queue ({len(self._pending)} items pending).")
+
+    def _take_batch(self) -> List[Tuple[IngestJob, int, str, Dict[str, Any]]]:
+        batch = []
+        texts = 0
+        started = time.time()
+        while self._pending and (not batch or texts < self.batch_size):
+            job_id, index = self._pending.popleft()
+            job = self._jobs[job_id]
+            text, metadata = job.items[index]
+            estimate = self._estimate_texts(job.kind, text)
+            self._pending_texts -= estimate
+            texts += estimate
+            if job.status == JOB_QUEUED:
+                job.status = JOB_RUNNING
+                job.started_at = started
+            batch.append((job, index, text, metadata))
+        return batch
+
+    def _process(self, batch: List[Tuple[IngestJob, int, str, Dict[str, Any]]]) -> None:
+        results: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        # Each unit is one item's chunks: (job, index, parent ID, texts, metadatas)
+        units = []
+        for job, index, text, metadata in batch:
+            if job.kind == KIND_DOCUMENTS:
+                units.append((job, index, None, [text], [metadata]))
+                continue
+            try:
+                parent_id, texts, metadatas = self.ingestor.chunk_text(text, metadata)
+                if not texts:
+                    raise ValueError("Text input cannot be empty.")
+                units.append((job, index, parent_id, texts, metadatas))
+            except Exception as e:
+                results[(job.id, index)] = {"index": index, "id": None, "error": str(e), "skipped": False}
+
+        texts = [text for unit in units for text in unit[3]]
+        self._store(units, results)
+
+        with self._condition:
+            self._batches += 1
+            self._texts += len(texts)
+            records = []
+            progress: Dict[str, Tuple[IngestJob, List[Dict[str, Any]]]] = {}
+            for job, index, _, _ in batch:
+                result = results[(job.id, index)]
+                job.results[index] = result
+                job.items.pop(index, None)
+                progress.setdefault(job.id, (job, []))[1].append(result)
+            finished = []
+            for job, job_results in progress.values():
+                records.append({"op": "progress", "id": job.id, "started_at": job.started_at, "results": job_results})
+                if job.finish_if_done():
+                    records.append({"op": "finish", "id": job.id, "status": job.status, "finished_at": job.finished_at})
+                    finished.append(job)
+            with self._file_lock:
+                self._refresh()
+                self._write(records, sync=False)
+            for job in finished:
+                self._retire(job.id)
+                logger.info("Ingest job %s %s.", job.id, job.status, extra=HOT_PATH)
+
+    def _store(self, units: list, results: Dict[Tuple[str, int], Dict[str, Any]]) -> None:
+        """
+        Store the chunks of several items with one call; if that fails, store them one item at a
+        time, so only the items that fail on their own are reported as failed.
+        """
+        if not units:
+            return
+        texts = [text for unit in units for text in unit[3]]
+        metadatas = [metadata for unit in units for metadata in unit[4]]
+        try:
+            stored = self.ingestor.store(texts, metadatas)
+        except Exception as e:
+            if len(units) > 1:
+                logger.warning(f"Coalesced write of {len(units)} items failed, retrying them one by one: {e}")
+                for unit in units:
+                    self._store([unit], results)
+                return
+            job, index = units[0][0], units[0][1]
+            logger.error(f"Failed to store item {index} of ingest job {job.id}: {e}")
+            results[(job.id, index)] = {"index": index, "id": None, "error": str(e), "skipped": False}
+            return
+        start = 0
+        for job, index, parent_id, unit_texts, _ in units:
+            ids = stored["ids"][start:start + len(unit_texts)]
+            written = stored["written"][start:start + len(unit_texts)]
+            start += len(unit_texts)
+            result = {"index": index, "id": parent_id or ids[0], "error": None, "skipped": not any(written)}
+            if job.kind == KIND_DOCUMENT:
+                result["chunks"] = len(unit_texts)
+            results[(job.id, index)] = result
+
+    def _add_job(self, job: IngestJob) -> None:
+        self._jobs[job.id] = job
+        if job.finished_at is not None:
+            self._retire(job.id)
+        elif self._owner:
+            self._enqueue(job)
+
+    def _enqueue(self, job: IngestJob) -> None:
+        for index, (text, _) in sorted(job.items.items()):
+            self._pending.append((job.id, index))
+            self._pending_texts += self._estimate_texts(job.kind, text)
+
+    def _retire(self, job_id: str) -> None:
+        self._finished.append(job_id)
+        while len(self._finished) > self.retention:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        job = self._jobs.get(record.get("id"))
+        if record["op"] == "job":
+            self._add_job(IngestJob.from_record(record))
+        elif job is not None and record["op"] == "progress":
+            job.started_at = record.get("started_at")
+            if job.finished_at is None:
+                job.status = JOB_RUNNING
+            for result in record["results"]:
+                job.results[result["index"]] = result
+                job.items.pop(result["index"], None)
+        elif job is not None and record["op"] == "finish" and job.finished_at is None:
+            job.status = record["status"]
+            job.finished_at = record["finished_at"]
+            job.items.clear()
+            self._retire(job.id)
+
+    def _write(self, records: List[Dict[str, Any]], sync: bool) -> None:
+        # Called with the file lock held, right after `_refresh`
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+        if self._journal_partial:
+            # Terminate the torn line of an interrupted write, which is then skipped as unreadable
+            data = b"\n" + data
+            self._journal_partial = False
+        self._journal.write(data)
+        self._journal.flush()
+        if sync:
+            os.fsync(self._journal.fileno())
+        self._journal_offset = self._journal.tell()
+
+    def _journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return 0
+
+    def _refresh(self) -> None:
+        """
+        Apply the records other processes appended since the last refresh, or reload the journal
+        if another process rewrote it. Called with `_condition` held.
+        """
+        try:
+            journal = os.stat(self.journal_path)
+        except FileNotFoundError:
+            journal = None
+        if journal is None or journal.st_ino != self._journal_inode or journal.st_size < self._journal_offset:
+            with self._file_lock:
+                self._load()
+        elif journal.st_size > self._journal_offset:
+            self._read_journal()
+
+    def _load(self) -> None:
+        # Called with `_condition` and the file lock held. The owner, the only process rewriting
+        # the journal, only reloads if the file was replaced from outside; it then queues the
+        # unfinished items again
+        self._jobs.clear()
+        self._finished.clear()
+        self._pending.clear()
+        self._pending_texts = 0
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "ab")
+        self._journal_inode = os.fstat(self._journal.fileno()).st_ino
+        self._journal_offset = 0
+        self._journal_partial = False
+        self._read_journal()
+
+    def _read_journal(self) -> None:
+        # Apply complete lines after the consumed offset; a line still being written is left for later
+        with open(self.journal_path, "rb") as f:
+            if os.fstat(f.fileno()).st_ino != self._journal_inode:
+                return
+            f.seek(self._journal_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self._journal_partial = end < len(data)
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # A record cut short by a crash; its job was never acknowledged
+                logger.warning(f"Skipping unreadable line in the ingest journal {self.journal_path}.")
+                continue
+            self._apply(record)
+        self._journal_offset += end
+
+    def _compact(self) -> None:
+        # Called by the owner with the file lock held. Written next to the journal and renamed over
+        # it, so a crash leaves the old or the new one; other processes see the new file and reload
+        temporary = self.journal_path + ".tmp"
+        with open(temporary, "wb") as f:
+            for job in sorted(self._jobs.values(), key=lambda job: job.created_at):
+                f.write((json.dumps(job.to_record(), ensure_ascii=False) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.journal_path)
+        self._journal.close()
+        self._journal = open(self.journal_path, "ab")
+        self._journal_inode = os.fstat(self._journal.fileno()).st_ino
+        self._journal_offset = self._journal.tell()
+        self._journal_partial = False
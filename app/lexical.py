@@ -0,0 +1,327 @@
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import logging
+
+from .cache import normalize_text
+from .filelock import FileLock
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+JOURNAL_FILE = "journal.jsonl"
+LOCK_FILE = "index.lock"
+
+# Words, plus codes joined by '-', '_', '.' or '/' (e.g. "SKU-1234", "v2.1")
+_TOKEN_RE = re.compile(r"\w+(?:[-./]\w+)*")
+_PART_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms for lexical matching.
+
+    Compound tokens such as product codes are kept whole and also split into their parts, so
+    "SKU-1234" matches queries for "SKU-1234", "sku 1234" and "1234".
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        List[str]: The terms, in order, with repetitions.
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(normalize_text(text).casefold()):
+        terms.append(token)
+        parts = _PART_RE.findall(token)
+        if len(parts) > 1 or (parts and parts[0] != token):
+            terms.extend(parts)
+    return terms
+
+
+class BM25Index:
+    """
+    In-process BM25 inverted index over the stored chunks, for exact-term retrieval.
+
+    The index is updated incrementally on every add. When a directory is given it is persisted
+    there: every add is appended to a journal, and `compact` folds the journal into a snapshot.
+    Both are replayed on load, so the index survives restarts without re-reading the documents.
+
+    Several processes (API workers) can share one directory: writes and compactions hold a file
+    lock, and each process replays the journal lines appended by the others before searching, or
+    reloads the snapshot when another process compacted it.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize the index and load it from `path`, if it exists.
+
+        Args:
+            path (Optional[str]): Directory to persist the index in. None keeps it in memory only.
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 document length normalization.
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._journal_entries = 0
+        self._journal = None
+        # What was consumed from disk: the snapshot identity, and the journal's inode and byte offset
+        self._snapshot_key: Optional[Tuple[int, int]] = None
+        self._journal_inode: Optional[int] = None
+        self._journal_offset = 0
+        self._journal_partial = False
+        self._file_lock: Optional[FileLock] = None
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._file_lock = FileLock(os.path.join(path, LOCK_FILE))
+            with self._lock, self._file_lock:
+                self._load()
+            logger.info(f"Lexical index loaded from {self.path} ({len(self)} documents).")
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, ids: List[str], texts: List[str]) -> None:
+        """
+        Index documents. Re-adding an existing ID replaces its previous content.
+
+        Args:
+            ids (List[str]): The document IDs.
+            texts (List[str]): The document texts, one per ID.
+        """
+        if len(ids) != len(texts):
+            raise ValueError("ids and texts must have the same length.")
+        entries = [(doc_id, dict(Counter(tokenize(text)))) for doc_id, text in zip(ids, texts)]
+        with self.exclusive():
+            for doc_id, terms in entries:
+                self._index(doc_id, terms)
+            self._append_journal([{"id": doc_id, "terms": terms} for doc_id, terms in entries])
+
+    def remove(self, ids: Iterable[str]) -> None:
+        """
+        Remove documents from the index. Unknown IDs are ignored.
+
+        Args:
+            ids (Iterable[str]): The document IDs.
+        """
+        with self.exclusive():
+            removed = [doc_id for doc_id in ids if self._unindex(doc_id)]
+            self._append_journal([{"id": doc_id, "removed": True} for doc_id in removed])
+
+    def clear(self) -> None:
+        """
+        Remove every document and the persisted files.
+        """
+        with self.exclusive():
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._total_length = 0
+            if self.path:
+                self.compact()
+
+    def search(self, query: str, n_results: int = 5) -> List[Tuple[str, float]]:
+        """
+        Rank documents by BM25 score for the query terms.
+
+        Args:
+            query (str): The query text.
+            n_results (int): Maximum number of results.
+
+        Returns:
+            List[Tuple[str, float]]: `(id, score)` pairs, best first. Documents sharing no term
+            with the query are not returned.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            self._refresh()
+            doc_count = len(self._doc_lengths)
+            if not terms or not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+
+    def compact(self) -> None:
+        """
+        Write the whole index as a snapshot and start a new, empty journal.
+        """
+        if not self.path:
+            return
+        with self.exclusive():
+            snapshot_path = os.path.join(self.path, INDEX_FILE)
+            journal_path = os.path.join(self.path, JOURNAL_FILE)
+            with open(snapshot_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"k1": self.k1, "b": self.b, "documents": self._doc_terms}, f, ensure_ascii=False)
+            os.replace(snapshot_path + ".tmp", snapshot_path)
+            # A new file rather than a truncation, so other processes notice the compaction; a crash
+            # before the rename leaves the old journal, whose replay over the new snapshot is harmless
+            open(journal_path + ".tmp", "wb").close()
+            os.replace(journal_path + ".tmp", journal_path)
+            self._open_journal()
+            self._snapshot_key = self._file_key(snapshot_path)
+            self._journal_entries = 0
+        logger.info(f"Lexical index compacted to {snapshot_path} ({len(self)} documents).")
+
+    def close(self) -> None:
+        """
+        Compact the index and close the journal.
+        """
+        if self.path:
+            self.compact()
+            with self._lock:
+                self._journal.close()
+                self._journal = None
+                self._file_lock.close()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """
+        Hold the index exclusively, against other threads and other processes sharing its
+        directory, and bring it up to date with their writes first. Reentrant.
+        """
+        with self._lock:
+            if not self.path:
+                yield
+                return
+            with self._file_lock:
+                self._refresh()
+                yield
+
+    def _index(self, doc_id: str, terms: Dict[str, int]) -> None:
+        self._unindex(doc_id)
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        length = sum(terms.values())
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+
+    def _unindex(self, doc_id: str) -> bool:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        return True
+
+    def _append_journal(self, records: List[Dict]) -> None:
+        # Called within `exclusive`, so the journal ends where this process stopped reading it
+        if not self.path or not records:
+            return
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+        if self._journal_partial:
+            # Terminate the torn line of an interrupted write, which is then skipped as malformed
+            data = b"\n" + data
+            self._journal_partial = False
+        self._journal.write(data)
+        self._journal.flush()
+        self._journal_offset = self._journal.tell()
+        self._journal_entries += len(records)
+        # Keep replay time bounded: fold the journal once it outgrows the snapshot
+        if self._journal_entries > max(10000, len(self._doc_lengths)):
+            self.compact()
+
+    @staticmethod
+    def _file_key(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _refresh(self) -> None:
+        """
+        Apply what other processes wrote since the last refresh. Called with `_lock` held.
+        """
+        if not self.path:
+            return
+        try:
+            journal = os.stat(os.path.join(self.path, JOURNAL_FILE))
+        except FileNotFoundError:
+            journal = None
+        if (
+            journal is None
+            or journal.st_ino != self._journal_inode
+            or journal.st_size < self._journal_offset
+            or self._file_key(os.path.join(self.path, INDEX_FILE)) != self._snapshot_key
+        ):
+            # Another process compacted or cleared the index
+            with self._file_lock:
+                self._load()
+        elif journal.st_size > self._journal_offset:
+            self._read_journal()
+
+    def _load(self) -> None:
+        # Called with both locks held
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._doc_lengths.clear()
+        self._total_length = 0
+        self._journal_entries = 0
+        snapshot_path = os.path.join(self.path, INDEX_FILE)
+        self._snapshot_key = self._file_key(snapshot_path)
+        if self._snapshot_key is not None:
+            with open(snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            for doc_id, terms in snapshot.get("documents", {}).items():
+                self._index(doc_id, terms)
+        self._open_journal()
+        self._read_journal()
+
+    def _open_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(os.path.join(self.path, JOURNAL_FILE), "ab")
+        self._journal_inode = os.fstat(self._journal.fileno()).st_ino
+        self._journal_offset = 0
+        self._journal_partial = False
+
+    def _read_journal(self) -> None:
+        # Replay complete lines after the consumed offset; a line still being written is left for later
+        with open(os.path.join(self.path, JOURNAL_FILE), "rb") as f:
+            if os.fstat(f.fileno()).st_ino != self._journal_inode:
+                return
+            f.seek(self._journal_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self._journal_partial = end < len(data)
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # A torn line from an interrupted write
+                logger.warning("Ignoring malformed line in the lexical index journal.")
+                continue
+            if record.get("removed"):
+                self._unindex(record["id"])
+            else:
+                self._index(record["id"], record["terms"])
+            self._journal_entries += 1
+        self._journal_offset += end
@@ -0,0 +1,371 @@
+from typing import Dict, Any, AsyncIterator, Optional, Tuple
+import asyncio
+import json
+import random
+import threading
+import time
+import logging
+
+import httpx
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+_STREAM_DONE = object()
+
+
+class LLMError(RuntimeError):
+    """
+    Raised when a chat completion fails after all retries.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMClient:
+    """
+    Client for an OpenAI-compatible chat completions API (OpenRouter by default).
+
+    Requests go through persistent keep-alive connection pools, are bounded by per-request
+    timeouts and a concurrency limit, and are retried with jittered exponential backoff on
+    429/5xx responses and connection errors. Optionally, a second (hedged) request is sent when
+    the first one has not completed after a latency threshold, and the fastest answer wins.
+    A total deadline bounds each call, over all its attempts, backoff sleeps and hedges; a
+    concurrency slot is only held while a request is in flight, not while backing off.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_base: str = "https://openrouter.ai/api/v1",
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 32,
+        max_concurrency: int = 16,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge_after: float = 0.0,
+        deadline: float = 0.0
+    ):
+        """
+        Initialize the client. Connection pools are created on first use.
+
+        Args:
+            api_key (str): API key sent as a bearer token.
+            api_base (str): Base URL of the API (the `/chat/completions` path is appended).
+            timeout (float): Per-request timeout in seconds for reads and writes.
+            connect_timeout (float): Timeout in seconds to establish a connection.
+            max_connections (int): Maximum number of pooled connections.
+            max_concurrency (int): Maximum number of requests in flight at once.
+            max_retries (int): Number of retries after the first attempt.
+            backoff_base (float): Base delay in seconds of the exponential backoff.
+            backoff_max (float): Maximum backoff delay in seconds.
+            hedge_after (float): Seconds after which a hedged request is sent. 0 disables hedging.
+            deadline (float): Maximum total seconds of a call, retries and hedges included. For
+                streams it bounds the wait for the response to start. 0 disables it.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive integer.")
+        if max_retries < 0:
+            raise ValueError("max_retries cannot be negative.")
+        if deadline < 0:
+            raise ValueError("deadline cannot be negative.")
+
+        self.url = api_base.rstrip("/") + "/chat/completions"
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.deadline = deadline
+
+        self._headers = {"Content-Type": "application/json"}
+        if api_key:
+            self._headers["Authorization"] = f"Bearer {api_key}"
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60.0
+        )
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_semaphore: Optional[asyncio.Semaphore] = None
+        self._client_lock = threading.Lock()
+        self.max_concurrency = max_concurrency
+        self._sync_semaphore = threading.BoundedSemaphore(max_concurrency)
+
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "requests": 0, "retries": 0, "failures": 0, "hedged": 0, "hedge_wins": 0, "deadline_exceeded": 0
+        }
+
+    async def chat_completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send a chat completion request and return the parsed JSON response.
+
+        Args:
+            payload (Dict[str, Any]): The request body (model, messages, max_tokens, ...).
+
+        Returns:
+            Dict[str, Any]: The chat completion response.
+
+        Raises:
+            LLMError: If the request fails after all retries or the deadline passes.
+        """
+        deadline_at = self._deadline_at()
+        if self.deadline <= 0:
+            return await self._hedged(payload, deadline_at)
+        try:
+            return await asyncio.wait_for(self._hedged(payload, deadline_at), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            raise self._deadline_error()
+
+    async def _hedged(self, payload: Dict[str, Any], deadline_at: Optional[float]) -> Dict[str, Any]:
+        if self.hedge_after <= 0:
+            return await self._post_with_retries(payload, deadline_at)
+
+        primary = asyncio.ensure_future(self._post_with_retries(payload, deadline_at))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        logger.info(f"LLM request still pending after {self.hedge_after}s; sending hedged request.")
+        self._count("hedged")
+        hedge = asyncio.ensure_future(self._post_with_retries(payload, deadline_at))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream_chat_completion(self, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Send a streaming chat completion request and yield each server-sent chunk.
+
+        Connection errors and retryable statuses are retried until the response starts;
+        once chunks have been yielded the stream is not retried.
+
+        Args:
+            payload (Dict[str, Any]): The request body; `stream` is set to true.
+
+        Yields:
+            Dict[str, Any]: Each parsed chunk of the stream.
+
+        Raises:
+            LLMError: If the request fails after all retries.
+        """
+        payload = {**payload, "stream": True}
+        client, semaphore = self._get_async_client()
+        deadline_at = self._deadline_at()
+        started = False
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                self._count("requests")
+                try:
+                    async with client.stream(
+                        "POST", self.url, json=payload, timeout=self._attempt_timeout(deadline_at)
+                    ) as response:
+                        if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                            await response.aread()
+                            delay = self._retry_delay(attempt, response)
+                        elif response.status_code >= 400:
+                            await response.aread()
+                            raise self._status_error(response)
+                        else:
+                            async for line in response.aiter_lines():
+                                chunk = self._parse_sse_line(line)
+                                if chunk is _STREAM_DONE:
+                                    return
+                                if chunk is not None:
+                                    started = True
+                                    yield chunk
+                            return
+                except httpx.TransportError as e:
+                    # A stream that already produced tokens cannot be replayed without duplicating them
+                    if started or attempt >= self.max_retries:
+                        self._count("failures")
+                        raise LLMError(f"LLM request failed: {e}")
+                    logger.warning(f"LLM stream connection error (attempt {attempt + 1}): {e}")
+                    delay = self._retry_delay(attempt)
+            # Back off without holding a concurrency slot
+            await asyncio.sleep(self._backoff(delay, deadline_at))
+            self._count("retries")
+
+    def chat_completion_sync(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Blocking version of `chat_completion` (without hedging), for synchronous callers.
+
+        Args:
+            payload (Dict[str, Any]): The request body (model, messages, max_tokens, ...).
+
+        Returns:
+            Dict[str, Any]: The chat completion response.
+
+        Raises:
+            LLMError: If the request fails after all retries.
+        """
+        client = self._get_sync_client()
+        deadline_at = self._deadline_at()
+        for attempt in range(self.max_retries + 1):
+            with self._sync_semaphore:
+                self._count("requests")
+                try:
+                    response = client.post(self.url, json=payload, timeout=self._attempt_timeout(deadline_at))
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries:
+                        self._count("failures")
+                        raise LLMError(f"LLM request failed: {e}")
+                    logger.warning(f"LLM connection error (attempt {attempt + 1}): {e}")
+                    response = None
+                if response is not None:
+                    if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                        if response.status_code >= 400:
+                            raise self._status_error(response)
+                        return response.json()
+                    logger.warning(f"LLM returned {response.status_code} (attempt {attempt + 1}); retrying.")
+            # Back off without holding a concurrency slot
+            time.sleep(self._backoff(self._retry_delay(attempt, response), deadline_at))
+            self._count("retries")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return request counters.
+
+        Returns:
+            Dict[str, int]: Attempts sent, retries, final failures, hedged requests and hedge wins.
+        """
+        with self._stats_lock:
+            return dict(self._counters)
+
+    async def aclose(self) -> None:
+        """
+        Close the connection pools.
+        """
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+    async def _post_with_retries(self, payload: Dict[str, Any], deadline_at: Optional[float]) -> Dict[str, Any]:
+        client, semaphore = self._get_async_client()
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                self._count("requests")
+                try:
+                    response = await client.post(self.url, json=payload, timeout=self._attempt_timeout(deadline_at))
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries:
+                        self._count("failures")
+                        raise LLMError(f"LLM request failed: {e}")
+                    logger.warning(f"LLM connection error (attempt {attempt + 1}): {e}")
+                    response = None
+                if response is not None:
+                    if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                        if response.status_code >= 400:
+                            raise self._status_error(response)
+                        return response.json()
+                    logger.warning(f"LLM returned {response.status_code} (attempt {attempt + 1}); retrying.")
+            # Back off without holding a concurrency slot
+            await asyncio.sleep(self._backoff(self._retry_delay(attempt, response), deadline_at))
+            self._count("retries")
+
+    def _deadline_at(self) -> Optional[float]:
+        return time.monotonic() + self.deadline if self.deadline > 0 else None
+
+    def _attempt_timeout(self, deadline_at: Optional[float]) -> httpx.Timeout:
+        # An attempt never waits past the call's deadline
+        if deadline_at is None:
+            return self._timeout
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise self._deadline_error()
+        return httpx.Timeout(
+            min(self._timeout.read, remaining),
+            connect=min(self._timeout.connect, remaining)
+        )
+
+    def _backoff(self, delay: float, deadline_at: Optional[float]) -> float:
+        # Give up now rather than sleep into the deadline and fail there
+        if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+            raise self._deadline_error()
+        return delay
+
+    def _deadline_error(self) -> LLMError:
+        self._count("failures")
+        self._count("deadline_exceeded")
+        return LLMError(f"LLM request did not complete within the {self.deadline}s deadline.", status_code=504)
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        # Honor a numeric Retry-After header, otherwise use exponential backoff with full jitter
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _status_error(self, response: httpx.Response) -> LLMError:
+        self._count("failures")
+        return LLMError(
+            f"LLM request failed with status {response.status_code}: {response.text[:200]}",
+            status_code=response.status_code
+        )
+
+    @staticmethod
+    def _parse_sse_line(line: str):
+        if not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return _STREAM_DONE
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning("Ignoring malformed chunk in LLM stream.")
+            return None
+
+    def _get_async_client(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        # The async pool and semaphore belong to one event loop; recreate them if the loop changes
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            if self._async_client is None or self._async_loop is not loop:
+                self._async_client = httpx.AsyncClient(
+                    headers=self._headers, timeout=self._timeout, limits=self._limits
+                )
+                self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._async_loop = loop
+            return self._async_client, self._async_semaphore
+
+    def _get_sync_client(self) -> httpx.Client:
+        if self._sync_client is None:
+            with self._client_lock:
+                if self._sync_client is None:
+                    self._sync_client = httpx.Client(
+                        headers=self._headers, timeout=self._timeout, limits=self._limits
+                    )
+        return self._sync_client
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._counters[name] += 1
+
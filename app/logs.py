@@ -0,0 +1,113 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import logging
+import queue
+import random
+import threading
+
+# Pass as `extra=HOT_PATH` on per-request INFO/DEBUG logs so they are sampled
+HOT_PATH = {"hot_path": True}
+
+_listener: Optional[QueueListener] = None
+_listening = False
+_handler: Optional["DroppingQueueHandler"] = None
+_lock = threading.Lock()
+
+
+class HotPathSampler(logging.Filter):
+    """
+    Keep only a fraction of the hot-path records below WARNING; every other record passes.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, "hot_path", False):
+            return True
+        return self.rate >= 1 or (self.rate > 0 and random.random() < self.rate)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that drops records instead of blocking or failing when the queue is full.
+
+    Records are queued as they are: the message, its `%` arguments and any traceback are
+    formatted by the listener thread's handlers, not by the thread that logged them.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The base class formats the record here, on the caller's thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: str = "INFO", sample_rate: float = 1.0, queue_size: int = 10000) -> None:
+    """
+    Move logging off the request path.
+
+    The root logger's handlers are moved behind a bounded queue drained by a background thread.
+    Records are queued unformatted, so formatting and writing happen on that thread; the logging
+    thread only creates the record, which is cheap when arguments are passed lazily
+    (`logger.info("... %s", value)`) rather than as f-strings. Hot-path records (tagged with
+    `HOT_PATH`) are sampled at `sample_rate`; warnings and errors are always kept. Call it before
+    starting background work, so that work logs through the queue too. Calling it again updates
+    the level and the sample rate, and restarts a stopped listener.
+
+    Args:
+        level (str): Root log level name.
+        sample_rate (float): Fraction of hot-path INFO/DEBUG records kept, from 0 to 1.
+        queue_size (int): Maximum pending records; newer ones are dropped while it is full.
+    """
+    global _listener, _listening, _handler
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    with _lock:
+        if _handler is not None:
+            for log_filter in _handler.filters:
+                if isinstance(log_filter, HotPathSampler):
+                    log_filter.rate = sample_rate
+            if not _listening:
+                _listener.start()
+                _listening = True
+            return
+        handlers = list(root.handlers) or [logging.StreamHandler()]
+        for handler in handlers:
+            root.removeHandler(handler)
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        _handler = DroppingQueueHandler(log_queue)
+        _handler.addFilter(HotPathSampler(sample_rate))
+        root.addHandler(_handler)
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _listening = True
+
+
+def stop_logging() -> None:
+    """
+    Flush the queued records and stop the background logging thread.
+    """
+    global _listening
+    with _lock:
+        if _listening:
+            _listener.stop()
+            _listening = False
+
+
+def logging_stats() -> Optional[Dict[str, Any]]:
+    """
+    Return the number of records dropped because the log queue was full.
+    """
+    if _handler is None:
+        return None
+    return {"queued": _handler.queue.qsize(), "dropped": _handler.dropped}
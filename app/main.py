@@ -1,15 +1,62 @@
-from fastapi import FastAPI, Query, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Query, HTTPException, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import List, Dict, Any, Optional, Tuple
+import json
 import logging
+import os
+import re
+import time
 
-from .models import AddDocumentRequest, SearchResult, ChatRequest, ChatResponse
-from .database import ChromaDBManager
-from .embeddings import EmbeddingGenerator
-from .rag import RAGPipeline
-from .config import OPENROUTER_API_KEY, CHROMADB_PATH, EMBEDDING_MODEL, MODEL_SLUG
+from .models import (
+    AddDocumentRequest, AddDocumentsRequest, AddDocumentResult, AddDocumentsResponse,
+    IngestJobResponse, JobStatus, SearchResult, ChatRequest, ChatResponse
+)
+from .concurrency import run_blocking, shutdown_executor
+from .filters import build_where
+from .jobs import KIND_DOCUMENT, KIND_DOCUMENTS, IngestQueueFull
+from .logs import HOT_PATH, setup_logging, stop_logging, logging_stats
+from .metrics import REGISTRY, REQUEST_SECONDS, collect_timings, render_component_stats
+from .retrieval import SEARCH_MODES
+from .services import Services
+from .snapshot import export_snapshot, import_snapshot
+from .config import (
+    MAX_DOCUMENT_LENGTH, MAX_BULK_DOCUMENTS, CHROMADB_WRITE_BATCH_SIZE, UPLOAD_READ_SIZE,
+    EMBEDDING_MODEL, SNAPSHOT_DIR, SNAPSHOT_IMPORT_BATCH_SIZE,
+    LOG_LEVEL, LOG_HOT_PATH_SAMPLE_RATE, LOG_QUEUE_SIZE, INGEST_ASYNC
+)
+
+# Components are built lazily; the lifespan warms them up in the background after startup
+services = Services()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Logging first, so the warm-up thread already logs through the queue
+    setup_logging(LOG_LEVEL, LOG_HOT_PATH_SAMPLE_RATE, LOG_QUEUE_SIZE)
+    # Startup returns immediately; /readyz reports when the model and ChromaDB are warm
+    services.start_warm_up()
+    yield
+    await services.aclose()
+    shutdown_executor(wait=False)
+    stop_logging()
+
+
+async def require_ready() -> None:
+    """
+    Wait for the warm-up before handling a request that needs the model or ChromaDB.
+
+    Raises:
+        HTTPException: 503 if the warm-up failed.
+    """
+    try:
+        await services.wait_ready()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-app = FastAPI(title="RAG System API")
+
+app = FastAPI(title="RAG System API", lifespan=lifespan)
 
 # Enable CORS for browser testing
 app.add_middleware(
@@ -19,32 +66,140 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-db_manager = ChromaDBManager(CHROMADB_PATH)
-embedding_generator = EmbeddingGenerator(EMBEDDING_MODEL)
-rag_pipeline = RAGPipeline(db_manager, embedding_generator, OPENROUTER_API_KEY, MODEL_SLUG)
-
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """
+    Record the latency of every request, labelled by route template rather than raw path.
+    """
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        )
+
+
 @app.get("/")
 def root():
     return {"name": "RAG System", "version": "1.0"}
 
 
-@app.post("/add_document")
-async def add_document(request: AddDocumentRequest):
+@app.get("/healthz")
+def healthz():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """
+    Readiness probe: the embedding model and ChromaDB are loaded and warmed up.
+
+    Returns:
+        JSONResponse: The warm-up status, with status code 200 when ready and 503 otherwise.
+    """
+    status = services.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/stats")
+def stats():
+    """
+    Return runtime counters of the service components.
+
+    Returns:
+        dict: Counters of the query embedding batcher (batches, items and batch size histogram)
+        and of the query embedding and answer caches (hits, misses and evictions), when enabled,
+        and of the LLM client (requests, retries, failures and hedged requests), plus the log records
+        queued and dropped. Components that are disabled or not built yet report None.
+    """
+    return {**services.stats(), "logging": logging_stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus metrics: per-stage and per-route latency histograms, LLM token and embedded text
+    counters, and the numeric counters of `/stats` as gauges.
+    """
+    body = REGISTRY.render() + render_component_stats(stats())
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def validate_document(
+    text: str,
+    metadata: Optional[Dict[str, Any]],
+    max_length: Optional[int] = MAX_DOCUMENT_LENGTH
+) -> Optional[str]:
+    """
+    Validate a document before ingestion.
+
+    Args:
+        text (str): The text content of the document.
+        metadata (Optional[Dict[str, Any]]): The metadata to store with the document.
+        max_length (Optional[int]): Maximum text length in characters, or None for no limit.
+
+    Returns:
+        Optional[str]: An error message if the document is invalid, otherwise None.
+    """
+    if not text.strip():
+        return "Text input cannot be empty."
+    if max_length is not None and len(text) > max_length:
+        return f"Text input exceeds the maximum length of {max_length} characters."
+    if not metadata or not isinstance(metadata, dict) or len(metadata) == 0:
+        return "Metadata must be a non-empty dictionary."
+    return None
+
+
+async def enqueue_ingest_job(kind: str, documents: List[Tuple[str, Dict[str, Any]]], errors: Optional[Dict[int, str]] = None) -> JSONResponse:
+    """
+    Queue documents for background ingestion and answer 202 with the job ID.
+
+    Raises:
+        HTTPException: 429 with Retry-After if the ingest queue is full.
+    """
+    try:
+        queue = await run_blocking(lambda: services.ingest_queue)
+        job_id, status = await run_blocking(queue.submit, kind, documents, errors)
+    except IngestQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    response = IngestJobResponse(job_id=job_id, status=status, items=len(documents))
+    return JSONResponse(response.model_dump(), status_code=202)
+
+
+ASYNC_INGEST_QUERY = Query(
+    None, alias="async", description="Queue the documents and return a job ID (default: INGEST_ASYNC)."
+)
+
+
+@app.post("/add_document", dependencies=[Depends(require_ready)])
+async def add_document(request: AddDocumentRequest, async_ingest: Optional[bool] = ASYNC_INGEST_QUERY):
     """
     Add a document to the database.
 
-    This endpoint allows you to store a document in the database, 
-    it generates embeddings for the provided text and metadata and stores them
-    along with the metadata.
+    This endpoint allows you to store a document in the database.
+    The text is split into overlapping chunks (`CHUNK_SIZE`/`CHUNK_OVERLAP` characters),
+    each chunk is embedded and stored with the metadata plus `parent_id` and `chunk_index`,
+    so documents of any length can be ingested.
 
     Args:
         The request body containing the text and optional metadata.
 
-        - 'text' (str): The text content of the document, with a limit of 5000 characters.
+        - 'text' (str): The text content of the document.
         - 'metadata' (dict, optional): Additional metadata to store with the document.
             - 'author' (str, optional): The author of the document.
             - 'date' (str, optional): The date the document was created.
@@ -60,25 +215,28 @@ async def add_document(request: AddDocumentRequest):
             }
         }
 
+    With `?async=true` the document is queued instead, and the response (202) carries the
+    `job_id` to poll on `/jobs/{job_id}`.
+
     Returns:
-        dict: A HTTP response indicating success and the document ID.
+        dict: A HTTP response indicating success, the parent document ID, the number of chunks and
+        how many of them were already stored (`skipped`, not embedded again).
     """
     try:
         # Validate input
-        if not request.text.strip():
-            raise HTTPException(status_code=400, detail="Text input cannot be empty.")
-        if len(request.text) > 5000:
-            raise HTTPException(status_code=400, detail="Text input exceeds the maximum length of 5000 characters.")
-        if not request.metadata or not isinstance(request.metadata, dict) or len(request.metadata) == 0:
-            raise HTTPException(status_code=400, detail="Metadata must be a non-empty dictionary.")
+        error = validate_document(request.text, request.metadata, max_length=None)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
 
-        # Generate embeddings
-        embeddings = embedding_generator.generate_embeddings([request.text])
+        if INGEST_ASYNC if async_ingest is None else async_ingest:
+            return await enqueue_ingest_job(KIND_DOCUMENT, [(request.text, request.metadata)])
 
-        # Store in ChromaDB
-        doc_id = db_manager.add_document(request.text, embeddings[0], request.metadata)
+        # Chunk, embed and store in ChromaDB
+        result = await run_blocking(services.ingestor.ingest_text, request.text, request.metadata)
 
-        return {"success": True, "id": doc_id}
+        return {"success": True, **result}
+    except HTTPException:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except RuntimeError as re:
@@ -87,41 +245,206 @@ async def add_document(request: AddDocumentRequest):
         raise HTTPException(status_code=500, detail= f"An unexpected error occurred.{e}")
 
 
-@app.get("/search", response_model=List[SearchResult])
+@app.post("/upload_document", dependencies=[Depends(require_ready)])
+async def upload_document(
+    file: UploadFile = File(..., description="UTF-8 text file to ingest."),
+    metadata: str = Form(..., description="JSON object with the document metadata.")
+):
+    """
+    Add a document to the database from an uploaded text file (multipart/form-data).
+
+    The file is read and chunked as a stream, so memory use does not grow with the file size.
+    Each chunk is stored like in `/add_document`; the file name is added to the metadata as `filename`.
+
+    Example:
+        curl -F "file=@manual.txt" -F 'metadata={"contexto": "Manual"}' http://localhost:8000/upload_document
+
+    Returns:
+        dict: A HTTP response indicating success, the parent document ID, the number of chunks and
+        how many of them were already stored (`skipped`, not embedded again).
+    """
+    try:
+        try:
+            parsed_metadata = json.loads(metadata)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Metadata must be a valid JSON object.")
+        if not parsed_metadata or not isinstance(parsed_metadata, dict):
+            raise HTTPException(status_code=400, detail="Metadata must be a non-empty dictionary.")
+        if file.filename:
+            parsed_metadata.setdefault("filename", file.filename)
+
+        result = await run_blocking(
+            services.ingestor.ingest_file, file.file, parsed_metadata, read_size=UPLOAD_READ_SIZE
+        )
+
+        return {"success": True, **result}
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except RuntimeError as re:
+        raise HTTPException(status_code=500, detail=str(re))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail= f"An unexpected error occurred.{e}")
+
+
+@app.post("/add_documents", response_model=AddDocumentsResponse, dependencies=[Depends(require_ready)])
+async def add_documents(request: AddDocumentsRequest, async_ingest: Optional[bool] = ASYNC_INGEST_QUERY):
+    """
+    Add many documents to the database in a single request.
+
+    Intended for pre-chunked corpora: each document is stored as a single vector (no chunking),
+    so each text is limited to `MAX_DOCUMENT_LENGTH` characters. Valid documents are embedded in batches of `EMBEDDING_BATCH_SIZE` and written to
+    ChromaDB with one `collection.upsert` per chunk. Each document is validated with the
+    same rules as `/add_document`; invalid documents are reported individually and do
+    not prevent the others from being stored. Documents whose content is already stored
+    (or repeated in the request) are not embedded again and are reported as `skipped`.
+
+    Args:
+        The request body containing a list of documents.
+
+        - 'documents' (list): Items with the same shape as the `/add_document` body.
+
+    Example:
+        {
+            "documents": [
+                {"text": "First document.", "metadata": {"contexto": "Exemplo"}},
+                {"text": "Second document.", "metadata": {"contexto": "Exemplo"}}
+            ]
+        }
+
+    With `?async=true` the valid documents are queued instead, and the response (202) carries
+    the `job_id` to poll on `/jobs/{job_id}`; validation errors are reported there.
+
+    Returns:
+        AddDocumentsResponse: Counts of added, skipped and failed documents, and the ID or
+        error for each input item, in input order.
+    """
+    if not request.documents:
+        raise HTTPException(status_code=400, detail="The 'documents' list cannot be empty.")
+    if len(request.documents) > MAX_BULK_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A single request cannot contain more than {MAX_BULK_DOCUMENTS} documents."
+        )
+
+    results = [AddDocumentResult(index=idx) for idx in range(len(request.documents))]
+    valid = []
+    for idx, doc in enumerate(request.documents):
+        error = validate_document(doc.text, doc.metadata)
+        if error:
+            results[idx].error = error
+        else:
+            valid.append(idx)
+
+    if INGEST_ASYNC if async_ingest is None else async_ingest:
+        errors = {result.index: result.error for result in results if result.error}
+        return await enqueue_ingest_job(
+            KIND_DOCUMENTS, [(doc.text, doc.metadata) for doc in request.documents], errors
+        )
+
+    # Each chunk is embedded and written together, so a failure only affects its own items
+    for start in range(0, len(valid), CHROMADB_WRITE_BATCH_SIZE):
+        chunk = valid[start:start + CHROMADB_WRITE_BATCH_SIZE]
+        texts = [request.documents[idx].text for idx in chunk]
+        metadatas = [request.documents[idx].metadata for idx in chunk]
+        try:
+            stored = await run_blocking(services.ingestor.store, texts, metadatas)
+            for idx, doc_id, written in zip(chunk, stored["ids"], stored["written"]):
+                results[idx].id = doc_id
+                results[idx].skipped = not written
+        except Exception as e:
+            logger.error(f"Failed to ingest chunk of {len(chunk)} documents: {e}")
+            for idx in chunk:
+                results[idx].error = str(e)
+
+    skipped = sum(1 for result in results if result.skipped)
+    stored_count = sum(1 for result in results if result.id)
+    return AddDocumentsResponse(
+        added=stored_count - skipped, skipped=skipped, failed=len(results) - stored_count, results=results
+    )
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus, dependencies=[Depends(require_ready)])
+async def job_status(job_id: str):
+    """
+    Report the progress of an ingestion job queued with `?async=true`.
+
+    Returns:
+        JobStatus: The job status (`queued`, `running`, `completed`, or `failed` when every item
+        failed), its timestamps, the counts of processed, added, skipped and failed items, and the
+        ID or error of each processed item.
+
+    Raises:
+        HTTPException: 404 if the job is unknown or finished too long ago to be retained.
+    """
+    queue = await run_blocking(lambda: services.ingest_queue)
+    # Reads what other workers appended to the shared journal
+    job = await run_blocking(queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job
+
+
+@app.get("/search", response_model=List[SearchResult], dependencies=[Depends(require_ready)])
 async def search(
     query: str = Query(..., description="Query string to search for similar documents."),
-    limit: int = Query(default=5, description="Number of top results to return.")
+    limit: int = Query(default=5, description="Number of top results to return."),
+    mode: Optional[str] = Query(
+        default=None, description="Search mode: vector, lexical or hybrid (default: the SEARCH_MODE setting)."
+    ),
+    filters: Optional[str] = Query(
+        default=None,
+        description='Metadata filters as JSON, e.g. {"source": {"in": ["a", "b"]}, "date": {"gte": "2024-01-01"}}.'
+    )
 ):
     """
     Search for similar documents using a query string.
 
-    This endpoint generates an embedding for the query, searches for similar documents in ChromaDB,
-    and returns the top matches with their similarity scores and metadata.
+    This endpoint retrieves the top matches for the query with their scores and metadata. In `vector` mode
+    the score is the embedding distance (lower is better), in `lexical` mode the BM25 score and in `hybrid`
+    mode the reciprocal rank fusion score of both searches (higher is better). When the results were
+    reranked, `rerank_score` holds the cross-encoder score (higher is better) that set their order.
 
     Args:
         query (str): The query string to search for.
         limit (int): The number of top results to return.
+        mode (Optional[str]): `vector`, `lexical` or `hybrid`.
+        filters (Optional[str]): JSON object mapping metadata fields to a value (equality) or to
+            operators (`eq`, `ne`, `in`, `nin`, `gt`, `gte`, `lt`, `lte`; ranges accept ISO dates).
+            Filters are applied inside the index, so every returned slot matches.
 
     Returns:
-        List[SearchResult]: List of search results with content, score, and metadata.
+        List[SearchResult]: List of chunk-level results with content, score, metadata,
+        the chunk ID and the ID of the parent document.
     """
+    if mode is not None and mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"'mode' must be one of: {', '.join(SEARCH_MODES)}.")
+    parsed_filters = parse_filters(filters)
     try:
-        # 1. Gerar embedding da query
-        query_embedding = embedding_generator.generate_embeddings([query])[0]
-
-        # 2. Buscar documentos similares
-        results = db_manager.search(query_embedding, n_results=limit)
+        # 1-2. Gerar embedding da query e buscar documentos (vetorial, lexical ou híbrida)
+        _, results = await services.retriever.asearch(
+            query, n_results=limit, mode=mode, filters=parsed_filters
+        )
 
         # 3. Formatar resultados para o modelo SearchResult
         search_results = []
+        ids = results.get("ids", [[]])
+        parent_ids = results.get("parent_ids", [[]])
         docs = results.get("documents", [[]])
-        scores = results.get("distances", [[]])
+        scores = results.get("scores", [[]])
         metadatas = results.get("metadatas", [[]])
+        rerank_scores = results.get("rerank_scores", [[None] * len(ids[0])])
 
-        for doc, score, meta in zip(docs[0], scores[0], metadatas[0]):
+        for doc_id, parent_id, doc, score, rerank_score, meta in zip(
+            ids[0], parent_ids[0], docs[0], scores[0], rerank_scores[0], metadatas[0]
+        ):
             search_results.append(SearchResult(
+                id=doc_id,
+                parent_id=parent_id,
                 content=doc,
                 score=score,
+                rerank_score=rerank_score,
                 metadata=meta or {}
             ))
 
@@ -132,17 +455,69 @@ async def search(
             )
 
         return search_results
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during search: {e}")
 
 
-@app.post("/chat", response_model=ChatResponse, summary="RAG Chat", tags=["RAG"])
+def parse_filters(filters: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse and validate the JSON metadata filters of a query string.
+
+    Raises:
+        HTTPException: If the filters are not valid JSON or not a valid filter object.
+    """
+    if not filters:
+        return None
+    try:
+        parsed = json.loads(filters)
+        build_where(parsed)
+    except (json.JSONDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
+    return parsed
+
+
+def validate_chat_request(request: ChatRequest) -> None:
+    """
+    Validate a chat request.
+
+    Raises:
+        HTTPException: If the question is empty or max_results is out of range.
+    """
+    if not request.question or not request.question.strip():
+        raise HTTPException(status_code=400, detail="O campo 'question' não pode ser vazio.")
+    if request.max_results < 1 or request.max_results > 10:
+        raise HTTPException(status_code=400, detail="O campo 'max_results' deve estar entre 1 e 10.")
+    if request.search_mode is not None and request.search_mode not in SEARCH_MODES:
+        raise HTTPException(
+            status_code=400, detail=f"O campo 'search_mode' deve ser um de: {', '.join(SEARCH_MODES)}."
+        )
+    try:
+        build_where(request.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Filtros inválidos: {e}")
+
+
+@app.post("/chat", response_model=ChatResponse, summary="RAG Chat", tags=["RAG"], dependencies=[Depends(require_ready)])
 async def chat(request: ChatRequest):
     """
     Does a RAG query: retrieves relevant context, sends it to the LLM, and returns the response with sources.
 
     - **question**: User's question.
     - **max_results**: Maximum number of context documents to retrieve (default: 3).
+    - **search_mode**: Optional retrieval mode: `vector`, `lexical` or `hybrid` (default: the SEARCH_MODE setting).
+    - **filters**: Optional metadata filters, with the same format as the `/search` `filters` parameter.
+
+    - **include_timings**: Optional; when true the response has a `timings` breakdown in milliseconds
+      (retrieval, query embedding, Chroma query, answer cache, prompt building, LLM call and total).
+
+    The context is packed before the LLM call: documents are picked by maximal marginal relevance
+    (near-duplicates are dropped) and trimmed to their most relevant sentences to fit
+    `CONTEXT_TOKEN_BUDGET`. `sources` lists only what was sent, with `trimmed` set for cut documents,
+    and `context_tokens` is the estimated size of that context.
+
+    The response field `cached` is true when the answer was reused from the semantic answer cache.
 
     Example payload:
     {
@@ -151,24 +526,31 @@ async def chat(request: ChatRequest):
     }
     """
     try:
-        if not request.question or not request.question.strip():
-            raise HTTPException(status_code=400, detail="O campo 'question' não pode ser vazio.")
-        if request.max_results < 1 or request.max_results > 10:
-            raise HTTPException(status_code=400, detail="O campo 'max_results' deve estar entre 1 e 10.")
-
-        # Logging para rastreabilidade
-        logger.info(f"Recebida pergunta para RAG: '{request.question}' (max_results={request.max_results})")
+        validate_chat_request(request)
 
-        result = rag_pipeline.generate_answer(
-            request.question,
-            request.max_results
+        # Logging para rastreabilidade (sem o texto da pergunta)
+        logger.info(
+            "Recebida pergunta para RAG (%d caracteres, max_results=%d)", len(request.question), request.max_results,
+            extra=HOT_PATH
         )
 
+        started = time.perf_counter()
+        with collect_timings() as timings:
+            result = await services.rag_pipeline.agenerate_answer(
+                request.question,
+                request.max_results,
+                request.search_mode,
+                request.filters
+            )
+
         # Checagem de resposta do pipeline
         if not result.get("answer"):
             raise HTTPException(status_code=500, detail="Falha ao gerar resposta.")
 
-        return ChatResponse(**result)
+        response = ChatResponse(**result)
+        if request.include_timings:
+            response.timings = {**timings, "total": round((time.perf_counter() - started) * 1000, 3)}
+        return response
 
     except HTTPException as he:
         logger.warning(f"Erro de input no endpoint /chat: {he.detail}")
@@ -178,6 +560,116 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail="Erro interno ao processar a requisição do chat.")
 
 
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """
+    Format one server-sent event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream", summary="RAG Chat (streaming)", tags=["RAG"], dependencies=[Depends(require_ready)])
+async def chat_stream(request: ChatRequest):
+    """
+    Same as `/chat`, but streams the answer as server-sent events (`text/event-stream`).
+
+    Events, in order:
+    - **sources**: `{"sources": [...]}` the packed context sources, sent before the LLM call.
+    - **token**: `{"content": "..."}` for each piece of the answer as the LLM produces it.
+    - **done**: `{"model_used": ..., "tokens_used": ..., "cached": ...}` closing the stream.
+    - **error**: `{"detail": ...}` if the pipeline fails; no `done` event follows.
+
+    Example payload:
+    {
+        "question": "What is the capital of Japan?",
+        "max_results": 3
+    }
+    """
+    try:
+        validate_chat_request(request)
+    except HTTPException as he:
+        logger.warning(f"Erro de input no endpoint /chat/stream: {he.detail}")
+        raise he
+
+    logger.info("Recebida pergunta para RAG (streaming) (max_results=%d)", request.max_results, extra=HOT_PATH)
+
+    async def event_stream():
+        async for event, data in services.rag_pipeline.astream_answer(
+            request.question, request.max_results, request.search_mode, request.filters
+        ):
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+_SNAPSHOT_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def snapshot_path(name: str) -> str:
+    """
+    Resolve a snapshot name to its directory under SNAPSHOT_DIR.
+
+    Raises:
+        HTTPException: 400 if the name is not a plain directory name.
+    """
+    if not _SNAPSHOT_NAME_RE.match(name):
+        raise HTTPException(
+            status_code=400, detail="Snapshot name may only contain letters, digits, '.', '_' and '-'."
+        )
+    return os.path.join(SNAPSHOT_DIR, name)
+
+
+@app.post("/snapshots/export", tags=["Snapshots"], dependencies=[Depends(require_ready)])
+async def snapshot_export(name: str = Query(..., description="Name of the snapshot directory under SNAPSHOT_DIR.")):
+    """
+    Export all stored documents and their embeddings to a snapshot.
+
+    The snapshot holds a float32 embedding matrix (`embeddings.npy`, memory-mappable), the IDs,
+    texts and metadata (`records.jsonl`) and a manifest with the embedding model name.
+
+    Returns:
+        dict: The snapshot manifest.
+    """
+    path = snapshot_path(name)
+    try:
+        return await run_blocking(export_snapshot, services.db_manager, path, model_name=EMBEDDING_MODEL)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to export snapshot '{name}': {e}")
+        raise HTTPException(status_code=500, detail=f"Error exporting snapshot: {str(e)}")
+
+
+@app.post("/snapshots/import", tags=["Snapshots"], dependencies=[Depends(require_ready)])
+async def snapshot_import(name: str = Query(..., description="Name of the snapshot directory under SNAPSHOT_DIR.")):
+    """
+    Bulk-load a snapshot into the collection without re-encoding.
+
+    Documents keep their IDs and are upserted, so importing twice does not duplicate them.
+    Snapshots made with a different embedding model are refused.
+
+    Returns:
+        dict: The snapshot manifest and the number of documents imported.
+    """
+    path = snapshot_path(name)
+    try:
+        return await run_blocking(
+            import_snapshot, services.db_manager, path,
+            expected_model=EMBEDDING_MODEL, batch_size=SNAPSHOT_IMPORT_BATCH_SIZE
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to import snapshot '{name}': {e}")
+        raise HTTPException(status_code=500, detail=f"Error importing snapshot: {str(e)}")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,239 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import math
+import threading
+import time
+
+# Latency buckets in seconds, from sub-millisecond index lookups to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Per-request breakdown of stage times in milliseconds, set by `collect_timings`
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("rag_timings", default=None)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """
+    A monotonically increasing counter, optionally split by labels.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Add `amount` (non-negative) to the counter with the given label values.
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase.")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    A cumulative histogram of observed values (seconds, by convention), optionally split by labels.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts (last one is +Inf), sum and count
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Record one observation with the given label values.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """
+    The set of metrics exposed on `/metrics`, in Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Return all metrics in Prometheus text format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "rag_http_request_duration_seconds", "HTTP request latency until the response headers.", ["method", "route", "status"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total", "Tokens reported by the LLM, by kind (prompt or completion).", ["kind"]
+)
+EMBEDDED_TEXTS = REGISTRY.counter(
+    "rag_embedded_texts_total", "Texts encoded by the embedding model."
+)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Time a pipeline stage: record it in the stage histogram and, inside `collect_timings`, add it
+    to the request's breakdown.
+
+    Args:
+        stage (str): The stage name, e.g. "embed" or "chroma_query".
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _timings.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + elapsed * 1000, 3)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """
+    Collect the stages timed by the current request, in milliseconds.
+
+    Work sent to the thread pool with `run_blocking` and tasks created inside the block report to
+    the same breakdown. A stage that runs several times in one request is summed.
+
+    Yields:
+        Dict[str, float]: The breakdown, filled in as stages finish.
+    """
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def count_tokens(usage: Optional[Dict[str, Any]]) -> None:
+    """
+    Add the prompt and completion tokens of an LLM response to the token counter.
+    """
+    if not usage:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if tokens:
+            LLM_TOKENS.inc(tokens, kind=kind)
+
+
+def render_component_stats(stats: Dict[str, Optional[Dict[str, Any]]]) -> str:
+    """
+    Render the numeric counters of `Services.stats()` as a gauge family.
+
+    Args:
+        stats (Dict[str, Optional[Dict[str, Any]]]): Counters per component; None for components
+            that are disabled or not built.
+
+    Returns:
+        str: Prometheus text lines for `rag_component_stat{component, stat}`.
+    """
+    name = "rag_component_stat"
+    lines = [f"# HELP {name} Runtime counters of the service components (see /stats).", f"# TYPE {name} gauge"]
+    for component, values in sorted(stats.items()):
+        for stat, value in sorted((values or {}).items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(f"{name}{_format_labels(('component', 'stat'), (component, stat))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
 class AddDocumentRequest(BaseModel):
@@ -7,19 +7,69 @@ class AddDocumentRequest(BaseModel):
     metadata: Dict[str, Any] = {}
 
 
+class AddDocumentsRequest(BaseModel):
+    documents: List[AddDocumentRequest]
+
+
+class AddDocumentResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    error: Optional[str] = None
+    skipped: bool = False
+    chunks: Optional[int] = None
+
+
+class AddDocumentsResponse(BaseModel):
+    added: int
+    failed: int
+    skipped: int = 0
+    results: List[AddDocumentResult]
+
+
+class IngestJobResponse(BaseModel):
+    success: bool = True
+    job_id: str
+    status: str
+    items: int
+
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    total: int
+    processed: int
+    added: int
+    skipped: int
+    failed: int
+    results: List[AddDocumentResult]
+
+
 class SearchResult(BaseModel):
+    id: Optional[str] = None
+    parent_id: Optional[str] = None
     content: str
     score: float
+    rerank_score: Optional[float] = None
     metadata: Dict[str, Any]
 
 
 class ChatRequest(BaseModel):
     question: str
     max_results: int = 3
+    search_mode: Optional[str] = None
+    filters: Optional[Dict[str, Any]] = None
+    include_timings: bool = False
 
 
 class ChatResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
     model_used: str
-    tokens_used: int
\ No newline at end of file
+    tokens_used: int
+    cached: bool = False
+    context_tokens: int = 0
+    timings: Optional[Dict[str, float]] = None
\ No newline at end of file
@@ -1,106 +1,349 @@
-import openai
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 import logging
 import os
 
+import numpy as np
+
+from .concurrency import run_blocking
+from .context import ContextPacker
+from .llm import LLMClient
+from .logs import HOT_PATH
+from .metrics import count_tokens, timed
+from .retrieval import Retriever
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "Você é um assistente útil que responde perguntas com base no contexto fornecido."
+
 class RAGPipeline:
     """
     Pipeline RAG: Busca contexto relevante, monta prompt, consulta LLM e retorna resposta e fontes.
     """
 
-    def __init__(self, db_manager, embedding_generator, api_key: str, model_slug: str = "openai/gpt-3.5-turbo"):
+    def __init__(
+        self,
+        db_manager,
+        embedding_generator,
+        api_key: str,
+        model_slug: str = "openai/gpt-3.5-turbo",
+        answer_cache=None,
+        llm_client: Optional[LLMClient] = None,
+        retriever: Optional[Retriever] = None,
+        context_packer: Optional[ContextPacker] = None
+    ):
         self.db_manager = db_manager
         self.embedding_generator = embedding_generator
+        # Busca vetorial, lexical (BM25) ou híbrida com fusão por rank recíproco
+        self.retriever = retriever or Retriever(db_manager, embedding_generator)
+        # Montagem do contexto: seleção MMR, orçamento de tokens e corte por sentenças
+        self.context_packer = context_packer or ContextPacker(db_manager)
+        # Cache semântico opcional de respostas (AnswerCache)
+        self.answer_cache = answer_cache
         self.model_slug = model_slug
         self.api_key = api_key
-        # Configura o endpoint OpenRouter (OpenAI compatível)
-        openai.api_base = "https://openrouter.ai/api/v1"
-        openai.api_type = "openai"
-        openai.api_version = None  # Não é necessário para OpenRouter
+        # Cliente do endpoint OpenRouter (OpenAI compatível) com pool de conexões e retries
+        self.llm_client = llm_client or LLMClient(api_key)
 
-    def generate_answer(self, question: str, max_results: int = 3) -> Dict[str, Any]:
+    def generate_answer(
+        self,
+        question: str,
+        max_results: int = 3,
+        search_mode: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Executa o pipeline RAG: busca contexto, monta prompt, consulta LLM e retorna resposta e fontes.
 
         Args:
             question (str): Pergunta do usuário.
             max_results (int): Número de documentos de contexto a buscar.
+            search_mode (Optional[str]): `vector`, `lexical` ou `hybrid`; por padrão, o modo do retriever.
+            filters (Optional[Dict[str, Any]]): Filtros de metadados aplicados na busca.
 
         Returns:
             Dict[str, Any]: Resposta gerada, fontes, modelo e uso de tokens.
         """
         try:
-            # 1. Gerar embedding da pergunta
-            logger.info("Gerando embedding da pergunta.")
-            question_embedding = self.embedding_generator.generate_embeddings([question])[0]
-
-            # 2. Buscar documentos relevantes
-            logger.info("Buscando documentos relevantes no ChromaDB.")
-            search_results = self.db_manager.search(question_embedding, n_results=max_results)
+            # 1-2. Gerar embedding da pergunta e buscar documentos relevantes
+            logger.info("Buscando documentos relevantes.", extra=HOT_PATH)
+            data_version = self.db_manager.version
+            with timed("retrieval"):
+                question_embedding, search_results = self.retriever.search(
+                    question, self.context_packer.candidates(max_results), mode=search_mode, filters=filters
+                )
+            ids = search_results.get("ids", [[]])[0]
             docs = search_results.get("documents", [[]])[0]
             metadatas = search_results.get("metadatas", [[]])[0]
 
-            # 3. Construir contexto
-            context = "\n\n".join(docs)
-            if not context:
+            # 3. Construir contexto: documentos diversos, dentro do orçamento de tokens
+            packed = self.context_packer.pack(question, ids, docs, metadatas, max_results)
+            if not packed["context"]:
+                logger.warning("Nenhum contexto relevante encontrado.")
+                return self._no_context_response()
+
+            # 4. Reutilizar a resposta de uma pergunta similar com as mesmas fontes
+            cached = self._cached_answer(question_embedding, packed["ids"], data_version)
+            if cached:
+                return cached
+
+            # 5. Montar prompt e chamar o modelo via OpenRouter (API OpenAI compatível)
+            logger.info("Chamando o modelo LLM via OpenRouter.", extra=HOT_PATH)
+            params = self._completion_params(question, packed["context"])
+            with timed("llm"):
+                response = self.llm_client.chat_completion_sync(params)
+
+            # 6. Retornar resposta, fontes e uso de tokens
+            result = self._build_response(response, packed)
+            self._store_answer(question_embedding, packed["ids"], data_version, result)
+            return result
+
+        except Exception as e:
+            logger.error(f"Erro na chamada ao modelo LLM: {e}")
+            return self._error_response()
+
+    async def agenerate_answer(
+        self,
+        question: str,
+        max_results: int = 3,
+        search_mode: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Versão assíncrona de `generate_answer`.
+
+        O embedding e a busca no ChromaDB rodam fora do event loop e a chamada ao LLM é aguardada,
+        permitindo que um único worker atenda várias conversas simultaneamente.
+
+        Args:
+            question (str): Pergunta do usuário.
+            max_results (int): Número de documentos de contexto a buscar.
+            search_mode (Optional[str]): `vector`, `lexical` ou `hybrid`; por padrão, o modo do retriever.
+            filters (Optional[Dict[str, Any]]): Filtros de metadados aplicados na busca.
+
+        Returns:
+            Dict[str, Any]: Resposta gerada, fontes, modelo e uso de tokens.
+        """
+        try:
+            # 1-2. Gerar embedding da pergunta e buscar documentos relevantes
+            question_embedding, packed, data_version = await self._aretrieve(
+                question, max_results, search_mode, filters
+            )
+
+            # 3. Construir contexto: documentos diversos, dentro do orçamento de tokens
+            if not packed["context"]:
                 logger.warning("Nenhum contexto relevante encontrado.")
-                return {
-                    "answer": "Nenhum contexto relevante encontrado para responder à pergunta.",
-                    "sources": [],
+                return self._no_context_response()
+
+            # 4. Reutilizar a resposta de uma pergunta similar com as mesmas fontes
+            cached = self._cached_answer(question_embedding, packed["ids"], data_version)
+            if cached:
+                return cached
+
+            # 5. Montar prompt e chamar o modelo via OpenRouter sem bloquear o event loop
+            logger.info("Chamando o modelo LLM via OpenRouter.", extra=HOT_PATH)
+            params = self._completion_params(question, packed["context"])
+            with timed("llm"):
+                response = await self.llm_client.chat_completion(params)
+
+            # 6. Retornar resposta, fontes e uso de tokens
+            result = self._build_response(response, packed)
+            self._store_answer(question_embedding, packed["ids"], data_version, result)
+            return result
+
+        except Exception as e:
+            logger.error(f"Erro na chamada ao modelo LLM: {e}")
+            return self._error_response()
+
+    async def astream_answer(
+        self,
+        question: str,
+        max_results: int = 3,
+        search_mode: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Executa o pipeline RAG em modo streaming.
+
+        Produz eventos `(nome, dados)` na ordem em que ficam disponíveis:
+        - `sources`: as fontes recuperadas, enviadas antes da chamada ao LLM;
+        - `token`: cada trecho da resposta assim que chega do modelo;
+        - `done`: evento final com modelo, uso de tokens e indicação de cache;
+        - `error`: falha no pipeline (encerra o stream).
+
+        Args:
+            question (str): Pergunta do usuário.
+            max_results (int): Número de documentos de contexto a buscar.
+            search_mode (Optional[str]): `vector`, `lexical` ou `hybrid`; por padrão, o modo do retriever.
+            filters (Optional[Dict[str, Any]]): Filtros de metadados aplicados na busca.
+
+        Yields:
+            Tuple[str, Dict[str, Any]]: Nome do evento e seus dados.
+        """
+        try:
+            # 1-2. Gerar embedding da pergunta e buscar documentos relevantes
+            question_embedding, packed, data_version = await self._aretrieve(
+                question, max_results, search_mode, filters
+            )
+            sources = packed["sources"]
+            yield "sources", {"sources": sources}
+
+            # 3. Construir contexto: documentos diversos, dentro do orçamento de tokens
+            if not packed["context"]:
+                logger.warning("Nenhum contexto relevante encontrado.")
+                response = self._no_context_response()
+                yield "token", {"content": response["answer"]}
+                yield "done", {"model_used": self.model_slug, "tokens_used": 0, "cached": False}
+                return
+
+            # 4. Reutilizar a resposta de uma pergunta similar com as mesmas fontes
+            cached = self._cached_answer(question_embedding, packed["ids"], data_version)
+            if cached:
+                yield "token", {"content": cached["answer"]}
+                yield "done", {"model_used": cached["model_used"], "tokens_used": 0, "cached": True}
+                return
+
+            # 5. Chamar o modelo em modo streaming e repassar os tokens conforme chegam
+            logger.info("Chamando o modelo LLM via OpenRouter (streaming).", extra=HOT_PATH)
+            params = {**self._completion_params(question, packed["context"]), "stream_options": {"include_usage": True}}
+            parts: List[str] = []
+            tokens_used = 0
+            finish_reason = None
+            with timed("llm_stream"):
+                async for chunk in self.llm_client.stream_chat_completion(params):
+                    usage = chunk.get("usage")
+                    if usage:
+                        tokens_used = usage.get("total_tokens", tokens_used)
+                        count_tokens(usage)
+                    if not chunk.get("choices"):
+                        continue
+                    choice = chunk["choices"][0]
+                    finish_reason = choice.get("finish_reason") or finish_reason
+                    content = choice.get("delta", {}).get("content")
+                    if content:
+                        parts.append(content)
+                        yield "token", {"content": content}
+
+            # 6. Guardar no cache antes do evento final (o cliente pode desconectar depois dele),
+            # e só respostas completas: um stream interrompido ou vazio não é reaproveitado
+            answer = "".join(parts).strip()
+            if answer and finish_reason is not None:
+                self._store_answer(question_embedding, packed["ids"], data_version, {
+                    "answer": answer,
+                    "sources": sources,
                     "model_used": self.model_slug,
-                    "tokens_used": 0
-                }
+                    "tokens_used": tokens_used,
+                    "context_tokens": packed["tokens"],
+                    "cached": False
+                })
+            else:
+                logger.warning("Resposta em streaming incompleta; não será guardada no cache.")
 
-            # 4. Montar prompt para o LLM
+            # 7. Evento final com uso de tokens
+            yield "done", {"model_used": self.model_slug, "tokens_used": tokens_used, "cached": False}
+
+        except Exception as e:
+            logger.error(f"Erro na chamada ao modelo LLM (streaming): {e}")
+            yield "error", {"detail": self._error_response()["answer"]}
+
+    async def _aretrieve(
+        self,
+        question: str,
+        max_results: int,
+        search_mode: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[np.ndarray], Dict[str, Any], int]:
+        """
+        Gera o embedding da pergunta, busca os documentos relevantes e monta o contexto sem
+        bloquear o event loop.
+        """
+        logger.info("Buscando documentos relevantes.", extra=HOT_PATH)
+        data_version = self.db_manager.version
+        with timed("retrieval"):
+            question_embedding, search_results = await self.retriever.asearch(
+                question, self.context_packer.candidates(max_results), mode=search_mode, filters=filters
+            )
+        ids = search_results.get("ids", [[]])[0]
+        docs = search_results.get("documents", [[]])[0]
+        metadatas = search_results.get("metadatas", [[]])[0]
+        packed = await run_blocking(
+            self.context_packer.pack, question, ids, docs, metadatas, max_results
+        )
+        return question_embedding, packed, data_version
+
+    def _cached_answer(self, question_embedding: Optional[np.ndarray], ids: List[str], data_version: int) -> Optional[Dict[str, Any]]:
+        """
+        Consulta o cache semântico de respostas, se habilitado (a busca lexical não gera embedding).
+        """
+        if self.answer_cache is None or question_embedding is None:
+            return None
+        with timed("answer_cache"):
+            cached = self.answer_cache.lookup(question_embedding, ids, data_version)
+        if cached is None:
+            return None
+        logger.info("Resposta servida pelo cache semântico.", extra=HOT_PATH)
+        # Nenhum token foi consumido para esta resposta
+        cached["cached"] = True
+        cached["tokens_used"] = 0
+        return cached
+
+    def _store_answer(self, question_embedding: Optional[np.ndarray], ids: List[str], data_version: int, result: Dict[str, Any]) -> None:
+        """
+        Guarda uma resposta gerada pelo LLM no cache semântico, se habilitado.
+        """
+        if self.answer_cache is not None and question_embedding is not None:
+            self.answer_cache.store(question_embedding, ids, data_version, result)
+
+    def _completion_params(self, question: str, context: str) -> Dict[str, Any]:
+        """
+        Monta o prompt e os parâmetros da chamada de chat completion.
+        """
+        with timed("prompt_build"):
             prompt = (
                 f"Contexto:\n{context}\n\n"
                 f"Pergunta: {question}\n"
                 f"Responda de forma clara e cite as fontes relevantes se possível."
             )
+        return {
+            "model": self.model_slug,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 512,
+            "temperature": 0.2,
+        }
 
-            # 5. Chamar o modelo via OpenRouter (API OpenAI compatível)
-            openai.api_key = self.api_key
-            logger.info("Chamando o modelo LLM via OpenRouter.")
-            response = openai.ChatCompletion.create(
-                model=self.model_slug,
-                messages=[
-                    {"role": "system", "content": "Você é um assistente útil que responde perguntas com base no contexto fornecido."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=512,
-                temperature=0.2,
-            )
+    def _build_response(self, response, packed: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Converte a resposta do LLM no formato retornado pelo pipeline, com as fontes efetivamente
+        enviadas no prompt.
+        """
+        answer = response["choices"][0]["message"]["content"].strip()
+        usage = response.get("usage") or {}
+        count_tokens(usage)
+        tokens_used = usage.get("total_tokens", 0)
+        return {
+            "answer": answer,
+            "sources": packed["sources"],
+            "model_used": self.model_slug,
+            "tokens_used": tokens_used,
+            "context_tokens": packed["tokens"],
+            "cached": False
+        }
 
-            answer = response.choices[0].message.content.strip()
-            tokens_used = response.usage.total_tokens if hasattr(response, "usage") else 0
+    def _no_context_response(self) -> Dict[str, Any]:
+        return {
+            "answer": "Nenhum contexto relevante encontrado para responder à pergunta.",
+            "sources": [],
+            "model_used": self.model_slug,
+            "tokens_used": 0
+        }
 
-            # 6. Retornar resposta, fontes e uso de tokens
-            return {
-                "answer": answer,
-                "sources": [
-                    {"content": doc, "metadata": meta}
-                    for doc, meta in zip(docs, metadatas)
-                ],
-                "model_used": self.model_slug,
-                "tokens_used": tokens_used
-            }
-
-        except Exception as oe:
-            logger.error(f"Erro na chamada ao modelo LLM: {oe}")
-            return {
-                "answer": "Erro ao consultar o modelo LLM. Verifique sua chave de API e limite de uso.",
-                "sources": [],
-                "model_used": self.model_slug,
-                "tokens_used": 0
-            }
-        except Exception as e:
-            logger.error(f"Erro inesperado no pipeline RAG: {e}")
-            return {
-                "answer": "Erro inesperado ao gerar resposta.",
-                "sources": [],
-                "model_used": self.model_slug,
-                "tokens_used": 0
-            }
\ No newline at end of file
+    def _error_response(self) -> Dict[str, Any]:
+        return {
+            "answer": "Erro ao consultar o modelo LLM. Verifique sua chave de API e limite de uso.",
+            "sources": [],
+            "model_used": self.model_slug,
+            "tokens_used": 0
+        }
@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional
+import threading
+import time
+import logging
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Second retrieval stage: scores (query, document) pairs with a local cross-encoder.
+
+    Scoring runs in batches under a latency budget. Before each batch the reranker checks whether
+    it would still finish within the budget, using a running estimate of the batch latency, and
+    after each batch but the last whether the budget is already spent; in either case it gives up
+    and the caller keeps the first-stage order. A running batch cannot be interrupted, so a call can overrun the
+    budget by at most one batch (the whole first batch while there is no estimate yet).
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", batch_size: int = 16):
+        """
+        Initialize the reranker by loading the cross-encoder model.
+
+        Args:
+            model_name (str): The name of the sentence-transformers CrossEncoder model.
+            batch_size (int): Number of pairs per model forward pass.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer.")
+        try:
+            from sentence_transformers import CrossEncoder
+
+            logger.info(f"Loading cross-encoder model: {model_name}")
+            self.model = CrossEncoder(model_name)
+        except Exception as e:
+            logger.error(f"Failed to load cross-encoder '{model_name}': {e}")
+            raise RuntimeError(f"Error loading cross-encoder '{model_name}': {e}")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        # Moving average of the time per batch, to skip a batch that would not fit in the budget
+        self._batch_seconds = 0.0
+        self._stats_lock = threading.Lock()
+        self._counters = {"reranked": 0, "fallbacks": 0, "pairs": 0}
+
+    def score(self, query: str, documents: List[str], budget_seconds: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Score each document against the query.
+
+        Args:
+            query (str): The query text.
+            documents (List[str]): The candidate documents.
+            budget_seconds (Optional[float]): Maximum time to spend; None means no limit.
+
+        Returns:
+            Optional[np.ndarray]: One relevance score per document (higher is better), or None if
+            scoring did not complete within the budget.
+        """
+        started = time.perf_counter()
+        scores = []
+        for start in range(0, len(documents), self.batch_size):
+            elapsed = time.perf_counter() - started
+            if budget_seconds is not None and elapsed + self._batch_seconds > budget_seconds:
+                return self._fallback(budget_seconds, start, len(documents))
+            batch_started = time.perf_counter()
+            pairs = [(query, doc) for doc in documents[start:start + self.batch_size]]
+            scores.append(np.asarray(self.model.predict(pairs, batch_size=self.batch_size), dtype=np.float32))
+            batch_seconds = time.perf_counter() - batch_started
+            self._batch_seconds = batch_seconds if not self._batch_seconds else 0.8 * self._batch_seconds + 0.2 * batch_seconds
+            # Hard deadline: the estimate can be wrong (or missing, on the first call)
+            # (a call that scored every document is kept even if it ended slightly late)
+            if (
+                budget_seconds is not None
+                and start + len(pairs) < len(documents)
+                and time.perf_counter() - started > budget_seconds
+            ):
+                return self._fallback(budget_seconds, start + len(pairs), len(documents))
+        self._count("reranked")
+        self._count("pairs", len(documents))
+        return np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return rerank counters.
+
+        Returns:
+            Dict[str, Any]: Reranked queries, budget fallbacks and scored pairs.
+        """
+        with self._stats_lock:
+            return dict(self._counters)
+
+    def _fallback(self, budget_seconds: float, scored: int, total: int) -> None:
+        logger.warning(
+            f"Rerank budget of {budget_seconds * 1000:.0f} ms exceeded after {scored} of "
+            f"{total} candidates; keeping the first-stage order."
+        )
+        self._count("fallbacks")
+        # Decay the estimate so one slow batch (e.g. a CPU spike) does not disable reranking for good
+        self._batch_seconds *= 0.9
+        return None
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._counters[name] += amount
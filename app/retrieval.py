@@ -0,0 +1,218 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+import numpy as np
+
+from .concurrency import run_blocking
+from .metrics import timed
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Merge ranked ID lists with reciprocal rank fusion: each list adds 1 / (k + rank) to an ID.
+
+    Args:
+        rankings (List[List[str]]): Ranked lists of IDs, best first.
+        k (int): Damping constant; larger values flatten the contribution of the top ranks.
+
+    Returns:
+        List[Tuple[str, float]]: `(id, fused score)` pairs, best first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class Retriever:
+    """
+    Retrieval stage shared by `/search` and the RAG pipeline.
+
+    `vector` mode is the dense ChromaDB search, `lexical` mode the BM25 index, and `hybrid` runs
+    both concurrently and merges them with reciprocal rank fusion, so exact-term matches (codes,
+    names, IDs) are found even when their embeddings are not close to the query's.
+
+    With a reranker, the first stage over-fetches up to `rerank_candidates` results, which the
+    cross-encoder reorders within `rerank_budget` seconds before the best `n_results` are kept.
+    """
+
+    def __init__(
+        self,
+        db_manager,
+        embedding_generator,
+        mode: str = "vector",
+        rrf_k: int = 60,
+        candidate_multiplier: int = 2,
+        reranker=None,
+        rerank_candidates: int = 20,
+        rerank_budget: Optional[float] = 0.2
+    ):
+        """
+        Initialize the retriever.
+
+        Args:
+            db_manager: The document store (e.g. ChromaDBManager); `lexical_search` is needed for
+                the lexical and hybrid modes.
+            embedding_generator: The object used to embed queries (e.g. EmbeddingBatcher).
+            mode (str): Default search mode: `vector`, `lexical` or `hybrid`.
+            rrf_k (int): Reciprocal rank fusion constant.
+            candidate_multiplier (int): In hybrid mode, each search returns this many times
+                `n_results` candidates before fusion.
+            reranker: Optional second stage (e.g. CrossEncoderReranker).
+            rerank_candidates (int): Maximum number of first-stage candidates sent to the reranker.
+            rerank_budget (Optional[float]): Rerank latency budget in seconds; when it would be
+                exceeded the first-stage order is kept. None means no limit.
+        """
+        self.db_manager = db_manager
+        self.embedding_generator = embedding_generator
+        self.mode = self._check_mode(mode)
+        self.rrf_k = rrf_k
+        self.candidate_multiplier = max(1, candidate_multiplier)
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.rerank_budget = rerank_budget
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        mode: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+        """
+        Retrieve the documents most relevant to the query.
+
+        Args:
+            query (str): The query text.
+            n_results (int): The number of results to return.
+            mode (Optional[str]): Search mode for this call; defaults to the retriever's mode.
+            filters (Optional[Dict[str, Any]]): Metadata filters applied by both searches.
+
+        Returns:
+            Tuple[Optional[np.ndarray], Dict[str, Any]]: The query embedding (None in lexical mode)
+            and the results, with the structure of `ChromaDBManager.search` plus first-stage `scores`
+            (and `rerank_scores` when the reranker ordered them).
+        """
+        mode = self._check_mode(mode or self.mode)
+        fetch = self._fetch_size(n_results)
+        if mode == "lexical":
+            query_embedding = None
+            results = self._with_scores(self.db_manager.lexical_search(query, fetch, filters), "lexical")
+        else:
+            candidates = self._candidates(fetch, mode)
+            with timed("query_embedding"):
+                query_embedding = self.embedding_generator.generate_embeddings([query], as_numpy=True)[0]
+            dense = self.db_manager.search(query_embedding, n_results=candidates, filters=filters)
+            if mode == "vector":
+                results = self._with_scores(dense, "vector")
+            else:
+                # Run sequentially here: waiting on the shared pool from one of its own threads could deadlock
+                lexical = self.db_manager.lexical_search(query, candidates, filters)
+                results = self._fuse(dense, lexical, fetch)
+        return query_embedding, self._rerank(query, results, n_results)
+
+    async def asearch(
+        self,
+        query: str,
+        n_results: int = 5,
+        mode: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+        """
+        Asynchronous version of `search`. In hybrid mode the lexical lookup runs concurrently with
+        the query embedding and the vector search, on the shared thread pool.
+        """
+        mode = self._check_mode(mode or self.mode)
+        fetch = self._fetch_size(n_results)
+        if mode == "lexical":
+            query_embedding = None
+            results = self._with_scores(await run_blocking(self.db_manager.lexical_search, query, fetch, filters), "lexical")
+        else:
+            candidates = self._candidates(fetch, mode)
+
+            async def dense_search():
+                with timed("query_embedding"):
+                    query_embedding = (await self.embedding_generator.agenerate_embeddings([query], as_numpy=True))[0]
+                return query_embedding, await run_blocking(
+                    self.db_manager.search, query_embedding, n_results=candidates, filters=filters
+                )
+
+            if mode == "vector":
+                query_embedding, dense = await dense_search()
+                results = self._with_scores(dense, "vector")
+            else:
+                (query_embedding, dense), lexical = await asyncio.gather(
+                    dense_search(), run_blocking(self.db_manager.lexical_search, query, candidates, filters)
+                )
+                results = self._fuse(dense, lexical, fetch)
+        if self.reranker is not None:
+            results = await run_blocking(self._rerank, query, results, n_results)
+        return query_embedding, results
+
+    def _fetch_size(self, n_results: int) -> int:
+        # The reranker needs more candidates than it returns; its cap bounds the extra work
+        if self.reranker is None:
+            return n_results
+        return max(n_results, self.rerank_candidates)
+
+    def _candidates(self, n_results: int, mode: str) -> int:
+        return n_results * self.candidate_multiplier if mode == "hybrid" else n_results
+
+    def _rerank(self, query: str, results: Dict[str, Any], n_results: int) -> Dict[str, Any]:
+        keys = ("ids", "parent_ids", "documents", "distances", "metadatas", "scores")
+        documents = results["documents"][0]
+        order = list(range(len(documents)))
+        rerank_scores = None
+        if self.reranker is not None and len(documents) > 1:
+            with timed("rerank"):
+                rerank_scores = self.reranker.score(query, documents, self.rerank_budget)
+            if rerank_scores is not None:
+                order = [int(idx) for idx in np.argsort(-rerank_scores, kind="stable")]
+        order = order[:n_results]
+        reranked = {key: [[results[key][0][idx] for idx in order]] for key in keys if results.get(key)}
+        reranked["score_type"] = results.get("score_type")
+        # `scores` keep their first-stage meaning; the cross-encoder scores are reported separately
+        if rerank_scores is not None:
+            reranked["rerank_scores"] = [[float(rerank_scores[idx]) for idx in order]]
+        return reranked
+
+    def _fuse(self, dense: Dict[str, Any], lexical: Dict[str, Any], n_results: int) -> Dict[str, Any]:
+        rows: Dict[str, Dict[str, Any]] = {}
+        for results in (lexical, dense):
+            distances = results.get("distances") or [[None] * len(results["ids"][0])]
+            for doc_id, parent_id, doc, meta, distance in zip(
+                results["ids"][0], results["parent_ids"][0], results["documents"][0],
+                results["metadatas"][0], distances[0]
+            ):
+                rows[doc_id] = {"parent_id": parent_id, "document": doc, "metadata": meta, "distance": distance}
+
+        fused = reciprocal_rank_fusion([dense["ids"][0], lexical["ids"][0]], k=self.rrf_k)[:n_results]
+        return {
+            "ids": [[doc_id for doc_id, _ in fused]],
+            "parent_ids": [[rows[doc_id]["parent_id"] for doc_id, _ in fused]],
+            "documents": [[rows[doc_id]["document"] for doc_id, _ in fused]],
+            "distances": [[rows[doc_id]["distance"] for doc_id, _ in fused]],
+            "metadatas": [[rows[doc_id]["metadata"] for doc_id, _ in fused]],
+            "scores": [[score for _, score in fused]],
+            "score_type": "rrf"
+        }
+
+    @staticmethod
+    def _with_scores(results: Dict[str, Any], mode: str) -> Dict[str, Any]:
+        if mode == "vector":
+            return {**results, "scores": results.get("distances", [[]]), "score_type": "distance"}
+        return {**results, "score_type": "bm25"}
+
+    @staticmethod
+    def _check_mode(mode: str) -> str:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}.")
+        return mode
@@ -0,0 +1,321 @@
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import os
+import threading
+import time
+import logging
+
+from .batching import EmbeddingBatcher
+from .cache import EmbeddingCache, AnswerCache
+from .chunking import TextChunker
+from .concurrency import get_executor, run_blocking
+from .context import ContextPacker
+from .database import ChromaDBManager
+from .embedding_server import EmbeddingClient
+from .embeddings import EmbeddingGenerator
+from .ingest import DocumentIngestor
+from .jobs import IngestJobQueue
+from .lexical import BM25Index
+from .llm import LLMClient
+from .rag import RAGPipeline
+from .rerank import CrossEncoderReranker
+from .retrieval import Retriever
+from .config import (
+    OPENROUTER_API_KEY, CHROMADB_PATH, EMBEDDING_MODEL, MODEL_SLUG,
+    EMBEDDING_BACKEND, ONNX_MODEL_DIR, ONNX_QUANTIZED, EMBEDDING_NUM_THREADS,
+    EMBEDDING_SERVER_ADDRESS, EMBEDDING_SERVER_TIMEOUT_SECONDS, EMBEDDING_SERVER_CONNECTIONS,
+    EMBEDDING_BATCH_SIZE, CHROMADB_WRITE_BATCH_SIZE, DEDUP_METADATA_KEYS, CHROMADB_SHARDS, CHROMADB_SHARD_KEY,
+    CHROMADB_PERSISTENT, CHROMADB_HOST, CHROMADB_PORT, HNSW_SPACE, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH,
+    EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT_MS,
+    EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_TTL_SECONDS,
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS,
+    CHUNK_SIZE, CHUNK_OVERLAP,
+    LLM_API_BASE, LLM_TIMEOUT_SECONDS, LLM_CONNECT_TIMEOUT_SECONDS, LLM_MAX_CONNECTIONS, LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS, LLM_HEDGE_AFTER_SECONDS,
+    LLM_DEADLINE_SECONDS,
+    SEARCH_MODE, LEXICAL_INDEX_PATH, RRF_K, HYBRID_CANDIDATE_MULTIPLIER,
+    RERANK_ENABLED, RERANK_MODEL, RERANK_CANDIDATES, RERANK_BATCH_SIZE, RERANK_BUDGET_MS,
+    CONTEXT_TOKEN_BUDGET, CONTEXT_MMR_LAMBDA, CONTEXT_CANDIDATE_MULTIPLIER, CONTEXT_DUPLICATE_THRESHOLD,
+    CONTEXT_CHARS_PER_TOKEN,
+    INGEST_ASYNC, INGEST_JOURNAL_PATH, INGEST_QUEUE_MAX_ITEMS, INGEST_BATCH_SIZE, INGEST_COALESCE_MS,
+    INGEST_JOB_RETENTION, INGEST_JOURNAL_FSYNC
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WARMUP_TEXT = "warm-up query"
+
+
+class Services:
+    """
+    Lazily constructed service components shared by the API handlers.
+
+    Nothing is built at import time: each component is created on first access (at most once,
+    even under concurrent access), and `warm_up` builds the expensive ones ahead of traffic by
+    loading the embedding model and ChromaDB and running a dummy encode and query.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._warmup: Optional[Future] = None
+        self._warmup_lock = threading.Lock()
+        self._warmup_error: Optional[str] = None
+        self._warmup_seconds: Optional[float] = None
+
+    @property
+    def db_manager(self) -> ChromaDBManager:
+        # The BM25 index is loaded from disk and kept in sync with every add
+        return self._get("db_manager", lambda: ChromaDBManager(
+            CHROMADB_PATH,
+            lexical_index=BM25Index(LEXICAL_INDEX_PATH),
+            id_metadata_keys=DEDUP_METADATA_KEYS,
+            num_shards=CHROMADB_SHARDS,
+            shard_key=CHROMADB_SHARD_KEY,
+            persistent=CHROMADB_PERSISTENT,
+            hnsw_space=HNSW_SPACE,
+            hnsw_m=HNSW_M,
+            hnsw_ef_construction=HNSW_EF_CONSTRUCTION,
+            hnsw_ef_search=HNSW_EF_SEARCH,
+            host=CHROMADB_HOST,
+            port=CHROMADB_PORT
+        ))
+
+    @property
+    def embedding_generator(self) -> EmbeddingGenerator:
+        return self._get("embedding_generator", lambda: EmbeddingGenerator(
+            EMBEDDING_MODEL,
+            backend=EMBEDDING_BACKEND,
+            onnx_model_dir=ONNX_MODEL_DIR,
+            quantized=ONNX_QUANTIZED,
+            num_threads=EMBEDDING_NUM_THREADS,
+            server_address=EMBEDDING_SERVER_ADDRESS,
+            server_timeout=EMBEDDING_SERVER_TIMEOUT_SECONDS,
+            server_connections=EMBEDDING_SERVER_CONNECTIONS
+        ))
+
+    @property
+    def query_cache(self) -> Optional[EmbeddingCache]:
+        return self._get("query_cache", lambda: (
+            EmbeddingCache(EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_TTL_SECONDS)
+            if EMBEDDING_CACHE_MAX_ENTRIES > 0 else None
+        ))
+
+    @property
+    def query_embedder(self) -> EmbeddingBatcher:
+        # Queries from concurrent requests share model calls and repeated queries are served from the cache;
+        # bulk ingestion uses the generator directly
+        return self._get("query_embedder", lambda: EmbeddingBatcher(
+            self.embedding_generator, EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT_MS, cache=self.query_cache
+        ))
+
+    @property
+    def answer_cache(self) -> Optional[AnswerCache]:
+        # Answers are reused for near-identical questions; entries are dropped whenever documents are added
+        return self._get("answer_cache", lambda: (
+            AnswerCache(ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS)
+            if ANSWER_CACHE_ENABLED else None
+        ))
+
+    @property
+    def ingestor(self) -> DocumentIngestor:
+        # Documents are split into overlapping chunks, each stored as its own vector
+        return self._get("ingestor", lambda: DocumentIngestor(
+            self.embedding_generator, self.db_manager, TextChunker(CHUNK_SIZE, CHUNK_OVERLAP),
+            embedding_batch_size=EMBEDDING_BATCH_SIZE, write_batch_size=CHROMADB_WRITE_BATCH_SIZE
+        ))
+
+    @property
+    def ingest_queue(self) -> IngestJobQueue:
+        # Replays the journal on creation, so jobs interrupted by a restart resume
+        return self._get("ingest_queue", lambda: IngestJobQueue(
+            self.ingestor, INGEST_JOURNAL_PATH,
+            max_items=INGEST_QUEUE_MAX_ITEMS,
+            batch_size=INGEST_BATCH_SIZE,
+            coalesce_ms=INGEST_COALESCE_MS,
+            retention=INGEST_JOB_RETENTION,
+            fsync=INGEST_JOURNAL_FSYNC
+        ))
+
+    @property
+    def llm_client(self) -> LLMClient:
+        return self._get("llm_client", lambda: LLMClient(
+            OPENROUTER_API_KEY,
+            api_base=LLM_API_BASE,
+            timeout=LLM_TIMEOUT_SECONDS,
+            connect_timeout=LLM_CONNECT_TIMEOUT_SECONDS,
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            max_retries=LLM_MAX_RETRIES,
+            backoff_base=LLM_BACKOFF_BASE_SECONDS,
+            backoff_max=LLM_BACKOFF_MAX_SECONDS,
+            hedge_after=LLM_HEDGE_AFTER_SECONDS,
+            deadline=LLM_DEADLINE_SECONDS
+        ))
+
+    @property
+    def reranker(self) -> Optional[CrossEncoderReranker]:
+        return self._get("reranker", lambda: (
+            CrossEncoderReranker(RERANK_MODEL, RERANK_BATCH_SIZE) if RERANK_ENABLED else None
+        ))
+
+    @property
+    def retriever(self) -> Retriever:
+        return self._get("retriever", lambda: Retriever(
+            self.db_manager, self.query_embedder, SEARCH_MODE,
+            rrf_k=RRF_K, candidate_multiplier=HYBRID_CANDIDATE_MULTIPLIER,
+            reranker=self.reranker, rerank_candidates=RERANK_CANDIDATES,
+            rerank_budget=RERANK_BUDGET_MS / 1000 if RERANK_BUDGET_MS > 0 else None
+        ))
+
+    @property
+    def rag_pipeline(self) -> RAGPipeline:
+        return self._get("rag_pipeline", lambda: RAGPipeline(
+            self.db_manager, self.query_embedder, OPENROUTER_API_KEY, MODEL_SLUG,
+            answer_cache=self.answer_cache, llm_client=self.llm_client, retriever=self.retriever,
+            context_packer=ContextPacker(
+                self.db_manager,
+                token_budget=CONTEXT_TOKEN_BUDGET,
+                mmr_lambda=CONTEXT_MMR_LAMBDA,
+                candidate_multiplier=CONTEXT_CANDIDATE_MULTIPLIER,
+                duplicate_threshold=CONTEXT_DUPLICATE_THRESHOLD,
+                chars_per_token=CONTEXT_CHARS_PER_TOKEN
+            )
+        ))
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether the warm-up finished: the model is loaded and ChromaDB answered a query.
+        """
+        return self._ready.is_set()
+
+    def start_warm_up(self) -> Future:
+        """
+        Start the warm-up on the shared thread pool, unless it was already started.
+
+        Returns:
+            Future: Resolved when the warm-up finishes; it carries the warm-up exception on failure.
+        """
+        with self._warmup_lock:
+            if self._warmup is None:
+                self._warmup = get_executor().submit(self.warm_up)
+            return self._warmup
+
+    async def wait_ready(self) -> None:
+        """
+        Wait, without blocking the event loop, until the warm-up finished, starting it if needed.
+
+        Raises:
+            RuntimeError: If the warm-up failed.
+        """
+        if self.ready:
+            return
+        await asyncio.shield(asyncio.wrap_future(self.start_warm_up()))
+
+    def warm_up(self) -> None:
+        """
+        Build the components and run a dummy encode and query so the first request is not cold.
+
+        Raises:
+            RuntimeError: If a component fails to load. The error is also reported by `status`.
+        """
+        started = time.perf_counter()
+        try:
+            logger.info("Warming up: loading the embedding model and ChromaDB.")
+            embedding = self.query_embedder.generate_embeddings([WARMUP_TEXT], as_numpy=True)[0]
+            self.db_manager.search(embedding, n_results=1)
+            self.db_manager.lexical_search(WARMUP_TEXT, n_results=1)
+            if self.reranker is not None:
+                # Unbudgeted, so the first real rerank is measured against a warm model
+                self.reranker.score(WARMUP_TEXT, [WARMUP_TEXT] * self.reranker.batch_size)
+            self.ingestor
+            if INGEST_ASYNC or os.path.exists(INGEST_JOURNAL_PATH):
+                self.ingest_queue
+            self.rag_pipeline
+        except Exception as e:
+            self._warmup_error = str(e)
+            logger.error(f"Warm-up failed: {e}")
+            raise RuntimeError(f"Service warm-up failed: {e}")
+        self._warmup_seconds = time.perf_counter() - started
+        self._ready.set()
+        logger.info(f"Warm-up finished in {self._warmup_seconds:.2f}s; service is ready.")
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Return the readiness of the service and of its model and database.
+
+        Returns:
+            Dict[str, Any]: `ready`, whether the model and database are loaded, the warm-up
+            duration in seconds once finished, and the warm-up error, if any.
+        """
+        return {
+            "ready": self.ready,
+            "model_loaded": "embedding_generator" in self._components,
+            "database_loaded": "db_manager" in self._components,
+            "warmup_seconds": round(self._warmup_seconds, 3) if self._warmup_seconds is not None else None,
+            "error": self._warmup_error
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return runtime counters of the components built so far, without building the others.
+
+        Returns:
+            Dict[str, Any]: Counters of the LLM client, query embedding batcher, embedding server
+            client, caches, reranker and ingest queue, and the index settings of the database; None
+            for components that are disabled or not built yet.
+        """
+        components = self._components
+        embedding_backend = getattr(components.get("embedding_generator"), "backend", None)
+        query_cache = components.get("query_cache")
+        answer_cache = components.get("answer_cache")
+        reranker = components.get("reranker")
+        return {
+            "llm_client": components["llm_client"].stats() if "llm_client" in components else None,
+            "embedding_batcher": components["query_embedder"].stats() if "query_embedder" in components else None,
+            "embedding_server": embedding_backend.stats() if isinstance(embedding_backend, EmbeddingClient) else None,
+            "embedding_cache": query_cache.stats() if query_cache else None,
+            "answer_cache": answer_cache.stats() if answer_cache else None,
+            "reranker": reranker.stats() if reranker else None,
+            "ingest_queue": components["ingest_queue"].stats() if "ingest_queue" in components else None,
+            "database": components["db_manager"].index_settings() if "db_manager" in components else None
+        }
+
+    async def aclose(self) -> None:
+        """
+        Stop the ingest worker and the background batching thread, close the embedding server and
+        LLM connections, stop the shard threads and compact the lexical index, if they were started.
+        """
+        ingest_queue = self._components.get("ingest_queue")
+        if ingest_queue is not None:
+            # Blocks until the batch in progress is stored; pending jobs stay in the journal
+            await run_blocking(ingest_queue.stop)
+        query_embedder = self._components.get("query_embedder")
+        if query_embedder is not None:
+            query_embedder.stop()
+        embedding_backend = getattr(self._components.get("embedding_generator"), "backend", None)
+        if isinstance(embedding_backend, EmbeddingClient):
+            embedding_backend.close()
+        llm_client = self._components.get("llm_client")
+        if llm_client is not None:
+            await llm_client.aclose()
+        db_manager = self._components.get("db_manager")
+        if db_manager is not None:
+            db_manager.close()
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        if name in self._components:
+            return self._components[name]
+        with self._locks_lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        # One lock per component, so a request needing the LLM client does not wait for the model load
+        with lock:
+            if name not in self._components:
+                self._components[name] = factory()
+            return self._components[name]
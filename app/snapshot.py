@@ -0,0 +1,170 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import json
+import os
+import logging
+
+import numpy as np
+
+from .filters import without_date_timestamps
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+RECORDS_FILE = "records.jsonl"
+
+
+def export_snapshot(db_manager, path: str, model_name: Optional[str] = None, page_size: int = 1000) -> Dict[str, Any]:
+    """
+    Write every stored document to a snapshot directory.
+
+    The snapshot holds `embeddings.npy`, a contiguous float32 matrix in NumPy format that can be
+    memory-mapped, `records.jsonl` with the ID, text and metadata of each row in matrix order, and
+    `manifest.json`. The collection (every shard, in order) is read page by page and the matrix is
+    written through a memory map, so memory use does not grow with the collection size.
+
+    Args:
+        db_manager: The store to export (ChromaDBManager).
+        path (str): The snapshot directory; created if needed, existing files are replaced.
+        model_name (Optional[str]): Name of the embedding model, recorded in the manifest.
+        page_size (int): Number of documents read per page.
+
+    Returns:
+        Dict[str, Any]: The manifest.
+
+    Raises:
+        ValueError: If the collection is empty.
+    """
+    # Per-shard sizes at the start; documents added during the export past them are not included
+    sizes = [collection.count() for collection in db_manager.collections]
+    total = sum(sizes)
+    if not total:
+        raise ValueError("The collection is empty; there is nothing to export.")
+    os.makedirs(path, exist_ok=True)
+    logger.info(f"Exporting {total} documents to snapshot {path}.")
+
+    matrix = None
+    count = 0
+    with open(os.path.join(path, RECORDS_FILE), "w", encoding="utf-8") as records:
+        for collection, size in zip(db_manager.collections, sizes):
+            offset = 0
+            while offset < size:
+                page = collection.get(
+                    include=["documents", "metadatas", "embeddings"], limit=min(page_size, size - offset), offset=offset
+                )
+                if not page["ids"]:
+                    break
+                embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+                if matrix is None:
+                    matrix = np.lib.format.open_memmap(
+                        os.path.join(path, EMBEDDINGS_FILE), mode="w+", dtype=np.float32, shape=(total, embeddings.shape[1])
+                    )
+                matrix[count:count + len(page["ids"])] = embeddings
+                for doc_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    # Without the `<key>_ts` filter fields: importing recomputes them
+                    record = {"id": doc_id, "document": document, "metadata": without_date_timestamps(metadata) if metadata else metadata}
+                    records.write(json.dumps(record, ensure_ascii=False) + "\n")
+                offset += len(page["ids"])
+                count += len(page["ids"])
+    matrix.flush()
+    dimension = int(matrix.shape[1])
+    del matrix
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "count": count,
+        "dimension": dimension,
+        "dtype": "float32",
+        "embedding_model": model_name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Snapshot {path} written with {count} documents of dimension {dimension}.")
+    return manifest
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """
+    Read and check the manifest of a snapshot directory.
+
+    Raises:
+        FileNotFoundError: If the directory is not a snapshot.
+        ValueError: If the snapshot format is not supported.
+    """
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"'{manifest_path}' not found; '{path}' is not a snapshot.")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format version: {manifest.get('format_version')}.")
+    return manifest
+
+
+def import_snapshot(
+    db_manager,
+    path: str,
+    expected_model: Optional[str] = None,
+    batch_size: int = 5000
+) -> Dict[str, Any]:
+    """
+    Bulk-load a snapshot into the collection without re-encoding anything.
+
+    The embedding matrix is memory-mapped and written in chunks of `batch_size` rows together with
+    the matching records, so only one chunk is held in memory. Documents keep their IDs and are
+    upserted, so importing into a collection that already has some of them does not duplicate them.
+    The `<key>_ts` date filter fields are recomputed, including for snapshots of older stores.
+
+    Args:
+        db_manager: The store to load into (ChromaDBManager).
+        path (str): The snapshot directory.
+        expected_model (Optional[str]): If given, refuse snapshots made with another embedding model.
+        batch_size (int): Number of documents written per chunk.
+
+    Returns:
+        Dict[str, Any]: The snapshot manifest and the number of documents imported.
+
+    Raises:
+        ValueError: If the snapshot was made with a different embedding model or is inconsistent.
+    """
+    manifest = read_manifest(path)
+    snapshot_model = manifest.get("embedding_model")
+    if expected_model and snapshot_model and snapshot_model != expected_model:
+        raise ValueError(
+            f"Snapshot embeddings were made with '{snapshot_model}', not '{expected_model}'. "
+            "Vectors from different models are not comparable."
+        )
+
+    count = manifest["count"]
+    matrix = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+    if matrix.shape[0] < count or matrix.shape[1] != manifest["dimension"]:
+        raise ValueError(f"Snapshot matrix shape {matrix.shape} does not match its manifest.")
+    logger.info(f"Importing {count} documents from snapshot {path}.")
+
+    imported = 0
+    with open(os.path.join(path, RECORDS_FILE), encoding="utf-8") as records:
+        while imported < count:
+            rows = []
+            for line in records:
+                rows.append(json.loads(line))
+                if len(rows) >= min(batch_size, count - imported):
+                    break
+            if not rows:
+                break
+            embeddings = np.ascontiguousarray(matrix[imported:imported + len(rows)])
+            db_manager.add_documents(
+                [row["document"] for row in rows],
+                embeddings,
+                [row["metadata"] for row in rows],
+                ids=[row["id"] for row in rows]
+            )
+            imported += len(rows)
+            logger.info(f"Imported {imported}/{count} documents.")
+    if imported != count:
+        raise ValueError(f"Snapshot has {imported} records but its manifest lists {count}.")
+    return {**manifest, "imported": imported}
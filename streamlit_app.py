@@ -1,3 +1,5 @@
+import json
+
 import streamlit as st
 import requests
 
@@ -29,7 +31,12 @@ def show_error(msg):
 def add_document():
     st.header("📄 Adicionar Documento")
     with st.form("add_doc_form"):
-        text = st.text_area("Conteúdo do documento (Obrigatório)", height=150, max_chars=5000, help="Limite de 5000 caracteres.")
+        text = st.text_area(
+            "Conteúdo do documento",
+            height=150,
+            help="Documentos longos são divididos automaticamente em trechos."
+        )
+        uploaded_file = st.file_uploader("Ou envie um arquivo de texto", type=["txt", "md"])
         col1, col2, col3 = st.columns(3)
         with col1:
             contexto = st.text_input("Contexto (obrigatório)")
@@ -39,8 +46,8 @@ def add_document():
             source = st.text_input("Fonte (opcional)")
         submitted = st.form_submit_button("Adicionar")
     if submitted:
-        if not text.strip():
-            show_error("O conteúdo do documento não pode ser vazio.")
+        if not text.strip() and uploaded_file is None:
+            show_error("Informe o conteúdo do documento ou envie um arquivo.")
             return
         if not contexto.strip():
             show_error("O campo 'Contexto' é obrigatório.")
@@ -49,9 +56,23 @@ def add_document():
         if date: metadata["date"] = date
         if source: metadata["source"] = source
         try:
-            resp = requests.post(f"{API_URL}/add_document", json={"text": text, "metadata": metadata})
+            if uploaded_file is not None:
+                resp = requests.post(
+                    f"{API_URL}/upload_document",
+                    files={"file": (uploaded_file.name, uploaded_file.getvalue(), "text/plain")},
+                    data={"metadata": json.dumps(metadata)}
+                )
+            else:
+                resp = requests.post(f"{API_URL}/add_document", json={"text": text, "metadata": metadata})
             if resp.status_code == 200:
-                show_success(f"Documento adicionado com sucesso! ID: {resp.json().get('id')}")
+                data = resp.json()
+                skipped = data.get("skipped") or 0
+                note = f", {skipped} já existentes" if skipped else ""
+                show_success(f"Documento adicionado com sucesso! ID: {data.get('id')} ({data.get('chunks')} trechos{note})")
+            elif resp.status_code == 202:
+                # Ingestão assíncrona (INGEST_ASYNC=true): o documento foi enfileirado
+                data = resp.json()
+                show_success(f"Documento enfileirado para ingestão. Job: {data.get('job_id')} (acompanhe em /jobs/{data.get('job_id')})")
             else:
                 show_error(f"Erro: {resp.json().get('detail', 'Erro desconhecido')}")
         except Exception as e:
@@ -62,13 +83,24 @@ def search_document():
     with st.form("search_form"):
         query = st.text_input("Digite sua busca", help="Exemplo: 'Japão', 'machine learning', etc.")
         limit = st.slider("Quantidade de resultados", 1, 10, 5)
+        mode = st.selectbox(
+            "Modo de busca", ["vector", "hybrid", "lexical"],
+            help="vector: similaridade semântica; lexical: termos exatos (BM25); hybrid: ambos combinados."
+        )
+        filters = st.text_input(
+            "Filtros de metadados (JSON, opcional)",
+            help='Exemplo: {"source": {"in": ["a", "b"]}, "date": {"gte": "2024-01-01"}}'
+        )
         submitted = st.form_submit_button("Buscar")
     if submitted:
         if not query.strip():
             show_error("A busca não pode ser vazia.")
             return
         try:
-            resp = requests.get(f"{API_URL}/search", params={"query": query, "limit": limit})
+            params = {"query": query, "limit": limit, "mode": mode}
+            if filters.strip():
+                params["filters"] = filters.strip()
+            resp = requests.get(f"{API_URL}/search", params=params)
             if resp.status_code == 200:
                 results = resp.json()
                 if not results:
@@ -78,36 +110,91 @@ def search_document():
                     for idx, res in enumerate(results, 1):
                         with st.expander(f"Resultado {idx} (Score: {res['score']:.4f})"):
                             st.markdown(f"**Conteúdo:** {res['content']}")
+                            st.markdown(f"**Documento:** `{res.get('parent_id')}`")
                             st.markdown(f"**Metadados:** {res['metadata']}")
             else:
                 show_error(f"Erro: {resp.json().get('detail', 'Erro desconhecido')}")
         except Exception as e:
             show_error(f"Erro de conexão com API: {e}")
 
+def iter_sse(resp):
+    """Lê um stream de server-sent events e produz pares (evento, dados)."""
+    event, data_lines = "message", []
+    for line in resp.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+def show_sources(sources):
+    if sources:
+        st.markdown("**Fontes/contexto utilizado:**")
+        for idx, src in enumerate(sources, 1):
+            with st.expander(f"Fonte {idx}"):
+                st.markdown(f"**Conteúdo:** {src['content']}")
+                st.markdown(f"**Metadados:** {src['metadata']}")
+    else:
+        st.info("Nenhuma fonte relevante encontrada para esta resposta.")
+
+def rag_chat_stream(question, max_results):
+    answer_placeholder = st.empty()
+    info_placeholder = st.empty()
+    sources = []
+    answer = ""
+    answer_placeholder.markdown("**Resposta:** _aguardando o modelo..._")
+    with requests.post(
+        f"{API_URL}/chat/stream",
+        json={"question": question, "max_results": max_results},
+        stream=True
+    ) as resp:
+        if resp.status_code != 200:
+            show_error(f"Erro: {resp.json().get('detail', 'Erro desconhecido')}")
+            return
+        for event, data in iter_sse(resp):
+            if event == "sources":
+                sources = data["sources"]
+            elif event == "token":
+                answer += data["content"]
+                answer_placeholder.markdown(f"**Resposta:** {answer}▌")
+            elif event == "done":
+                answer_placeholder.markdown(f"**Resposta:** {answer}")
+                cache_info = " | **Cache:** sim" if data.get("cached") else ""
+                info_placeholder.markdown(
+                    f"**Modelo:** `{data['model_used']}` | **Tokens usados:** {data['tokens_used']}{cache_info}"
+                )
+            elif event == "error":
+                answer_placeholder.empty()
+                show_error(f"Erro: {data.get('detail', 'Erro desconhecido')}")
+                return
+    show_sources(sources)
+
 def rag_chat():
     st.header("💬 RAG Chat")
     with st.form("chat_form"):
         question = st.text_area("Digite sua pergunta", height=80)
         max_results = st.slider("Quantidade de documentos de contexto", 1, 10, 3)
+        streaming = st.checkbox("Mostrar a resposta enquanto é gerada (streaming)", value=True)
         submitted = st.form_submit_button("Perguntar")
     if submitted:
         if not question.strip():
             show_error("A pergunta não pode ser vazia.")
             return
         try:
+            if streaming:
+                rag_chat_stream(question, max_results)
+                return
             resp = requests.post(f"{API_URL}/chat", json={"question": question, "max_results": max_results})
             if resp.status_code == 200:
                 data = resp.json()
                 st.markdown(f"**Resposta:** {data['answer']}")
                 st.markdown(f"**Modelo:** `{data['model_used']}` | **Tokens usados:** {data['tokens_used']}")
-                if data["sources"]:
-                    st.markdown("**Fontes/contexto utilizado:**")
-                    for idx, src in enumerate(data["sources"], 1):
-                        with st.expander(f"Fonte {idx}"):
-                            st.markdown(f"**Conteúdo:** {src['content']}")
-                            st.markdown(f"**Metadados:** {src['metadata']}")
-                else:
-                    st.info("Nenhuma fonte relevante encontrada para esta resposta.")
+                show_sources(data["sources"])
             else:
                 show_error(f"Erro: {resp.json().get('detail', 'Erro desconhecido')}")
         except Exception as e:
@@ -0,0 +1,51 @@
+import zlib
+
+import numpy as np
+import pytest
+from chromadb.api.client import SharedSystemClient
+
+from app.chunking import TextChunker
+from app.database import ChromaDBManager
+from app.ingest import DocumentIngestor
+
+
+class StubEmbedder:
+    """
+    Deterministic stand-in for EmbeddingGenerator: a vector seeded by each text's CRC32.
+    """
+
+    model_name = "stub-embedder"
+    dimension = 16
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vector = rng.standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def generate_embeddings(self, texts, batch_size=32, as_numpy=False):
+        self.embedded += len(texts)
+        matrix = np.stack([self.embed(text) for text in texts]) if texts else np.empty((0, self.dimension), np.float32)
+        return matrix if as_numpy else matrix.tolist()
+
+
+@pytest.fixture
+def embedder():
+    return StubEmbedder()
+
+
+@pytest.fixture
+def db_manager():
+    # Ephemeral clients of one process share their data unless the system cache is cleared
+    SharedSystemClient.clear_system_cache()
+    manager = ChromaDBManager(persistent=False)
+    yield manager
+    manager.close()
+    SharedSystemClient.clear_system_cache()
+
+
+@pytest.fixture
+def ingestor(embedder, db_manager):
+    return DocumentIngestor(embedder, db_manager, TextChunker(chunk_size=40, chunk_overlap=0), write_batch_size=8)
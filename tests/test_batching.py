@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.batching import EmbeddingBatcher
+
+
+class GatedEmbedder:
+    """
+    Wraps an embedder so each model call waits until the test opens the gate.
+    """
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.model_name = embedder.model_name
+        self.gate = threading.Event()
+        self.calls = []
+
+    def generate_embeddings(self, texts, batch_size=32, as_numpy=False):
+        self.gate.wait(5)
+        self.calls.append(list(texts))
+        return self.embedder.generate_embeddings(texts, batch_size, as_numpy)
+
+
+@pytest.fixture
+def gated(embedder):
+    model = GatedEmbedder(embedder)
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait_ms=0)
+    yield model, batcher
+    model.gate.set()
+    batcher.stop()
+
+
+def test_concurrent_texts_share_a_model_call(embedder):
+    batcher = EmbeddingBatcher(embedder, max_batch_size=8, max_wait_ms=50)
+    vectors = batcher.generate_embeddings(["um", "dois", "três"], as_numpy=True)
+    batcher.stop()
+
+    assert vectors.shape == (3, embedder.dimension)
+    assert batcher.stats()["batches"] == 1
+
+
+def test_a_cancelled_request_does_not_stop_the_worker(gated):
+    model, batcher = gated
+    busy = batcher.submit("primeiro")
+    cancelled = batcher.submit("cancelado")
+    assert cancelled.cancel()
+    model.gate.set()
+
+    assert busy.result(5) is not None
+    assert batcher.submit("depois").result(5).shape == (model.embedder.dimension,)
+    assert ["cancelado"] not in model.calls
+
+
+def test_cancelling_an_awaiting_caller_keeps_the_batcher_running(gated):
+    model, batcher = gated
+
+    async def cancel_while_waiting():
+        task = asyncio.ensure_future(batcher.agenerate_embeddings(["desistiu"]))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_while_waiting())
+    model.gate.set()
+
+    assert batcher.submit("outro").result(5).shape == (model.embedder.dimension,)
+
+
+def test_model_errors_reach_every_caller(embedder):
+    class Failing:
+        model_name = "failing"
+
+        def generate_embeddings(self, texts, batch_size=32, as_numpy=False):
+            raise RuntimeError("modelo indisponível")
+
+    batcher = EmbeddingBatcher(Failing(), max_wait_ms=0)
+    with pytest.raises(RuntimeError, match="modelo indisponível"):
+        batcher.generate_embeddings(["a"])
+    assert batcher.generate_embeddings([]) == []
+    batcher.stop()
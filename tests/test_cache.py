@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+
+from app.cache import AnswerCache, EmbeddingCache
+
+
+def test_embedding_cache_evicts_the_least_recently_used():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    cache.get("m", "a")
+    cache.put("m", "c", [3.0])
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_embedding_cache_keys_by_model_and_normalized_text():
+    cache = EmbeddingCache()
+    cache.put("m", "Hello  world", [1.0, 2.0])
+
+    assert cache.get("other", "Hello world") is None
+    np.testing.assert_array_equal(cache.get("m", "Hello world"), [1.0, 2.0])
+
+
+def test_embedding_cache_expires_old_entries(monkeypatch):
+    cache = EmbeddingCache(ttl_seconds=10)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.put("m", "a", [1.0])
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+
+    assert cache.get("m", "a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_embedding_cache_clear_keeps_the_counters():
+    cache = EmbeddingCache()
+    cache.put("m", "a", [1.0])
+    cache.get("m", "a")
+    cache.clear()
+
+    assert cache.get("m", "a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_answer_cache_hits_similar_questions_with_the_same_sources():
+    cache = AnswerCache(similarity_threshold=0.9)
+    cache.store([1.0, 0.0], ["b", "a"], 1, {"response": "sim"})
+
+    assert cache.lookup([0.99, 0.05], ["a", "b"], 1) == {"response": "sim"}
+    assert cache.lookup([0.0, 1.0], ["a", "b"], 1) is None
+    assert cache.lookup([1.0, 0.0], ["a"], 1) is None
+
+
+def test_answer_cache_is_dropped_when_the_data_version_moves():
+    cache = AnswerCache()
+    cache.store([1.0, 0.0], ["a"], 1, {"response": "sim"})
+
+    assert cache.lookup([1.0, 0.0], ["a"], 2) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_answer_cache_ignores_answers_read_from_an_older_version():
+    cache = AnswerCache()
+    cache.lookup([1.0, 0.0], ["a"], 2)
+    cache.store([1.0, 0.0], ["a"], 1, {"response": "antigo"})
+
+    assert cache.lookup([1.0, 0.0], ["a"], 2) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_answer_cache_invalidate_removes_everything():
+    cache = AnswerCache()
+    cache.store([1.0, 0.0], ["a"], 1, {"response": "sim"})
+    cache.invalidate()
+
+    assert cache.lookup([1.0, 0.0], ["a"], 1) is None
@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+from app.chunking import TextChunker, iter_text_file
+
+
+def test_chunks_respect_the_size_and_end_at_whitespace():
+    text = " ".join(f"word{i}" for i in range(200))
+    chunks = list(TextChunker(chunk_size=50, chunk_overlap=0).split(text))
+
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_consecutive_chunks_share_the_overlap():
+    text = " ".join(f"w{i:03d}" for i in range(100))
+    chunks = list(TextChunker(chunk_size=60, chunk_overlap=15).split(text))
+
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.split()[-1] in current.split()
+
+
+def test_chunking_does_not_depend_on_how_the_text_is_sliced():
+    text = "Lorem ipsum dolor sit amet.\n\n" * 40
+    chunker = TextChunker(chunk_size=100, chunk_overlap=20)
+
+    assert list(chunker.split(text, piece_size=7)) == list(chunker.split(text))
+
+
+def test_file_pieces_decode_characters_split_across_reads():
+    text = "ação é coração " * 30
+    pieces = iter_text_file(io.BytesIO(text.encode("utf-8")), read_size=5)
+
+    assert "".join(pieces) == text
+
+
+@pytest.mark.parametrize("size, overlap", [(0, 0), (10, 10), (10, -1)])
+def test_invalid_sizes_are_rejected(size, overlap):
+    with pytest.raises(ValueError):
+        TextChunker(chunk_size=size, chunk_overlap=overlap)
@@ -0,0 +1,51 @@
+import numpy as np
+
+from app.context import ContextPacker, mmr_select
+
+
+def test_mmr_skips_near_duplicates():
+    embeddings = np.array([[1.0, 0.0], [1.0, 0.001], [0.0, 1.0]], dtype=np.float32)
+    relevance = np.array([0.9, 0.89, 0.5], dtype=np.float32)
+
+    assert mmr_select(relevance, embeddings, k=2, duplicate_threshold=0.95) == [0, 2]
+
+
+def test_mmr_with_full_relevance_weight_keeps_the_relevance_order():
+    embeddings = np.eye(3, dtype=np.float32)
+    relevance = np.array([0.2, 0.9, 0.5], dtype=np.float32)
+
+    assert mmr_select(relevance, embeddings, k=3, mmr_lambda=1.0) == [1, 2, 0]
+
+
+def test_mmr_of_nothing_is_empty():
+    assert mmr_select(np.array([]), np.empty((0, 2)), k=3) == []
+
+
+def test_pack_trims_the_document_that_does_not_fit(db_manager):
+    packer = ContextPacker(db_manager, token_budget=20)
+    docs = [
+        "Primeiro documento curto.",
+        "Frase irrelevante sobre outra coisa. O gato dorme no sofá da sala. Mais uma frase qualquer aqui.",
+    ]
+    packed = packer.pack("onde o gato dorme?", ["a", "b"], docs, [{}, {}], max_results=2)
+
+    assert packed["ids"] == ["a", "b"]
+    assert packed["sources"][0]["trimmed"] is False
+    assert packed["sources"][1]["trimmed"] is True
+    assert "gato" in packed["sources"][1]["content"]
+    assert packed["tokens"] <= 20
+
+
+def test_pack_keeps_the_retrieval_order(db_manager):
+    # "a" is the closest to the question by cosine, but the reranker put "c" first
+    embeddings = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.999, 0.04]], dtype=np.float32)
+    db_manager.add_documents(["doc a", "doc b", "doc c"], embeddings, [{"source": s} for s in "abc"], ids=["a", "b", "c"])
+    packer = ContextPacker(db_manager, token_budget=0)
+    docs = {"a": "doc a", "b": "doc b", "c": "doc c"}
+
+    def pack(ids, max_results):
+        return packer.pack("pergunta", ids, [docs[i] for i in ids], [{} for _ in ids], max_results)["ids"]
+
+    assert pack(["c", "b", "a"], 1) == ["c"]
+    # "b" is a near-duplicate of "c", so the next pick is "a"
+    assert pack(["c", "b", "a"], 2) == ["c", "a"]
@@ -0,0 +1,63 @@
+from chromadb.api.client import SharedSystemClient
+
+from app.database import ChromaDBManager
+
+
+def shard_result(ids, distances):
+    return {
+        "ids": [ids],
+        "documents": [[f"doc {doc_id}" for doc_id in ids]],
+        "distances": [distances],
+        "metadatas": [[{"id": doc_id} for doc_id in ids]],
+    }
+
+
+def test_merge_top_k_keeps_the_nearest_across_shards():
+    merged = ChromaDBManager._merge_top_k(
+        {0: shard_result(["a", "b"], [0.1, 0.5]), 1: shard_result(["c", "d"], [0.2, 0.3]), 2: shard_result([], [])},
+        n_results=3,
+    )
+
+    assert merged["ids"] == [["a", "c", "d"]]
+    assert merged["distances"] == [[0.1, 0.2, 0.3]]
+    assert merged["documents"] == [["doc a", "doc c", "doc d"]]
+
+
+def test_sharded_search_matches_a_single_collection(embedder):
+    texts = [f"documento número {i}" for i in range(30)]
+    embeddings = embedder.generate_embeddings(texts, as_numpy=True)
+    query = embedder.embed("consulta")
+
+    results = []
+    for num_shards in (1, 3):
+        SharedSystemClient.clear_system_cache()
+        manager = ChromaDBManager(persistent=False, num_shards=num_shards)
+        manager.add_documents(texts, embeddings, [{"i": i} for i in range(30)])
+        results.append(manager.search(query, n_results=5))
+        manager.close()
+    SharedSystemClient.clear_system_cache()
+
+    assert results[0]["ids"] == results[1]["ids"]
+    assert results[0]["documents"] == results[1]["documents"]
+
+
+def test_search_results_hide_the_timestamp_fields(embedder, db_manager):
+    texts = ["relatório anual"]
+    db_manager.add_documents(texts, embedder.generate_embeddings(texts, as_numpy=True), [{"date": "2024-03-01"}])
+
+    results = db_manager.search(embedder.embed("relatório"), n_results=1, filters={"date": {"gte": "2024-01-01"}})
+
+    assert results["metadatas"] == [[{"date": "2024-03-01"}]]
+
+
+def test_backfill_lets_range_filters_match_older_documents(embedder, db_manager):
+    embedding = embedder.embed("documento antigo")
+    # Stored without `date_ts`, as before date range filters existed
+    db_manager.collections[0].add(ids=["old"], documents=["documento antigo"], embeddings=[embedding],
+                                  metadatas=[{"date": "2023-05-01"}])
+    in_range = {"date": {"gte": "2023-01-01"}}
+    assert db_manager.search(embedding, n_results=1, filters=in_range)["ids"] == [[]]
+
+    assert db_manager.backfill_date_timestamps(page_size=1) == 1
+    assert db_manager.search(embedding, n_results=1, filters=in_range)["ids"] == [["old"]]
+    assert db_manager.backfill_date_timestamps() == 0
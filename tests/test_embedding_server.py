@@ -0,0 +1,51 @@
+import socket
+import struct
+import threading
+
+import pytest
+
+from app.embedding_server import MAX_MESSAGE_BYTES, EmbeddingClient
+
+
+@pytest.fixture
+def bad_server():
+    """
+    A server that answers every request with a length header over the message limit.
+    """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    connections = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            conn.settimeout(5)
+            connections.append(conn)
+            conn.recv(65536)
+            conn.sendall(struct.pack("!I", MAX_MESSAGE_BYTES + 1))
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield "127.0.0.1:%d" % listener.getsockname()[1], connections
+    listener.close()
+    for conn in connections:
+        conn.close()
+
+
+def test_a_malformed_response_closes_the_connection(bad_server):
+    address, connections = bad_server
+    client = EmbeddingClient(address, timeout=5, max_connections=1)
+
+    with pytest.raises(ValueError):
+        client.encode(["texto"], batch_size=1)
+
+    assert client.stats()["idle_connections"] == 0
+    assert client.stats()["errors"] == 1
+    # The server sees the client close its end
+    assert connections[0].recv(1) == b""
+    # The connection slot was released
+    with pytest.raises(ValueError):
+        client.encode(["texto"], batch_size=1)
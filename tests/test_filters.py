@@ -0,0 +1,53 @@
+import pytest
+
+from app.filters import build_where, parse_date, with_date_timestamps, without_date_timestamps
+
+
+def test_iso_dates_get_a_timestamp_companion():
+    metadata = with_date_timestamps({"date": "2024-01-01", "source": "a", "created_ts": 5})
+
+    assert metadata["date_ts"] == parse_date("2024-01-01T00:00:00Z")
+    assert "source_ts" not in metadata
+    assert "created_ts_ts" not in metadata
+
+
+def test_equality_filters_map_to_eq():
+    assert build_where({"source": "a"}) == {"source": {"$eq": "a"}}
+
+
+def test_date_ranges_use_the_timestamp_field():
+    where = build_where({"date": {"gte": "2024-01-01", "lt": "2024-02-01"}, "source": {"in": ["a", "b"]}})
+
+    assert where == {"$and": [
+        {"date_ts": {"$gte": parse_date("2024-01-01")}},
+        {"date_ts": {"$lt": parse_date("2024-02-01")}},
+        {"source": {"$in": ["a", "b"]}},
+    ]}
+
+
+def test_numeric_ranges_stay_on_the_field():
+    assert build_where({"page": {"gt": 3}}) == {"page": {"$gt": 3}}
+
+
+def test_empty_filters_mean_no_filter():
+    assert build_where(None) is None
+    assert build_where({}) is None
+
+
+@pytest.mark.parametrize("filters", [
+    {"date": {"gte": "yesterday"}},
+    {"source": {"like": "a"}},
+    {"source": {"in": []}},
+    {"source": {}},
+    {"$or": "a"},
+    {"source": ["a"]},
+])
+def test_malformed_filters_raise(filters):
+    with pytest.raises(ValueError):
+        build_where(filters)
+
+
+def test_timestamp_companions_are_stripped_for_clients():
+    stored = with_date_timestamps({"date": "2024-01-01", "created_ts": 5})
+
+    assert without_date_timestamps(stored) == {"date": "2024-01-01", "created_ts": 5}
@@ -0,0 +1,61 @@
+import pytest
+
+SHARED = "Shared paragraph that both docs contain."
+
+
+def stored_chunks(db_manager, parent_id):
+    page = db_manager.collections[0].get(where={"parent_id": parent_id}, include=["documents", "metadatas"])
+    return sorted(zip((meta["chunk_index"] for meta in page["metadatas"]), page["documents"]))
+
+
+def test_documents_sharing_a_paragraph_keep_all_their_chunks(ingestor, db_manager):
+    first = ingestor.ingest_text("First document opening words here now. " + SHARED, {"source": "a"})
+    second = ingestor.ingest_text("Second doc starts with other words too. " + SHARED, {"source": "b"})
+
+    assert first["id"] != second["id"]
+    assert second["skipped"] == 0
+    for result in (first, second):
+        chunks = stored_chunks(db_manager, result["id"])
+        assert [index for index, _ in chunks] == list(range(result["chunks"]))
+    assert stored_chunks(db_manager, first["id"])[1:] == stored_chunks(db_manager, second["id"])[1:]
+    assert db_manager.count() == first["chunks"] + second["chunks"]
+
+
+def test_reingesting_unchanged_text_skips_every_chunk(ingestor, db_manager, embedder):
+    text = "First document opening words here now. " + SHARED
+    first = ingestor.ingest_text(text, {"source": "a"})
+    embedded = embedder.embedded
+
+    again = ingestor.ingest_text(text, {"source": "a"})
+
+    assert again == {"id": first["id"], "chunks": first["chunks"], "skipped": first["chunks"]}
+    assert embedder.embedded == embedded
+    assert db_manager.count() == first["chunks"]
+
+
+def test_reingesting_with_new_metadata_updates_it_without_embedding(ingestor, db_manager, embedder):
+    text = "First document opening words here now. " + SHARED
+    first = ingestor.ingest_text(text, {"source": "a", "date": "2024-01-01"})
+    embedded = embedder.embedded
+
+    again = ingestor.ingest_text(text, {"source": "b", "date": "2024-02-01"})
+
+    assert again["id"] == first["id"] and again["skipped"] == first["chunks"]
+    assert embedder.embedded == embedded
+    metadatas = db_manager.collections[0].get(where={"parent_id": first["id"]}, include=["metadatas"])["metadatas"]
+    assert {meta["source"] for meta in metadatas} == {"b"}
+    assert {meta["date"] for meta in metadatas} == {"2024-02-01"}
+    assert all("date_ts" in meta for meta in metadatas)
+
+
+def test_store_reports_repeated_documents_once(ingestor):
+    stored = ingestor.store(["same text", "same text", "other text"], [{"k": 1}, {"k": 1}, {"k": 1}])
+
+    assert stored["ids"][0] == stored["ids"][1]
+    assert stored["written"] == [True, False, True]
+    assert (stored["added"], stored["skipped"], stored["updated"]) == (2, 1, 0)
+
+
+def test_empty_document_is_rejected(ingestor):
+    with pytest.raises(ValueError):
+        ingestor.ingest_text("   ", {"source": "a"})
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from app.filelock import try_lock_file
+from app.jobs import JOB_COMPLETED, JOB_FAILED, JOB_QUEUED, KIND_DOCUMENTS, IngestJobQueue, IngestQueueFull
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def finished(queue, job_id):
+    return lambda: queue.get(job_id)["status"] in (JOB_COMPLETED, JOB_FAILED)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "jobs.jsonl")
+
+
+@pytest.fixture
+def queues(ingestor, journal):
+    started = []
+
+    def start(**kwargs):
+        queue = IngestJobQueue(ingestor, journal, coalesce_ms=0, fsync=False, **kwargs)
+        started.append(queue)
+        return queue
+
+    yield start
+    for queue in started:
+        queue.stop()
+
+
+def test_jobs_are_processed_and_reported(queues, db_manager):
+    queue = queues()
+    job_id, status = queue.submit(KIND_DOCUMENTS, [("primeiro texto", {"source": "a"}), ("segundo texto", {"source": "b"})])
+
+    assert status == JOB_QUEUED
+    wait_for(finished(queue, job_id))
+    job = queue.get(job_id)
+    assert job["status"] == JOB_COMPLETED
+    assert [result["error"] for result in job["results"]] == [None, None]
+    assert db_manager.count() == 2
+
+
+def test_a_job_with_only_errors_fails_at_once(queues):
+    job_id, status = queues().submit(KIND_DOCUMENTS, [("", {})], errors={0: "Text input cannot be empty."})
+
+    assert status == JOB_FAILED
+
+
+def test_unfinished_jobs_resume_from_the_journal(queues, journal, db_manager):
+    # Hold the owner lock so no queue processes anything until it is released
+    owner = try_lock_file(journal + ".owner")
+    first = queues()
+    job_id, _ = first.submit(KIND_DOCUMENTS, [("primeiro texto", {"source": "a"}), ("segundo texto", {"source": "b"})])
+    first.stop()
+
+    second = queues()
+    assert second.get(job_id)["status"] == JOB_QUEUED
+    owner.close()
+
+    wait_for(finished(second, job_id))
+    assert second.get(job_id)["status"] == JOB_COMPLETED
+    assert db_manager.count() == 2
+
+
+def test_queues_sharing_a_journal_have_one_owner(queues, db_manager):
+    first, second = queues(), queues()
+    wait_for(lambda: first.stats()["owner"] or second.stats()["owner"])
+
+    job_id, _ = second.submit(KIND_DOCUMENTS, [("texto compartilhado", {"source": "a"})])
+
+    wait_for(finished(first, job_id))
+    assert [first.stats()["owner"], second.stats()["owner"]].count(True) == 1
+    assert first.get(job_id) == second.get(job_id)
+    assert db_manager.count() == 1
+
+
+def test_a_full_queue_rejects_jobs(queues, journal):
+    owner = try_lock_file(journal + ".owner")
+    queue = queues(max_items=2)
+    queue.submit(KIND_DOCUMENTS, [("um", {}), ("dois", {})])
+
+    with pytest.raises(IngestQueueFull):
+        queue.submit(KIND_DOCUMENTS, [("três", {})])
+    assert queue.stats()["rejected"] == 1
+    owner.close()
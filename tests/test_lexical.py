@@ -0,0 +1,68 @@
+import os
+
+from app.lexical import JOURNAL_FILE, BM25Index
+
+
+def ranked(index, query):
+    return [doc_id for doc_id, _ in index.search(query)]
+
+
+def test_the_journal_is_replayed_on_reopen(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.add(["a", "b"], ["gato preto", "cachorro branco"])
+    index.remove(["b"])
+    # Simulate a crash: no compaction on close
+    index._journal.close()
+
+    reopened = BM25Index(str(tmp_path))
+
+    assert len(reopened) == 1
+    assert ranked(reopened, "gato") == ["a"]
+    assert ranked(reopened, "cachorro") == []
+    reopened.close()
+
+
+def test_compaction_keeps_the_documents_and_empties_the_journal(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.add(["a"], ["gato preto"])
+    index.compact()
+    index.add(["b"], ["cachorro branco"])
+    index.close()
+
+    assert os.path.getsize(tmp_path / JOURNAL_FILE) == 0
+    reopened = BM25Index(str(tmp_path))
+    assert sorted(ranked(reopened, "gato cachorro")) == ["a", "b"]
+    reopened.close()
+
+
+def test_a_torn_journal_line_is_skipped(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.add(["a"], ["gato preto"])
+    index._journal.close()
+    with open(tmp_path / JOURNAL_FILE, "ab") as f:
+        f.write(b'{"id": "b", "ter')
+
+    reopened = BM25Index(str(tmp_path))
+    reopened.add(["c"], ["cachorro branco"])
+    reopened._journal.close()
+
+    again = BM25Index(str(tmp_path))
+    assert sorted(ranked(again, "gato cachorro")) == ["a", "c"]
+    again.close()
+
+
+def test_instances_sharing_a_directory_see_each_other(tmp_path):
+    first = BM25Index(str(tmp_path))
+    second = BM25Index(str(tmp_path))
+
+    first.add(["a"], ["gato preto"])
+    assert ranked(second, "gato") == ["a"]
+
+    second.compact()
+    second.add(["b"], ["cachorro branco"])
+    assert sorted(ranked(first, "gato cachorro")) == ["a", "b"]
+
+    first.remove(["a"])
+    assert ranked(second, "gato") == []
+    first.close()
+    second.close()
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app.batching import EmbeddingBatcher
+from app.cache import AnswerCache
+from app.rag import RAGPipeline
+
+
+class FakeLLMClient:
+    """
+    Streams the given chunks as an OpenAI-compatible chat completion stream.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def stream_chat_completion(self, params):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def delta(content, finish_reason=None):
+    return {"choices": [{"delta": {"content": content}, "finish_reason": finish_reason}]}
+
+
+@pytest.fixture
+def pipeline(embedder, db_manager):
+    texts = ["O gato dorme no sofá.", "O cachorro corre no parque."]
+    db_manager.add_documents(texts, embedder.generate_embeddings(texts, as_numpy=True), [{"source": "a"}, {"source": "b"}])
+    batcher = EmbeddingBatcher(embedder, max_wait_ms=0)
+
+    def build(chunks):
+        return RAGPipeline(db_manager, batcher, api_key="test", answer_cache=AnswerCache(), llm_client=FakeLLMClient(chunks))
+
+    yield build
+    batcher.stop()
+
+
+def stream_until_done(rag):
+    async def consume():
+        events = []
+        stream = rag.astream_answer("Onde o gato dorme?", max_results=2)
+        async for event, data in stream:
+            events.append(event)
+            if event == "done":
+                # The client disconnects right after the final event
+                await stream.aclose()
+        return events
+
+    return asyncio.run(consume())
+
+
+def test_a_complete_answer_is_cached_before_the_final_event(pipeline):
+    rag = pipeline([delta("No "), delta("sofá."), delta("", finish_reason="stop")])
+
+    assert stream_until_done(rag) == ["sources", "token", "token", "done"]
+    assert rag.answer_cache.stats()["size"] == 1
+
+
+@pytest.mark.parametrize("chunks", [[delta("No ")], [delta("", finish_reason="stop")]])
+def test_truncated_or_empty_answers_are_not_cached(pipeline, chunks):
+    rag = pipeline(chunks)
+
+    assert stream_until_done(rag)[-1] == "done"
+    assert rag.answer_cache.stats()["size"] == 0
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from app.rerank import CrossEncoderReranker
+
+
+class SlowModel:
+    """
+    Scores a pair by its document length, taking `delay` seconds per batch.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def predict(self, pairs, batch_size=16):
+        time.sleep(self.delay)
+        return [len(doc) for _, doc in pairs]
+
+
+def reranker(delay, batch_size=2):
+    # Built without loading a cross-encoder
+    instance = CrossEncoderReranker.__new__(CrossEncoderReranker)
+    instance.model = SlowModel(delay)
+    instance.model_name = "slow"
+    instance.batch_size = batch_size
+    instance._batch_seconds = 0.0
+    instance._stats_lock = threading.Lock()
+    instance._counters = {"reranked": 0, "fallbacks": 0, "pairs": 0}
+    return instance
+
+
+def test_scores_every_document_without_a_budget():
+    scores = reranker(0).score("q", ["a", "bbb", "cc"])
+
+    assert scores.tolist() == [1, 3, 2]
+
+
+def test_a_finished_scoring_is_kept_even_if_it_ends_late():
+    model = reranker(0.05)
+
+    assert model.score("q", ["a", "bb"], budget_seconds=0.01).tolist() == [1, 2]
+    assert model.stats()["fallbacks"] == 0
+
+
+def test_an_unfinished_scoring_over_budget_falls_back():
+    model = reranker(0.05)
+
+    assert model.score("q", ["a", "bb", "ccc", "dddd"], budget_seconds=0.01) is None
+    assert model.stats()["fallbacks"] == 1
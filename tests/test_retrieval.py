@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from app.retrieval import Retriever, reciprocal_rank_fusion
+
+
+def test_ids_ranked_by_both_lists_come_first():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b", "d"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+
+
+def test_a_single_ranking_keeps_its_order():
+    assert [doc_id for doc_id, _ in reciprocal_rank_fusion([["x", "y", "z"]])] == ["x", "y", "z"]
+
+
+def test_no_rankings_fuse_to_nothing():
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+class LengthReranker:
+    """
+    Scores documents by length, standing in for a cross-encoder.
+    """
+
+    def score(self, query, documents, budget_seconds=None):
+        return np.array([len(doc) for doc in documents], dtype=np.float32)
+
+
+def test_reranked_vector_search_keeps_distances_as_scores(embedder, db_manager):
+    texts = ["curto", "texto médio", "um texto bem mais longo"]
+    db_manager.add_documents(texts, embedder.generate_embeddings(texts, as_numpy=True), [{"source": t} for t in texts])
+    retriever = Retriever(db_manager, embedder, reranker=LengthReranker(), rerank_candidates=3)
+
+    _, results = retriever.search("texto", n_results=2)
+
+    assert results["documents"] == [["um texto bem mais longo", "texto médio"]]
+    assert results["rerank_scores"] == [[23.0, 11.0]]
+    assert results["score_type"] == "distance"
+    assert results["scores"] == results["distances"]
@@ -0,0 +1,28 @@
+import json
+
+from chromadb.api.client import SharedSystemClient
+
+from app.database import ChromaDBManager
+from app.snapshot import RECORDS_FILE, export_snapshot, import_snapshot
+
+
+def test_snapshots_round_trip_without_the_timestamp_fields(tmp_path, embedder, db_manager):
+    texts = ["relatório anual", "ata de reunião"]
+    metadatas = [{"date": "2024-03-01"}, {"source": "atas"}]
+    db_manager.add_documents(texts, embedder.generate_embeddings(texts, as_numpy=True), metadatas)
+
+    manifest = export_snapshot(db_manager, str(tmp_path), model_name=embedder.model_name)
+    with open(tmp_path / RECORDS_FILE, encoding="utf-8") as f:
+        exported = sorted((json.loads(line)["metadata"] for line in f), key=json.dumps)
+    assert manifest["count"] == 2
+    assert exported == sorted(metadatas, key=json.dumps)
+
+    SharedSystemClient.clear_system_cache()
+    target = ChromaDBManager(persistent=False)
+    try:
+        assert import_snapshot(target, str(tmp_path), expected_model=embedder.model_name)["imported"] == 2
+        # Date range filters work on the imported copy
+        results = target.search(embedder.embed("relatório"), n_results=2, filters={"date": {"gte": "2024-01-01"}})
+        assert results["documents"] == [["relatório anual"]]
+    finally:
+        target.close()
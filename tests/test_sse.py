@@ -0,0 +1,12 @@
+import json
+
+from app.main import format_sse
+
+
+def test_events_are_framed_with_json_data():
+    frame = format_sse("token", {"content": "olá\nmundo"})
+
+    assert frame.endswith("\n\n")
+    event, data = frame.rstrip("\n").split("\n")
+    assert event == "event: token"
+    assert json.loads(data[len("data: "):]) == {"content": "olá\nmundo"}
@@ -0,0 +1,55 @@
+"""
+Add the `<key>_ts` date filter fields to documents stored before date range filters existed.
+
+    python tools/backfill_dates.py
+    python tools/backfill_dates.py --chroma-path ./chroma_db_copy
+
+Date range filters (`{"date": {"gte": "2024-01-01"}}`) compare the numeric `<key>_ts` companion of
+each ISO date value, which is only written on ingestion; older documents have none and never match
+a range. This one-off migration adds the missing fields in place, keeping texts and embeddings, and
+is safe to run again. Importing a snapshot (`tools/snapshot.py import`) backfills them as well.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config import (  # noqa: E402
+    CHROMADB_PATH, DEDUP_METADATA_KEYS, CHROMADB_SHARDS, CHROMADB_SHARD_KEY, CHROMADB_HOST, CHROMADB_PORT,
+    HNSW_SPACE, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+)
+from app.database import ChromaDBManager  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the date filter fields of previously stored documents.")
+    parser.add_argument("--chroma-path", default=CHROMADB_PATH)
+    parser.add_argument("--chroma-host", default=CHROMADB_HOST, help="Chroma server to use instead of --chroma-path.")
+    parser.add_argument("--chroma-port", type=int, default=CHROMADB_PORT)
+    parser.add_argument("--shards", type=int, default=CHROMADB_SHARDS, help="Number of shards of the store.")
+    parser.add_argument("--page-size", type=int, default=1000, help="Documents read per page.")
+    args = parser.parse_args()
+
+    db = ChromaDBManager(
+        args.chroma_path,
+        id_metadata_keys=DEDUP_METADATA_KEYS,
+        num_shards=args.shards,
+        shard_key=CHROMADB_SHARD_KEY,
+        hnsw_space=HNSW_SPACE,
+        hnsw_m=HNSW_M,
+        hnsw_ef_construction=HNSW_EF_CONSTRUCTION,
+        hnsw_ef_search=HNSW_EF_SEARCH,
+        host=args.chroma_host,
+        port=args.chroma_port
+    )
+    try:
+        updated = db.backfill_date_timestamps(page_size=args.page_size)
+    finally:
+        db.close()
+    print(json.dumps({"updated": updated}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
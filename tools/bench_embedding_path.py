@@ -0,0 +1,74 @@
+"""
+Compare the list-based and the float32 array embedding paths into ChromaDB.
+
+    python tools/bench_embedding_path.py --count 20000 --dimension 384
+
+Random unit vectors stand in for model output, so only the hand-off is measured: converting the
+encoder's array to nested lists (`.tolist()`) and adding those, against adding the array slices
+directly. Each path runs on a fresh in-memory collection. Prints JSON with the wall time and the
+peak Python memory (tracemalloc) of the conversion plus `collection.add` for both paths.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+
+
+def run_path(vectors: np.ndarray, texts, batch_size: int, as_list: bool) -> dict:
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(f"bench-{uuid.uuid4().hex}")
+    ids = [str(i) for i in range(len(texts))]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    embeddings = vectors.tolist() if as_list else vectors
+    for start in range(0, len(texts), batch_size):
+        end = start + batch_size
+        collection.add(ids=ids[start:end], documents=texts[start:end], embeddings=embeddings[start:end])
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stored = collection.count()
+    client.delete_collection(collection.name)
+    return {
+        "seconds": round(elapsed, 4),
+        "vectors_per_second": round(len(texts) / elapsed, 1),
+        "peak_python_mb": round(peak / 2 ** 20, 2),
+        "stored": stored,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list vs float32 array embedding hand-off to ChromaDB.")
+    parser.add_argument("--count", type=int, default=20000, help="Number of vectors.")
+    parser.add_argument("--dimension", type=int, default=384, help="Embedding dimension.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Vectors per collection.add call.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = rng.standard_normal((args.count, args.dimension), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    texts = [f"documento sintético {i}" for i in range(args.count)]
+
+    lists = run_path(vectors, texts, args.batch_size, as_list=True)
+    arrays = run_path(vectors, texts, args.batch_size, as_list=False)
+    print(json.dumps({
+        "count": args.count,
+        "dimension": args.dimension,
+        "batch_size": args.batch_size,
+        "list": lists,
+        "ndarray": arrays,
+        "speedup": round(lists["seconds"] / arrays["seconds"], 2),
+        "peak_memory_ratio": round(lists["peak_python_mb"] / max(arrays["peak_python_mb"], 1e-6), 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Reproducible end-to-end benchmark and load test of the RAG API, with the local stub LLM.
+
+    python tools/bench_service.py --spawn --docs 5000 --concurrency 1,4,16 --output bench.json
+    python tools/bench_service.py --url http://localhost:8000 --skip-chat
+    python tools/bench_service.py --spawn --baseline bench-main.json --output bench-branch.json
+
+With `--spawn` the API (`uvicorn app.main:app`) and `tools/stub_llm.py` are started as subprocesses
+on free ports, with a fresh ChromaDB directory and `LLM_API_BASE` pointing at the stub, and stopped
+at the end; otherwise `--url` must point at a running service (start it with `LLM_API_BASE` pointing
+at a stub for the chat phase).
+
+Phases, each reported in the JSON output:
+- ingest_single: `--single-docs` documents through `POST /add_document`, docs/sec;
+- ingest_bulk: the rest of the corpus through `POST /add_documents` in `--bulk-size` batches, docs/sec;
+- search: `GET /search` at each `--concurrency` level, latency p50/p95/p99 and QPS;
+- chat: `POST /chat` at each `--concurrency` level against the stub with `--llm-delay` seconds per answer.
+
+The synthetic corpus and queries depend only on `--seed` (plus `--docs`/`--doc-words`), so runs on
+different commits see the same workload. Documents carry a per-run tag so that content-hash
+deduplication does not skip them on a reused store. Every concurrency level replays the same
+queries, so levels after the first also exercise the query embedding cache. `--baseline` adds the relative change of each
+headline metric against a previous result file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+TOPICS = ["finanças", "saúde", "esportes", "tecnologia", "política", "ciência", "viagem", "culinária"]
+SOURCES = ["wiki", "news", "blog", "manual"]
+
+
+def make_vocabulary(rng: random.Random, size: int) -> List[str]:
+    syllables = ["ba", "ce", "di", "fo", "gu", "la", "me", "ni", "po", "ra", "sa", "te", "vi", "xo", "zu", "tra"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_corpus(count: int, words_per_doc: int, seed: int, tag: str) -> List[Dict[str, Any]]:
+    """
+    Build a deterministic synthetic corpus with Zipf-like word frequencies and filterable metadata.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng, 5000)
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    corpus = []
+    for i in range(count):
+        words = rng.choices(vocabulary, weights=weights, k=max(1, words_per_doc + rng.randint(-words_per_doc // 4, words_per_doc // 4)))
+        topic = rng.choice(TOPICS)
+        corpus.append({
+            "text": f"{topic}: {' '.join(words)}. Documento {i} [{tag}]",
+            "metadata": {
+                "topic": topic,
+                "source": rng.choice(SOURCES),
+                "date": f"20{rng.randint(18, 25):02d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "bench": tag,
+            },
+        })
+    return corpus
+
+
+def make_queries(corpus: List[Dict[str, Any]], count: int, seed: int) -> List[str]:
+    """
+    Build queries from word runs of corpus documents, so every query has relevant matches.
+    """
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(corpus)["text"].split(": ", 1)[1].split()
+        start = rng.randrange(max(1, len(words) - 6))
+        queries.append(" ".join(words[start:start + rng.randint(3, 6)]).rstrip("."))
+    return queries
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> Dict[str, Any]:
+    """
+    Latency percentiles in milliseconds and throughput of one load phase.
+    """
+    summary = {"requests": len(latencies) + errors, "errors": errors, "seconds": round(elapsed, 3)}
+    if latencies:
+        values = np.asarray(latencies) * 1000
+        summary.update({
+            "qps": round(len(latencies) / elapsed, 2),
+            "mean_ms": round(float(values.mean()), 2),
+            "p50_ms": round(float(np.percentile(values, 50)), 2),
+            "p95_ms": round(float(np.percentile(values, 95)), 2),
+            "p99_ms": round(float(np.percentile(values, 99)), 2),
+            "max_ms": round(float(values.max()), 2),
+        })
+    return summary
+
+
+async def run_load(concurrency: int, total: int, send) -> Dict[str, Any]:
+    """
+    Issue `total` requests with at most `concurrency` in flight (closed loop).
+
+    Args:
+        concurrency (int): Number of concurrent workers.
+        total (int): Number of requests.
+        send: Coroutine function taking the request index and raising on failure.
+    """
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                await send(index)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def bench_ingest_single(client: httpx.AsyncClient, docs: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    async def send(index: int):
+        response = await client.post("/add_document", json=docs[index])
+        response.raise_for_status()
+
+    result = await run_load(concurrency, len(docs), send)
+    result["concurrency"] = concurrency
+    result["docs_per_second"] = round((result["requests"] - result["errors"]) / result["seconds"], 2) if docs else 0.0
+    return result
+
+
+async def bench_ingest_bulk(client: httpx.AsyncClient, docs: List[Dict[str, Any]], batch_size: int) -> Dict[str, Any]:
+    added = skipped = failed = 0
+    started = time.perf_counter()
+    for start in range(0, len(docs), batch_size):
+        response = await client.post("/add_documents", json={"documents": docs[start:start + batch_size]})
+        response.raise_for_status()
+        body = response.json()
+        added += body["added"]
+        skipped += body.get("skipped", 0)
+        failed += body["failed"]
+    elapsed = time.perf_counter() - started
+    return {
+        "documents": len(docs),
+        "batch_size": batch_size,
+        "added": added,
+        "skipped": skipped,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(len(docs) / elapsed, 2) if docs else 0.0,
+    }
+
+
+async def bench_search(
+    client: httpx.AsyncClient, queries: List[str], levels: List[int], requests: int, limit: int, mode: Optional[str]
+) -> List[Dict[str, Any]]:
+    async def send(index: int):
+        params = {"query": queries[index % len(queries)], "limit": limit}
+        if mode:
+            params["mode"] = mode
+        response = await client.get("/search", params=params)
+        response.raise_for_status()
+
+    results = []
+    for concurrency in levels:
+        result = await run_load(concurrency, requests, send)
+        results.append({"concurrency": concurrency, **result})
+    return results
+
+
+async def bench_chat(
+    client: httpx.AsyncClient, queries: List[str], levels: List[int], requests: int, max_results: int
+) -> List[Dict[str, Any]]:
+    tokens: List[int] = []
+
+    async def send(index: int):
+        question = f"O que dizem os documentos sobre {queries[-1 - index % len(queries)]}?"
+        response = await client.post("/chat", json={"question": question, "max_results": max_results})
+        response.raise_for_status()
+        tokens.append(response.json().get("tokens_used", 0))
+
+    results = []
+    for concurrency in levels:
+        tokens.clear()
+        result = await run_load(concurrency, requests, send)
+        result["mean_tokens_used"] = round(float(np.mean(tokens)), 1) if tokens else 0.0
+        results.append({"concurrency": concurrency, **result})
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_services(llm_delay: float, workdir: str, log_file) -> Tuple[List[subprocess.Popen], str]:
+    """
+    Start the stub LLM and the API on free ports, with a fresh store under `workdir`.
+    """
+    stub_port, api_port = free_port(), free_port()
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "tools", "stub_llm.py"), "--port", str(stub_port), "--delay", str(llm_delay)],
+        stdout=log_file, stderr=subprocess.STDOUT, cwd=ROOT
+    )
+    env = dict(os.environ)
+    env.update({
+        "LLM_API_BASE": f"http://127.0.0.1:{stub_port}/v1",
+        "OPENROUTER_API_KEY": env.get("OPENROUTER_API_KEY") or "stub",
+        "CHROMADB_PATH": os.path.join(workdir, "chroma_db"),
+        "LEXICAL_INDEX_PATH": os.path.join(workdir, "chroma_db_lexical"),
+        "SNAPSHOT_DIR": os.path.join(workdir, "snapshots"),
+    })
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(api_port)],
+        stdout=log_file, stderr=subprocess.STDOUT, cwd=ROOT, env=env
+    )
+    return [api, stub], f"http://127.0.0.1:{api_port}"
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> float:
+    """
+    Poll `/readyz` until the service is warmed up; returns the seconds waited.
+    """
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            response = await client.get("/readyz")
+            if response.status_code == 200:
+                return time.perf_counter() - started
+            if response.json().get("error"):
+                raise RuntimeError(f"Service warm-up failed: {response.json()['error']}")
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"Service not ready after {timeout:.0f} s.")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def headline_metrics(result: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Flatten the metrics compared against a baseline.
+    """
+    metrics = {}
+    for phase in ("ingest_single", "ingest_bulk"):
+        if result.get(phase):
+            metrics[f"{phase}.docs_per_second"] = result[phase]["docs_per_second"]
+    for phase in ("search", "chat"):
+        for level in result.get(phase) or []:
+            for key in ("qps", "p50_ms", "p95_ms", "p99_ms"):
+                if key in level:
+                    metrics[f"{phase}.c{level['concurrency']}.{key}"] = level[key]
+    return metrics
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Relative change of each headline metric (positive means higher than the baseline).
+    """
+    current, previous = headline_metrics(result), headline_metrics(baseline)
+    return {
+        "baseline_commit": baseline.get("commit"),
+        "changes": {
+            key: round(current[key] / previous[key] - 1, 4)
+            for key in current if previous.get(key)
+        },
+    }
+
+
+async def run(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    tag = args.tag or uuid.uuid4().hex[:8]
+    corpus = make_corpus(args.docs, args.doc_words, args.seed, tag)
+    queries = make_queries(corpus, max(args.search_requests, args.chat_requests, 1), args.seed)
+    single_docs = corpus[:min(args.single_docs, len(corpus))]
+    bulk_docs = corpus[len(single_docs):]
+
+    timeout = httpx.Timeout(args.request_timeout)
+    limits = httpx.Limits(max_connections=max(levels + [args.ingest_concurrency]) * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        ready_seconds = await wait_ready(client, args.ready_timeout)
+        result: Dict[str, Any] = {"ready_seconds": round(ready_seconds, 3)}
+        print(f"Ingesting {len(single_docs)} documents one by one...", file=sys.stderr)
+        result["ingest_single"] = await bench_ingest_single(client, single_docs, args.ingest_concurrency)
+        print(f"Ingesting {len(bulk_docs)} documents in bulk...", file=sys.stderr)
+        result["ingest_bulk"] = await bench_ingest_bulk(client, bulk_docs, args.bulk_size)
+        if not args.skip_search:
+            print(f"Searching at concurrency {levels}...", file=sys.stderr)
+            result["search"] = await bench_search(
+                client, queries, levels, args.search_requests, args.limit, args.search_mode
+            )
+        if not args.skip_chat:
+            print(f"Chatting at concurrency {levels}...", file=sys.stderr)
+            result["chat"] = await bench_chat(client, queries, levels, args.chat_requests, args.max_results)
+        try:
+            result["service_stats"] = (await client.get("/stats")).json()
+        except (httpx.HTTPError, ValueError):
+            result["service_stats"] = None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest, search and chat of the RAG API.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running service.")
+    target.add_argument("--spawn", action="store_true", help="Start the API and the stub LLM as subprocesses.")
+    parser.add_argument("--docs", type=int, default=2000, help="Size of the synthetic corpus.")
+    parser.add_argument("--doc-words", type=int, default=120, help="Average words per document.")
+    parser.add_argument("--single-docs", type=int, default=200, help="Documents sent through /add_document.")
+    parser.add_argument("--ingest-concurrency", type=int, default=4, help="Concurrent /add_document requests.")
+    parser.add_argument("--bulk-size", type=int, default=500, help="Documents per /add_documents request.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels for search and chat.")
+    parser.add_argument("--search-requests", type=int, default=500, help="Search requests per concurrency level.")
+    parser.add_argument("--search-mode", default=None, help="vector, lexical or hybrid (default: the service setting).")
+    parser.add_argument("--limit", type=int, default=5, help="Results per search.")
+    parser.add_argument("--chat-requests", type=int, default=50, help="Chat requests per concurrency level.")
+    parser.add_argument("--max-results", type=int, default=3, help="max_results of each chat request.")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="Stub LLM delay in seconds (with --spawn).")
+    parser.add_argument("--skip-search", action="store_true")
+    parser.add_argument("--skip-chat", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tag", default=None, help="Tag added to every document (default: random per run).")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--ready-timeout", type=float, default=600.0)
+    parser.add_argument("--baseline", default=None, help="Previous result file to compare against.")
+    parser.add_argument("--output", default=None, help="Write the JSON result to this file as well.")
+    args = parser.parse_args()
+
+    processes: List[subprocess.Popen] = []
+    workdir = tempfile.mkdtemp(prefix="rag-bench-") if args.spawn else None
+    log_file = open(os.path.join(workdir, "services.log"), "w") if workdir else None
+    try:
+        if args.spawn:
+            processes, base_url = spawn_services(args.llm_delay, workdir, log_file)
+        else:
+            base_url = args.url.rstrip("/")
+        result = asyncio.run(run(args, base_url))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if log_file:
+            log_file.close()
+            print(f"Service logs: {log_file.name}", file=sys.stderr)
+
+    output = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "target": "spawn" if args.spawn else base_url,
+        "params": {
+            key: value for key, value in vars(args).items()
+            if key not in ("url", "spawn", "baseline", "output", "tag")
+        },
+        **result,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            output["comparison"] = compare(output, json.load(f))
+    text = json.dumps(output, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Run the shared embedding server: a pool of local processes that hold the embedding model.
+
+    python tools/embedding_server.py --workers 2 --threads 4
+    CHROMADB_HOST=localhost EMBEDDING_BACKEND=remote uvicorn app.main:app --workers 8
+
+API workers started with `EMBEDDING_BACKEND=remote` load no model and send their texts to the
+server at `EMBEDDING_SERVER_ADDRESS`. Several workers also need a Chroma server (`CHROMADB_HOST`),
+see the README. Each server worker holds one model copy and coalesces the
+requests of its connections into shared forward passes; use `--threads` to split the CPU cores
+between the workers.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config import (  # noqa: E402
+    EMBEDDING_MODEL, ONNX_MODEL_DIR, ONNX_QUANTIZED, EMBEDDING_NUM_THREADS,
+    EMBEDDING_SERVER_ADDRESS, EMBEDDING_SERVER_WORKERS, EMBEDDING_SERVER_BACKEND,
+    EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT_MS
+)
+from app.embedding_server import EmbeddingServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the shared embedding server.")
+    parser.add_argument("--address", default=EMBEDDING_SERVER_ADDRESS, help="unix:/path/to.sock or host:port.")
+    parser.add_argument("--workers", type=int, default=EMBEDDING_SERVER_WORKERS, help="Model processes (model copies).")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--backend", choices=("torch", "onnx"), default=EMBEDDING_SERVER_BACKEND)
+    parser.add_argument("--onnx-model-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--quantized", action="store_true", default=ONNX_QUANTIZED)
+    parser.add_argument("--threads", type=int, default=EMBEDDING_NUM_THREADS, help="CPU threads per worker (0: library default).")
+    parser.add_argument("--max-batch-size", type=int, default=EMBEDDING_BATCH_MAX_SIZE,
+                        help="Maximum texts of coalesced requests per model call.")
+    parser.add_argument("--max-wait-ms", type=float, default=EMBEDDING_BATCH_MAX_WAIT_MS,
+                        help="Maximum wait for more requests to coalesce.")
+    args = parser.parse_args()
+
+    EmbeddingServer(
+        args.address,
+        workers=args.workers,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        model_name=args.model,
+        backend=args.backend,
+        onnx_model_dir=args.onnx_model_dir,
+        quantized=args.quantized,
+        num_threads=args.threads
+    ).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Export a SentenceTransformer model to ONNX for the `onnx` embedding backend, and verify it.
+
+    python tools/export_onnx.py --model all-MiniLM-L6-v2 --output onnx_models/all-MiniLM-L6-v2 --quantize
+
+Writes `model.onnx` (and `model_quantized.onnx` with dynamic int8 quantization when `--quantize` is
+given), `tokenizer.json` and `embedding_config.json` to the output directory, then checks that the
+ONNX backend reproduces the SentenceTransformer vectors within a tolerance. Exporting needs torch;
+serving with `EMBEDDING_BACKEND=onnx` does not.
+
+    python tools/export_onnx.py --output onnx_models/all-MiniLM-L6-v2 --verify-only
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.embeddings import (  # noqa: E402
+    OnnxBackend, ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE, ONNX_TOKENIZER_FILE, ONNX_CONFIG_FILE
+)
+
+VERIFY_SENTENCES = [
+    "Brasília é a capital do Brasil.",
+    "Tóquio é a capital do Japão.",
+    "What is the capital of Japan?",
+    "Retrieval-augmented generation combines search with a language model.",
+    "ChromaDB stores documents together with their embedding vectors.",
+    "",
+    "Um texto um pouco mais longo, com várias frases. Ele serve para verificar o padding e a truncagem "
+    "do tokenizador quando os textos de um mesmo lote têm tamanhos muito diferentes.",
+]
+
+
+def export(model_name: str, output_dir: str, quantize: bool, opset: int) -> None:
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    auto_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+
+    sample = tokenizer(["exemplo de entrada"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    print(f"Exporting {model_name} to {model_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            auto_model,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, ONNX_TOKENIZER_FILE))
+    normalize = any(type(module).__name__ == "Normalize" for module in model)
+    config = {
+        "model_name": model_name,
+        "max_seq_length": model.max_seq_length,
+        "normalize": normalize,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        quantized_path = os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE)
+        print(f"Quantizing (dynamic int8) to {quantized_path}")
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+
+
+def verify(model_name: str, output_dir: str, quantized: bool, tolerance: float) -> bool:
+    """
+    Compare the ONNX backend against SentenceTransformer on sample sentences.
+
+    Returns:
+        bool: True if every vector has cosine similarity of at least 1 - tolerance with the reference.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(model_name, device="cpu").encode(VERIFY_SENTENCES, convert_to_numpy=True)
+    candidate = OnnxBackend(output_dir, quantized=quantized).encode(VERIFY_SENTENCES, batch_size=4)
+
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    unit_candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosine = (reference * unit_candidate).sum(axis=1)
+    max_abs_diff = float(np.abs(reference - candidate).max())
+    ok = bool(cosine.min() >= 1.0 - tolerance)
+
+    label = "quantized" if quantized else "fp32"
+    print(f"[{label}] min cosine similarity: {cosine.min():.6f}, max abs diff: {max_abs_diff:.6f} "
+          f"(tolerance {tolerance}) -> {'OK' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a SentenceTransformer model to ONNX and verify it.")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    parser.add_argument("--output", default=None, help="Output directory (default: onnx_models/<model>).")
+    parser.add_argument("--quantize", action="store_true", help="Also write a dynamic int8-quantized model.")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--verify-only", action="store_true", help="Skip the export and only run the check.")
+    parser.add_argument("--tolerance", type=float, default=1e-4,
+                        help="Allowed 1 - cosine similarity for the fp32 model.")
+    parser.add_argument("--quantized-tolerance", type=float, default=0.02,
+                        help="Allowed 1 - cosine similarity for the quantized model.")
+    args = parser.parse_args()
+
+    output_dir = args.output or os.path.join("onnx_models", args.model)
+    if not args.verify_only:
+        export(args.model, output_dir, args.quantize, args.opset)
+
+    ok = verify(args.model, output_dir, quantized=False, tolerance=args.tolerance)
+    if os.path.exists(os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE)):
+        ok = verify(args.model, output_dir, quantized=True, tolerance=args.quantized_tolerance) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
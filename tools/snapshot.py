@@ -0,0 +1,74 @@
+"""
+Export the stored embeddings to a memory-mappable snapshot, or bulk-load one, without re-encoding.
+
+    python tools/snapshot.py export --snapshot snapshots/base
+    python tools/snapshot.py import --snapshot snapshots/base --chroma-path ./chroma_db_copy
+
+A snapshot is a directory with `embeddings.npy` (float32 matrix), `records.jsonl` (ID, text and
+metadata per row) and `manifest.json`. Importing checks that the snapshot was made with the same
+embedding model as `--model`; `--force` skips the check. The running service exposes the same
+operations as `POST /snapshots/export` and `POST /snapshots/import`.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config import (  # noqa: E402
+    CHROMADB_PATH, EMBEDDING_MODEL, LEXICAL_INDEX_PATH, DEDUP_METADATA_KEYS, SNAPSHOT_IMPORT_BATCH_SIZE,
+    CHROMADB_SHARDS, CHROMADB_SHARD_KEY, CHROMADB_HOST, CHROMADB_PORT,
+    HNSW_SPACE, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+)
+from app.database import ChromaDBManager  # noqa: E402
+from app.lexical import BM25Index  # noqa: E402
+from app.snapshot import export_snapshot, import_snapshot  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import an embedding snapshot.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("--snapshot", required=True, help="Snapshot directory.")
+    parser.add_argument("--chroma-path", default=CHROMADB_PATH)
+    parser.add_argument("--chroma-host", default=CHROMADB_HOST, help="Chroma server to use instead of --chroma-path.")
+    parser.add_argument("--chroma-port", type=int, default=CHROMADB_PORT)
+    parser.add_argument("--lexical-index-path", default=None,
+                        help="BM25 index directory (default: LEXICAL_INDEX_PATH, or <chroma-path>_lexical).")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="Embedding model recorded in or expected from the snapshot.")
+    parser.add_argument("--batch-size", type=int, default=SNAPSHOT_IMPORT_BATCH_SIZE)
+    parser.add_argument("--shards", type=int, default=CHROMADB_SHARDS,
+                        help="Number of shards of the store; importing into a new count reshards the data.")
+    parser.add_argument("--force", action="store_true", help="Import even if the embedding model differs.")
+    args = parser.parse_args()
+
+    lexical_path = args.lexical_index_path or (
+        LEXICAL_INDEX_PATH if args.chroma_path == CHROMADB_PATH else args.chroma_path.rstrip("/\\") + "_lexical"
+    )
+    db = ChromaDBManager(
+        args.chroma_path,
+        lexical_index=BM25Index(lexical_path),
+        id_metadata_keys=DEDUP_METADATA_KEYS,
+        num_shards=args.shards,
+        shard_key=CHROMADB_SHARD_KEY,
+        hnsw_space=HNSW_SPACE,
+        hnsw_m=HNSW_M,
+        hnsw_ef_construction=HNSW_EF_CONSTRUCTION,
+        hnsw_ef_search=HNSW_EF_SEARCH,
+        host=args.chroma_host,
+        port=args.chroma_port
+    )
+    try:
+        if args.command == "export":
+            result = export_snapshot(db, args.snapshot, model_name=args.model)
+        else:
+            result = import_snapshot(
+                db, args.snapshot, expected_model=None if args.force else args.model, batch_size=args.batch_size
+            )
+    finally:
+        db.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Local OpenAI-compatible chat completions stub, for testing and benchmarking without OpenRouter.
+
+Run it and point the API at it:
+
+    python tools/stub_llm.py --port 8001 --delay 0.5 --error-rate 0.1
+    LLM_API_BASE=http://localhost:8001/v1 uvicorn app.main:app
+
+It answers `POST /v1/chat/completions` (streaming and non-streaming) after a configurable delay,
+and can inject retryable errors (429/503) and hung requests to exercise retries, timeouts and hedging.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_app(
+    delay: float = 0.2,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    hang_rate: float = 0.0,
+    tokens_per_second: float = 50.0,
+    answer: str = "Esta é uma resposta gerada pelo stub local do LLM."
+) -> FastAPI:
+    """
+    Create the stub application.
+
+    Args:
+        delay (float): Seconds before the first byte of each response.
+        jitter (float): Maximum extra random delay in seconds.
+        error_rate (float): Probability of answering with a retryable 429 or 503 error.
+        hang_rate (float): Probability of never answering (to exercise timeouts and hedging).
+        tokens_per_second (float): Pace of streamed tokens.
+        answer (str): Text returned as the completion.
+    """
+    app = FastAPI(title="Stub LLM")
+    app.state.requests = 0
+
+    def usage(messages) -> dict:
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+        completion_tokens = len(answer.split())
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    @app.get("/stats")
+    def stats():
+        return {"requests": app.state.requests}
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        model = body.get("model", "stub")
+        messages = body.get("messages", [])
+
+        if random.random() < hang_rate:
+            await asyncio.sleep(3600)
+        await asyncio.sleep(delay + random.uniform(0, jitter))
+        if random.random() < error_rate:
+            status = random.choice([429, 503])
+            return JSONResponse({"error": {"message": "stub error", "code": status}}, status_code=status)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage(messages),
+            }
+
+        async def events():
+            words = answer.split(" ")
+            for idx, word in enumerate(words):
+                content = word if idx == 0 else " " + word
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                if tokens_per_second > 0:
+                    await asyncio.sleep(1.0 / tokens_per_second)
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [],
+                "usage": usage(messages),
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible chat completions stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=0.2, help="Seconds before each response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Maximum extra random delay in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 429/503 response.")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Probability of never answering.")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Pace of streamed tokens.")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(
+        create_app(args.delay, args.jitter, args.error_rate, args.hang_rate, args.tokens_per_second),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Measure how the HNSW settings trade recall for latency, against exact (brute-force numpy) search.
+
+    python tools/sweep_hnsw.py --snapshot snapshots/base --m 8,16,32 --ef-construction 100,200 --ef-search 10,50,100,200
+    python tools/sweep_hnsw.py --count 50000 --dimension 384 --space cosine --output sweep.json
+
+The corpus is the embedding matrix of a snapshot made with `tools/snapshot.py export` (our real
+vectors) or, without `--snapshot`, seeded synthetic clustered vectors. `--queries` rows are held out
+of the corpus and used as queries, and their exact top `--k` neighbors are computed with numpy.
+
+For every (M, ef_construction) pair a fresh persistent collection is built in a temporary directory
+(build time reported), then it is reopened with each ef_search and queried one vector at a time:
+recall@k against the exact neighbors, latency p50/p95/p99 and QPS. The fastest setting (by p95)
+reaching `--target-recall` is reported as `recommended`, with the matching `app/config.py`
+variables. Note that `ef_search` below `k` behaves as `k`.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from app.config import HNSW_SPACE, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH  # noqa: E402
+from app.database import HNSW_SPACES  # noqa: E402
+from app.snapshot import EMBEDDINGS_FILE, read_manifest  # noqa: E402
+
+COLLECTION = "sweep"
+
+
+def synthetic_corpus(count: int, dimension: int, clusters: int, seed: int) -> np.ndarray:
+    """
+    Gaussian clusters around random centers: closer to real embeddings than uniform noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension), dtype=np.float32)
+    assignment = rng.integers(0, clusters, size=count)
+    vectors = centers[assignment] + 0.35 * rng.standard_normal((count, dimension), dtype=np.float32)
+    return vectors.astype(np.float32, copy=False)
+
+
+def exact_neighbors(corpus: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """
+    Indexes of the exact top-k corpus rows for each query, nearest first, in the index's distance.
+    """
+    if space == "cosine":
+        corpus = corpus / np.clip(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12, None)
+        queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+    squared_norms = (corpus * corpus).sum(axis=1) if space == "l2" else None
+    # Score blocks of queries so the distance matrix stays around 200 MB
+    block = max(1, min(256, 50_000_000 // len(corpus)))
+    neighbors = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), block):
+        products = queries[start:start + block] @ corpus.T
+        # Lower is nearer: squared L2 without the constant query norm, or negated (cosine) similarity
+        distances = squared_norms[None, :] - 2 * products if space == "l2" else -products
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+        neighbors[start:start + block] = np.take_along_axis(top, order, axis=1)
+    return neighbors
+
+
+def open_client(path: str):
+    import chromadb
+    from chromadb.api.client import SharedSystemClient
+
+    # Drop the cached system so the collection is loaded from disk again: a loaded index keeps the
+    # ef_search it was loaded with
+    SharedSystemClient.clear_system_cache()
+    return chromadb.PersistentClient(path=path)
+
+
+def build_index(path: str, corpus: np.ndarray, space: str, m: int, ef_construction: int, batch_size: int) -> float:
+    """
+    Build a collection with the given settings and return the build time in seconds.
+    """
+    client = open_client(path)
+    collection = client.create_collection(
+        COLLECTION, configuration={"hnsw": {"space": space, "max_neighbors": m, "ef_construction": ef_construction}}
+    )
+    batch_size = min(batch_size, client.get_max_batch_size())
+    started = time.perf_counter()
+    for start in range(0, len(corpus), batch_size):
+        end = min(start + batch_size, len(corpus))
+        collection.add(ids=[str(i) for i in range(start, end)], embeddings=corpus[start:end])
+    return time.perf_counter() - started
+
+
+def measure(path: str, queries: np.ndarray, truth: np.ndarray, k: int, ef_search: int, warmup: int) -> Dict[str, Any]:
+    """
+    Reopen the collection with `ef_search` and time single-vector queries.
+    """
+    open_client(path).get_collection(COLLECTION).modify(configuration={"hnsw": {"ef_search": ef_search}})
+    collection = open_client(path).get_collection(COLLECTION)
+    # The first queries load the index from disk
+    for query in queries[:warmup]:
+        collection.query(query_embeddings=query[None, :], n_results=k, include=[])
+
+    latencies: List[float] = []
+    recalls: List[float] = []
+    started = time.perf_counter()
+    for query, expected in zip(queries, truth):
+        query_started = time.perf_counter()
+        found = collection.query(query_embeddings=query[None, :], n_results=k, include=[])["ids"][0]
+        latencies.append(time.perf_counter() - query_started)
+        recalls.append(len(set(map(int, found)).intersection(expected.tolist())) / k)
+    elapsed = time.perf_counter() - started
+
+    values = np.array(latencies) * 1000
+    return {
+        "ef_search": ef_search,
+        "recall": round(float(np.mean(recalls)), 4),
+        "min_recall": round(float(np.min(recalls)), 4),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "qps": round(len(queries) / elapsed, 1),
+    }
+
+
+def recommend(results: List[Dict[str, Any]], target: float) -> Optional[Dict[str, Any]]:
+    """
+    The setting with the lowest p95 among those reaching the target recall.
+    """
+    eligible = [result for result in results if result["recall"] >= target]
+    if not eligible:
+        return None
+    best = min(eligible, key=lambda result: (result["p95_ms"], -result["recall"]))
+    return {
+        **best,
+        "config": {
+            "HNSW_SPACE": best["space"],
+            "HNSW_M": best["m"],
+            "HNSW_EF_CONSTRUCTION": best["ef_construction"],
+            "HNSW_EF_SEARCH": best["ef_search"],
+        },
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_ints(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep HNSW settings for recall vs latency against exact search.")
+    parser.add_argument("--snapshot", default=None, help="Snapshot directory whose embeddings are the corpus.")
+    parser.add_argument("--count", type=int, default=20000, help="Synthetic corpus size (without --snapshot).")
+    parser.add_argument("--dimension", type=int, default=384, help="Synthetic vector dimension (without --snapshot).")
+    parser.add_argument("--clusters", type=int, default=100, help="Synthetic clusters (without --snapshot).")
+    parser.add_argument("--queries", type=int, default=500, help="Corpus rows held out as queries.")
+    parser.add_argument("--k", type=int, default=10, help="Neighbors per query (recall@k).")
+    parser.add_argument("--space", choices=HNSW_SPACES, default=HNSW_SPACE)
+    parser.add_argument("--m", default=f"8,{HNSW_M},32", help="Comma-separated M values.")
+    parser.add_argument("--ef-construction", default=f"{HNSW_EF_CONSTRUCTION},200", help="Comma-separated ef_construction values.")
+    parser.add_argument("--ef-search", default=f"10,50,{HNSW_EF_SEARCH},200", help="Comma-separated ef_search values.")
+    parser.add_argument("--target-recall", type=float, default=0.95, help="Recall the recommended setting must reach.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Vectors per collection.add call.")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed queries after loading each index.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the JSON result to this file as well.")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        manifest = read_manifest(args.snapshot)
+        vectors = np.load(os.path.join(args.snapshot, EMBEDDINGS_FILE), mmap_mode="r")
+        source = {"snapshot": args.snapshot, "embedding_model": manifest.get("embedding_model")}
+    else:
+        vectors = synthetic_corpus(args.count, args.dimension, args.clusters, args.seed)
+        source = {"synthetic": True, "clusters": args.clusters, "seed": args.seed}
+    if args.queries >= len(vectors) or args.k > len(vectors) - args.queries:
+        parser.error(f"The corpus has {len(vectors)} vectors: too few for {args.queries} queries and k={args.k}.")
+
+    rng = np.random.default_rng(args.seed)
+    held_out = np.zeros(len(vectors), dtype=bool)
+    held_out[rng.choice(len(vectors), size=args.queries, replace=False)] = True
+    queries = np.ascontiguousarray(vectors[held_out], dtype=np.float32)
+    corpus = np.ascontiguousarray(vectors[~held_out], dtype=np.float32)
+
+    started = time.perf_counter()
+    truth = exact_neighbors(corpus, queries, args.k, args.space)
+    print(f"Exact neighbors of {len(queries)} queries over {len(corpus)} vectors in {time.perf_counter() - started:.1f} s",
+          file=sys.stderr)
+
+    results: List[Dict[str, Any]] = []
+    for m in parse_ints(args.m):
+        for ef_construction in parse_ints(args.ef_construction):
+            workdir = tempfile.mkdtemp(prefix="rag-hnsw-")
+            try:
+                build_seconds = build_index(workdir, corpus, args.space, m, ef_construction, args.batch_size)
+                for ef_search in parse_ints(args.ef_search):
+                    row = {
+                        "space": args.space,
+                        "m": m,
+                        "ef_construction": ef_construction,
+                        "build_seconds": round(build_seconds, 2),
+                        "build_vectors_per_second": round(len(corpus) / build_seconds, 1),
+                        **measure(workdir, queries, truth, args.k, ef_search, args.warmup),
+                    }
+                    results.append(row)
+                    print(f"M={m} ef_construction={ef_construction} ef_search={ef_search}: "
+                          f"recall@{args.k}={row['recall']:.3f} p95={row['p95_ms']:.2f} ms", file=sys.stderr)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "corpus": {**source, "count": len(corpus), "dimension": int(corpus.shape[1]), "queries": len(queries), "k": args.k},
+        "target_recall": args.target_recall,
+        "results": results,
+        "recommended": recommend(results, args.target_recall),
+    }
+    text = json.dumps(output, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()